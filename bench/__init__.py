@@ -0,0 +1,10 @@
+"""Benchmarks for the mini-browser pipelines.
+
+    python -m bench.run [--nodes 2000 --depth 6 ...] [-o results.json]
+    python -m bench.run --compare before.json after.json
+    python -m bench.pages -o out/          # write a generated page to disk
+
+pages.py generates parameterized synthetic pages, variants.py loads the root
+pipeline and the step4-step7 copies side by side (they share module names),
+run.py times each stage and records peak memory as JSON.
+"""
@@ -0,0 +1,105 @@
+"""Descendant/child selectors on deep documents, with and without the
+ancestor Bloom filter.
+
+The page nests --depth sections (<div class="sK">), each holding a list of
+--width links. The stylesheet has --rules combinator rules; a few match
+(`.s3 li a`, `ul > li`), and most name ancestors this page does not have
+(`.missingN li a`, `nav > li.itemN`, `#mainN a`), as in a site-wide sheet.
+
+The root and step4 cascades are timed as they are, then with a filter that
+always answers "maybe", so every candidate selector walks up the tree. That
+run grows with depth times the node count, so it is skipped past
+--unfiltered-max sections. Both runs must produce the same styles.
+
+    python -m bench.combinators
+    python -m bench.combinators --depth 5000 --rules 400
+"""
+import argparse
+import time
+
+from bench import variants
+
+def generate_html(depth, width):
+    item = "".join(f'<li class="item{j}"><a href="#">link {j}</a></li>' for j in range(width))
+    return ("<html><body>"
+            + "".join(f'<div class="s{k % 10}"><ul>{item}</ul>' for k in range(depth))
+            + "</div>" * depth + "</body></html>")
+
+def generate_css(rules):
+    out = []
+    for i in range(rules):
+        kind = i % 10
+        if kind == 0:
+            out.append(f".s{i % 7} li a {{ color: c{i} }}")
+        elif kind == 1:
+            out.append(f"ul > li.item{i % 5} {{ margin: {i}px }}")
+        elif kind < 5:
+            out.append(f".missing{i} li a {{ color: m{i} }}")
+        elif kind < 8:
+            out.append(f"nav > li.item{i % 5} {{ color: n{i} }}")
+        else:
+            out.append(f"#main{i} .s{i % 10} a {{ color: i{i} }}")
+    return "\n".join(out)
+
+def _always_maybe(filter_class):
+    class NoFilter(filter_class):
+        def may_contain(self, hashes):
+            return True
+    return NoFilter
+
+def _styles(nodes):
+    return [sorted(n.styles.items()) for n in nodes]
+
+def _root(html, css):
+    mods = variants.load("root", "html_parser", "css_parser", "render", "traversal")
+    html_parser, css_parser, render = mods["html_parser"], mods["css_parser"], mods["render"]
+    parser = css_parser.CSSParser()
+    parser.parse_css(css)
+
+    def run():
+        dom = html_parser.parse_html(html)
+        started = time.perf_counter()
+        render._apply_css(dom, css_parser.RuleIndex(parser.rules))
+        return time.perf_counter() - started, _styles(mods["traversal"].preorder(dom))
+    return run, render
+
+def _step4(html, css):
+    mods = variants.load("step4", "html_parser", "css_parser", "traversal")
+    html_parser, css_parser = mods["html_parser"], mods["css_parser"]
+    rules = css_parser.CSSParser().parse_css(css)
+
+    def run():
+        dom, _ = html_parser.parse_html(html)
+        started = time.perf_counter()
+        css_parser.apply_css_to_dom(dom, rules)
+        return time.perf_counter() - started, _styles(mods["traversal"].preorder(dom))
+    return run, css_parser
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Combinator matching on deep documents.")
+    ap.add_argument("--depth", type=int, default=300, help="nested sections")
+    ap.add_argument("--width", type=int, default=5, help="links per section")
+    ap.add_argument("--rules", type=int, default=200)
+    ap.add_argument("--unfiltered-max", type=int, default=300,
+                    help="deepest page also styled without the filter")
+    args = ap.parse_args(argv)
+
+    html, css = generate_html(args.depth, args.width), generate_css(args.rules)
+    print(f"depth {args.depth}, {args.depth * (2 + 2 * args.width)} elements, {args.rules} rules")
+    for name, setup in (("root", _root), ("step4", _step4)):
+        run, module = setup(html, css)
+        filtered, expected = run()
+        if args.depth > args.unfiltered_max:
+            print(f"{name:5}  with filter {filtered * 1000:9.1f} ms", flush=True)
+            continue
+        real = module.AncestorFilter
+        module.AncestorFilter = _always_maybe(real)
+        try:
+            unfiltered, styles = run()
+        finally:
+            module.AncestorFilter = real
+        print(f"{name:5}  with filter {filtered * 1000:9.1f} ms   without {unfiltered * 1000:9.1f} ms "
+              f"({unfiltered / filtered:5.1f}x)   same styles: {styles == expected}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""The single-pass CSS parser against the regex parser it replaced.
+
+Sheets are generated at --sizes (kilobytes) and parsed by the root and
+step4 parsers and, up to --legacy-max kilobytes, by copies of the previous
+regex implementations kept below (comment stripping, then
+`([^{]+)\\{([^}]*)\\}`).
+
+  framework  generated rules with comments, grouped selectors and @media
+             blocks, like a CSS framework's stylesheet
+  strings    rules whose values hold braces and semicolons in strings
+  unclosed   a selector list that never reaches its '{' (a truncated sheet)
+  comments   many '/*' that are never closed
+
+On sheets without @-rules or strings both parsers must agree; `plain` is
+checked that way before timing.
+
+    python -m bench.css
+    python -m bench.css --sizes 100,1000,5000 --legacy-max 1000
+"""
+import argparse
+import re
+import time
+
+from bench import variants
+from bench.pages import generate_css
+
+def _framework(size):
+    chunks, total, seed = [], 0, 0
+    while total < size:
+        rules = generate_css(200, seed=seed)
+        chunk = (f"/* section {seed}: {{ generated }} */\n{rules}\n"
+                 f"h1, h2, .title-{seed}, #main-{seed} {{ margin: 0; font-weight: bold }}\n"
+                 f"@media (max-width: {600 + seed}px) {{\n{generate_css(20, seed=seed + 1)}\n}}\n")
+        chunks.append(chunk)
+        total += len(chunk)
+        seed += 1
+    return "".join(chunks)
+
+def _strings(size):
+    rule = ('.q{i}::before {{ content: "{{;}}"; color: red }}\n'
+            "a[title='x;{{']{i} {{ font: 12px 'A {{ B }}' }}\n")
+    return "".join(rule.format(i=i) for i in range(size // len(rule) + 1))
+
+CASES = {
+    "framework": _framework,
+    "strings": _strings,
+    "unclosed": lambda size: "div .a > p, " * (size // 12),
+    "comments": lambda size: "/* x " * (size // 5),
+}
+
+# -------- the previous implementations --------
+def legacy_root_parse(css_content):
+    rules = []
+    if not css_content:
+        return rules
+    css_content = re.sub(r'/\*.*?\*/', '', css_content, flags=re.DOTALL)
+    for match in re.compile(r'([^{]+)\{([^}]*)\}').finditer(css_content):
+        selectors = [s.strip() for s in match.group(1).split(',') if s.strip()]
+        declarations = {}
+        for decl in match.group(2).split(';'):
+            decl = decl.strip()
+            if decl and ':' in decl:
+                prop, value = decl.split(':', 1)
+                declarations[prop.strip()] = value.strip()
+        if selectors:
+            rules.append({'selectors': selectors, 'style': declarations})
+    return rules
+
+def legacy_step4_parse(css):
+    rules = []
+    if not css:
+        return rules
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    order = 0
+    for m in re.finditer(r'([^{]+)\{([^}]*)\}', css):
+        decls = {}
+        for d in m.group(2).split(';'):
+            if not d or ':' not in d:
+                continue
+            k, v = d.split(':', 1)
+            if k.strip():
+                decls[k.strip().lower()] = v.strip()
+        selectors = [s.strip() for s in m.group(1).strip().split(',') if s.strip()]
+        if not selectors:
+            continue
+        rules.append({'selectors': selectors, 'style': decls, 'order': order})
+        for s in selectors:
+            rules.append({'selector': s, 'style': decls, 'order': order})
+        order += 1
+    return rules
+
+# -------- checks and timings --------
+def _as_tuples(rules):
+    """Rules as (selectors, style dict) pairs, whichever parser made them."""
+    out = []
+    for r in rules:
+        if isinstance(r, dict):
+            if 'selectors' in r:
+                out.append((tuple(r['selectors']), r['style']))
+        else:
+            out.append((tuple(r.selectors), dict(r.declarations)))
+    return out
+
+def check(parsers, seed=0):
+    css = "/* plain */\n" + generate_css(2000, seed=seed)
+    for name, parse, legacy in parsers:
+        new, old = _as_tuples(parse(css)), _as_tuples(legacy(css))
+        if new != old:
+            raise AssertionError(f"{name}: {len(new)} rules, legacy {len(old)}; "
+                                 f"first difference at {next(i for i, (a, b) in enumerate(zip(new, old)) if a != b)}")
+        print(f"{name}: {len(new)} rules, same as legacy")
+
+def _time(parse, css):
+    started = time.perf_counter()
+    rules = parse(css)
+    return time.perf_counter() - started, len(_as_tuples(rules))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Single-pass CSS parser vs the regex parser.")
+    ap.add_argument("--sizes", default="100,1000,5000", help="sheet sizes in kilobytes")
+    ap.add_argument("--cases", default=",".join(CASES))
+    ap.add_argument("--legacy-max", type=int, default=1000,
+                    help="largest size (kB) given to the legacy parsers on the pathological cases")
+    args = ap.parse_args(argv)
+
+    root = variants.load("root", "css_parser")["css_parser"]
+    step4 = variants.load("step4", "css_parser")["css_parser"]
+    parsers = [("root", root.parse_stylesheet, legacy_root_parse),
+               ("step4", step4.parse_stylesheet, legacy_step4_parse)]
+    check(parsers)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    for case in [c.strip() for c in args.cases.split(",") if c.strip()]:
+        for kb in sizes:
+            css = CASES[case](kb * 1024)
+            for name, parse, legacy in parsers:
+                elapsed, count = _time(parse, css)
+                line = (f"{case:10} {len(css) / 1024:7.0f} kB {name:5}  "
+                        f"single-pass {elapsed * 1000:9.1f} ms {count:7d} rules")
+                if case in ("framework", "strings") or kb <= args.legacy_max:
+                    legacy_elapsed, legacy_count = _time(legacy, css)
+                    line += f"   regex {legacy_elapsed * 1000:9.1f} ms {legacy_count:7d} rules"
+                print(line, flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Deeply nested documents through every stage.
+
+Builds N nested <div>s around one <p id=deep> and runs the root pipeline
+(parse, script lookup by id, cascade, paint, layout, repr) and step4's
+(parse, css, layout, layout_to_string), printing each stage's time.
+Nothing may raise RecursionError, and times should grow linearly with N.
+
+    python -m bench.deep                  # 100k levels
+    python -m bench.deep --depth 20000 --variants step4
+"""
+import argparse
+import time
+
+from bench import variants
+
+CSS = ".d { padding-left: 0px; padding-right: 0px; padding-top: 0px; padding-bottom: 0px } p { color: red }"
+
+def deep_html(depth):
+    return ("<html><body>" + "<div class=d>x" * depth + "<p id=deep>bottom</p>"
+            + "</div>" * depth + "</body></html>")
+
+def _root(html):
+    mods = variants.load("root", "html_parser", "css_parser", "render", "layout", "headless", "js_interpreter")
+    css = mods["css_parser"].CSSParser()
+    css.parse_css(CSS)
+    dom = yield "parse", lambda: mods["html_parser"].parse_html(html)
+    yield "script", lambda: mods["js_interpreter"].JSInterpreter(dom).execute(
+        'document.getElementById("deep").innerHTML = "changed"')
+    yield "cascade", lambda: mods["render"]._apply_css(dom, css.index)
+    yield "paint", lambda: mods["render"].paint_page(dom, css.index, 800, 600,
+                                                     mods["headless"].AdvanceTableMetrics())
+    yield "layout", lambda: mods["layout"].build_layout_tree(dom)
+    yield "print", lambda: len(repr(dom))
+
+def _step4(html):
+    mods = variants.load("step4", "html_parser", "css_parser", "layout")
+    rules = mods["css_parser"].CSSParser().parse_css(CSS)
+    dom, _ = yield "parse", lambda: mods["html_parser"].parse_html(html)
+    yield "css", lambda: mods["css_parser"].apply_css_to_dom(dom, rules)
+    tree = yield "layout", lambda: mods["layout"].build_layout_tree(dom)
+    yield "print", lambda: len(mods["layout"].layout_to_string(tree))
+
+PIPELINES = {"root": _root, "step4": _step4}
+
+def run(name, html):
+    steps = PIPELINES[name](html)
+    result = None
+    try:
+        while True:
+            stage, fn = steps.send(result)
+            started = time.perf_counter()
+            result = fn()
+            extra = f"  ({result} chars)" if stage == "print" else ""
+            print(f"{name:6} {stage:8} {time.perf_counter() - started:8.2f} s{extra}", flush=True)
+    except StopIteration:
+        pass
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time every stage on a deeply nested document.")
+    ap.add_argument("--depth", type=int, default=100_000)
+    ap.add_argument("--variants", default=",".join(PIPELINES))
+    args = ap.parse_args(argv)
+    html = deep_html(args.depth)
+    print(f"document: {args.depth} nested elements, {len(html) / 1e6:.1f} MB of HTML")
+    for name in [n.strip() for n in args.variants.split(",") if n.strip()]:
+        run(name, html)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Element lookups through the JS runtimes' id/class index.
+
+consistency  step6's JSRuntime on a generated page, under random
+             setAttribute (id/class), appendChild (moves, re-inserts) and
+             remove() calls through JSElement; after every batch the live
+             ElementIndex is verified against one rebuilt from the tree, and
+             getElementById / querySelector answers against a plain DFS.
+lookups      a script doing many getElementById calls, timed in the root,
+             step6 and step7 runtimes and against a DFS per lookup.
+
+    python -m bench.jsindex                        # 20k elements, 5000 mutations
+    python -m bench.jsindex --mutations 20000 --seed 7
+"""
+import argparse
+import random
+import time
+
+from bench import variants
+from bench.pages import CLASS_POOL, add_page_arguments, generate_html
+
+def _dfs(root, match):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if match(node):
+            return node
+        stack.extend(reversed(getattr(node, "children", None) or []))
+    return None
+
+def _elements(root):
+    out, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        out.append(node)
+        stack.extend(reversed(node.children))
+    return out
+
+def consistency(html, ids, mutations, batch, seed):
+    mods = variants.load("step6", "html_parser", "js_runtime")
+    js = mods["js_runtime"]
+    dom, _ = mods["html_parser"].parse_html(html)
+    runtime = js.JSRuntime(dom, on_dom_change=lambda: None)
+    document, index = runtime.document, runtime.index
+    rng = random.Random(seed)
+    body = index.first_by_tag("body")
+    attached = _elements(body)[1:]  # mutations stay below <body>
+    detached = []
+    new_ids = list(ids) + [f"x{i}" for i in range(50)]
+    counts = dict.fromkeys(("setAttribute id", "setAttribute class", "appendChild", "remove"), 0)
+    checks = 0
+
+    def element(node):
+        return js.JSElement(node, lambda: None, index)
+
+    for step in range(1, mutations + 1):
+        op = rng.random()
+        if op < 0.3:
+            element(rng.choice(attached)).setAttribute("id", rng.choice(new_ids))
+            counts["setAttribute id"] += 1
+        elif op < 0.55:
+            element(rng.choice(attached)).setAttribute(
+                "class", " ".join(f"c{rng.randrange(CLASS_POOL)}" for _ in range(rng.randrange(3))))
+            counts["setAttribute class"] += 1
+        elif op < 0.8:
+            # Move an attached element, or put back a removed one (or append into a detached one)
+            child = detached.pop(rng.randrange(len(detached))) if detached and rng.random() < 0.5 \
+                else rng.choice(attached)
+            parent = rng.choice(attached + detached)
+            try:
+                element(parent).appendChild(element(child))
+            except js.JSEvalError:
+                pass  # parent inside child's subtree
+            counts["appendChild"] += 1
+        else:
+            node = rng.choice(attached)
+            element(node).remove()
+            detached.append(node)
+            counts["remove"] += 1
+        if step % batch == 0 or step == mutations:
+            problems = index.verify()
+            if problems:
+                raise AssertionError(f"index out of sync after {step} mutations: {problems[:5]}")
+            attached = _elements(body)[1:]
+            for key in rng.sample(new_ids, 20):
+                want = _dfs(dom, lambda n: n.attributes.get("id") == key)
+                got = document.getElementById(key)
+                assert (got.node if got else None) is want, f"getElementById({key!r})"
+            for c in rng.sample(range(CLASS_POOL), 10):
+                want = _dfs(dom, lambda n: f"c{c}" in (n.attributes.get("class") or "").split())
+                got = document.querySelector(f".c{c}")
+                assert (got.node if got else None) is want, f"querySelector('.c{c}')"
+            for tag in ("li", "span", "ul"):
+                want = _dfs(dom, lambda n: n.tag == tag)
+                got = document.querySelector(tag)
+                assert (got.node if got else None) is want, f"querySelector({tag!r})"
+            checks += 1
+    return counts, checks
+
+def lookups(html, ids, count):
+    script = ";".join(f'document.getElementById("{ids[i % len(ids)]}").innerHTML = "v{i}"' for i in range(count))
+    results = {}
+
+    root = variants.load("root", "html_parser", "js_interpreter")
+    dom = root["html_parser"].parse_html(html)
+    started = time.perf_counter()
+    root["js_interpreter"].JSInterpreter(dom).execute(script)
+    results["root"] = time.perf_counter() - started
+
+    step7 = variants.load("step7", "html_parser", "js_interpreter")
+    dom = step7["html_parser"].parse_html(html)
+    started = time.perf_counter()
+    step7["js_interpreter"].JSInterpreter(dom).execute(script)
+    results["step7"] = time.perf_counter() - started
+
+    step6 = variants.load("step6", "html_parser", "js_runtime")
+    dom, _ = step6["html_parser"].parse_html(html)
+    runtime = step6["js_runtime"].JSRuntime(dom, on_dom_change=lambda: None)
+    js6 = ";".join(f'document.getElementById("{ids[i % len(ids)]}").textContent = "v{i}"' for i in range(count))
+    started = time.perf_counter()
+    runtime.eval(js6)
+    results["step6"] = time.perf_counter() - started
+
+    # What every lookup used to cost: a DFS from the root
+    started = time.perf_counter()
+    for i in range(count):
+        key = ids[i % len(ids)]
+        _dfs(dom, lambda n: n.attributes.get("id") == key)
+    results["dfs"] = time.perf_counter() - started
+    return results
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="JS id/class index: consistency and lookup speed.")
+    add_page_arguments(ap)
+    ap.set_defaults(nodes=20000)
+    ap.add_argument("--mutations", type=int, default=5000)
+    ap.add_argument("--batch", type=int, default=250, help="verify the index every N mutations")
+    ap.add_argument("--lookups", type=int, default=2000)
+    args = ap.parse_args(argv)
+
+    html, elements, ids = generate_html(args.nodes, args.depth, args.list_width, args.text_length, args.seed)
+    print(f"document: {elements} elements, {len(ids)} ids")
+    counts, checks = consistency(html, ids, args.mutations, args.batch, args.seed)
+    print(f"consistency: {args.mutations} mutations ({', '.join(f'{k} {v}' for k, v in counts.items())}), "
+          f"{checks} verifications, index in sync")
+    for name, elapsed in lookups(html, ids, args.lookups).items():
+        print(f"{name:6} {args.lookups} getElementById  {elapsed * 1000:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""step4's recovering HTML parser on pathological markup.
+
+Each case is built at every --sizes N and parsed with the current parser
+(open-element stack, per-tag open counts) and, up to --legacy-max, with
+the previous implementation kept below for comparison (it walked up the
+parent chain for every end tag and kept every error message).
+
+  unclosed   N unclosed <div>s
+  orphans    1000 open <div>s, then N orphan </p>s
+  both       N unclosed <div>s, then N orphan </p>s
+  misnested  N × <b><i>, then N × </b>: each </b> implicitly closes an <i>
+  autoclose  N × <p>text (every <p> auto-closes the previous one)
+
+    python -m bench.malformed
+    python -m bench.malformed --sizes 1000,10000,100000 --legacy-max 20000
+"""
+import argparse
+import time
+
+from bench import variants
+
+CASES = {
+    "unclosed": lambda n: "<div>" * n,
+    "orphans": lambda n: "<div>" * 1000 + "</p>" * n,
+    "both": lambda n: "<div>" * n + "</p>" * n,
+    "misnested": lambda n: "<b><i>" * n + "</b>" * n,
+    "autoclose": lambda n: "<p>text " * n,
+}
+
+def _legacy_parser(html_parser):
+    """The pre-stack parser: end tags search the ancestors, errors are unbounded."""
+    from html.parser import HTMLParser
+
+    class LegacyParser(HTMLParser):
+        def __init__(self):
+            super().__init__(convert_charrefs=True)
+            self.root = html_parser.DOMNode('document', None)
+            self.cur = self.root
+            self.errors = []
+            self.texts = {}
+
+        def handle_starttag(self, tag, attrs):
+            tag = (tag or '').lower()
+            if self.cur.tag == tag and tag in html_parser.AUTO_CLOSE_ON_START and self.cur.parent:
+                self.errors.append(f"Auto-fermeture de <{tag}> avant nouvelle ouverture.")
+                self._flush_text(self.cur)
+                self.cur = self.cur.parent
+            node = html_parser.DOMNode(tag, self.cur)
+            if attrs:
+                node.attributes = dict(attrs)
+            self.cur.append_child(node)
+            if tag not in html_parser.SELF_CLOSING:
+                self.cur = node
+
+        def handle_endtag(self, tag):
+            tag = (tag or '').lower()
+            n = self.cur
+            while n is not None and n.tag != tag:
+                n = n.parent
+            if n is None:
+                self.errors.append(f"Balise fermante orpheline </{tag}> ignorée.")
+                return
+            closed = self.cur
+            while closed is not n:
+                self._flush_text(closed)
+                closed = closed.parent
+            self._flush_text(n)
+            self.cur = n.parent if n.parent else self.root
+
+        def handle_data(self, data):
+            txt = (data or "").strip()
+            if txt:
+                self.texts.setdefault(self.cur, []).append(txt)
+
+        def _flush_text(self, node):
+            parts = self.texts.pop(node, None)
+            if parts:
+                node.text = " ".join(parts)
+
+    def parse(html):
+        p = LegacyParser()
+        p.feed(html)
+        p.close()
+        while p.cur and p.cur.parent:
+            if p.cur.tag not in html_parser.SELF_CLOSING:
+                p.errors.append(f"Balise <{p.cur.tag}> non fermée — auto-fermeture en fin de document.")
+            p.cur = p.cur.parent
+        return p.root, p.errors
+    return parse
+
+def _time(parse, html):
+    started = time.perf_counter()
+    _, errors = parse(html)
+    return time.perf_counter() - started, errors
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Recovering parser on malformed HTML.")
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    ap.add_argument("--cases", default=",".join(CASES))
+    ap.add_argument("--legacy-max", type=int, default=10000,
+                    help="largest N given to the legacy parser (it is quadratic)")
+    args = ap.parse_args(argv)
+
+    html_parser = variants.load("step4", "html_parser")["html_parser"]
+    legacy = _legacy_parser(html_parser)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    for case in [c.strip() for c in args.cases.split(",") if c.strip()]:
+        for n in sizes:
+            html = CASES[case](n)
+            elapsed, errors = _time(html_parser.parse_html, html)
+            line = (f"{case:10} N={n:<7d} stack {elapsed * 1000:9.1f} ms  "
+                    f"{errors.total:7d} errors, {len(errors):4d} kept")
+            if n <= args.legacy_max:
+                legacy_elapsed, legacy_errors = _time(legacy, html)
+                line += f"   legacy {legacy_elapsed * 1000:9.1f} ms  {len(legacy_errors):7d} kept"
+            print(line, flush=True)
+
+if __name__ == "__main__":
+    main()
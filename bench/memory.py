@@ -0,0 +1,72 @@
+"""Retained DOM memory per node.
+
+Parses one generated document with each variant's parser (root-arena: the
+root's array-backed DOMArena) and reports the memory still allocated
+afterwards (tracemalloc, after a full collection) divided by the node
+count, plus the parse's peak.
+
+    python -m bench.memory                       # 1M-node document
+    python -m bench.memory --nodes 100000 --variants root,step4
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from bench import variants
+from bench.pages import add_page_arguments, generate_html
+
+PARSERS = ("root", "root-arena", "step2", "step4")
+
+def measure(name, html):
+    if name == "root-arena":
+        parse_html = variants.load("root", "html_parser")["html_parser"].parse_html_arena
+    else:
+        parse_html = variants.load(name, "html_parser")["html_parser"].parse_html
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        dom = parse_html(html)
+        elapsed = time.perf_counter() - started
+        if isinstance(dom, tuple):  # step4 returns (dom, errors)
+            dom = dom[0]
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    nodes = len(dom) if name == "root-arena" else variants.count_nodes(dom)
+    retained = current - base
+    del dom
+    return {
+        "nodes": nodes,
+        "retained_bytes": retained,
+        "bytes_per_node": retained / nodes if nodes else None,
+        "peak_bytes": peak - base,
+        "parse_s_traced": elapsed,
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="DOM bytes per node after parsing.")
+    add_page_arguments(ap)
+    ap.set_defaults(nodes=1_000_000, text_length=20)
+    ap.add_argument("--variants", default=",".join(PARSERS))
+    ap.add_argument("-o", "--output", help="write the JSON results here")
+    args = ap.parse_args(argv)
+
+    html, elements, _ = generate_html(args.nodes, args.depth, args.list_width, args.text_length, args.seed)
+    print(f"document: {elements} elements, {len(html) / 1e6:.1f} MB of HTML")
+    results = {}
+    for name in [n.strip() for n in args.variants.split(",") if n.strip()]:
+        r = results[name] = measure(name, html)
+        print(f"{name:10} {r['nodes']:9d} nodes  {r['bytes_per_node']:7.1f} B/node  "
+              f"retained {r['retained_bytes'] / 1e6:8.1f} MB  peak {r['peak_bytes'] / 1e6:8.1f} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"elements": elements, "html_bytes": len(html), "results": results}, f, indent=2)
+        print(f"results -> {args.output}")
+
+if __name__ == "__main__":
+    main()
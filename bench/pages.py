@@ -0,0 +1,167 @@
+"""Synthetic page generator.
+
+A page is a run of "chunks": a chain of `depth` nested <div>s whose innermost
+div holds a heading, a paragraph with an inline <span> and a list of
+`list_width` items. Chunks are repeated until the page has about `nodes`
+elements. Classes come from a small pool and every few elements get an id,
+so the stylesheet's class and id selectors actually match.
+
+The stylesheet has `rules` rules whose selectors are drawn according to
+`selector_mix`, a {kind: weight} mapping over SELECTOR_KINDS.
+"""
+import argparse
+import os
+import random
+
+SELECTOR_KINDS = ("tag", "class", "id", "compound")
+DEFAULT_MIX = {"tag": 0.3, "class": 0.4, "id": 0.2, "compound": 0.1}
+
+TAGS = ("div", "h2", "p", "span", "ul", "li")
+CLASS_POOL = 40
+ID_EVERY = 7
+
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+          "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+          "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo").split()
+
+_DECLARATIONS = (
+    ("color", ("black", "#333", "navy", "darkred", "#0a0")),
+    ("background-color", ("#fff", "#f0f0f0", "lightyellow", "#eef")),
+    ("margin-top", ("0px", "2px", "4px", "8px")),
+    ("margin-bottom", ("0px", "4px", "8px", "12px")),
+    ("margin-left", ("0px", "4px", "10px")),
+    ("padding-top", ("0px", "2px", "4px")),
+    ("padding-left", ("0px", "4px", "6px")),
+    ("font-size", ("12px", "14px", "16px", "18px")),
+    ("border-width", ("0px", "1px", "2px")),
+)
+
+def _text(rng, length):
+    out, size = [], 0
+    while size < length:
+        word = rng.choice(_WORDS)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)
+
+def generate_html(nodes=2000, depth=6, list_width=10, text_length=60, seed=0):
+    """Return (html, element_count, ids)."""
+    rng = random.Random(seed)
+    parts = ["<html><head><title>bench</title></head><body>"]
+    count = 3
+    ids = []
+
+    def attrs():
+        nonlocal count
+        count += 1
+        a = f' class="c{rng.randrange(CLASS_POOL)}"' if rng.random() < 0.6 else ""
+        if count % ID_EVERY == 0:
+            ids.append(f"n{count}")
+            a += f' id="n{count}"'
+        return a
+
+    chunk = 0
+    while count < nodes:
+        for _ in range(depth):
+            parts.append(f"<div{attrs()}>")
+        parts.append(f"<h2{attrs()}>Section {chunk}</h2>")
+        parts.append(f"<p{attrs()}>{_text(rng, text_length)} <span{attrs()}>{_text(rng, 12)}</span></p>")
+        parts.append(f"<ul{attrs()}>")
+        for _ in range(list_width):
+            parts.append(f"<li{attrs()}>{_text(rng, text_length // 2)}</li>")
+        parts.append("</ul>")
+        parts.append("</div>" * depth)
+        chunk += 1
+    parts.append("</body></html>")
+    return "\n".join(parts), count, ids
+
+def _selector(rng, kind, ids):
+    if kind == "tag":
+        return rng.choice(TAGS)
+    if kind == "class":
+        return f".c{rng.randrange(CLASS_POOL)}"
+    if kind == "id":
+        return f"#{rng.choice(ids)}" if ids else f"#n{rng.randrange(1000)}"
+    if kind == "compound":
+        return f"{rng.choice(TAGS)}.c{rng.randrange(CLASS_POOL)}"
+    raise ValueError(f"unknown selector kind {kind!r}")
+
+def generate_css(rules=100, selector_mix=None, ids=(), seed=0):
+    rng = random.Random(seed + 1)
+    mix = selector_mix or DEFAULT_MIX
+    kinds = [k for k in mix if mix[k] > 0]
+    weights = [mix[k] for k in kinds]
+    out = []
+    for _ in range(rules):
+        kind = rng.choices(kinds, weights)[0]
+        decls = rng.sample(_DECLARATIONS, rng.randint(1, 4))
+        body = "; ".join(f"{name}: {rng.choice(values)}" for name, values in decls)
+        out.append(f"{_selector(rng, kind, ids)} {{ {body}; }}")
+    return "\n".join(out)
+
+def parse_mix(text):
+    """"tag=3,class=4,id=2" -> {"tag": 3.0, "class": 4.0, "id": 2.0}"""
+    mix = {}
+    for part in (text or "").split(","):
+        if not part.strip():
+            continue
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in SELECTOR_KINDS:
+            raise ValueError(f"unknown selector kind {kind!r} (expected one of {', '.join(SELECTOR_KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix or dict(DEFAULT_MIX)
+
+class Page:
+    """A generated page and the parameters that produced it."""
+    def __init__(self, nodes=2000, depth=6, list_width=10, text_length=60,
+                 rules=100, selector_mix=None, seed=0):
+        self.params = {
+            "nodes": nodes, "depth": depth, "list_width": list_width,
+            "text_length": text_length, "rules": rules,
+            "selector_mix": dict(selector_mix or DEFAULT_MIX), "seed": seed,
+        }
+        self.html, self.elements, ids = generate_html(nodes, depth, list_width, text_length, seed)
+        self.css = generate_css(rules, self.params["selector_mix"], ids, seed)
+
+    def describe(self):
+        return dict(self.params, elements=self.elements,
+                    html_bytes=len(self.html.encode("utf-8")),
+                    css_bytes=len(self.css.encode("utf-8")))
+
+    def write(self, out_dir, name="page"):
+        """Write NAME.html (linking NAME.css) and NAME.css; returns the html path."""
+        os.makedirs(out_dir, exist_ok=True)
+        html_path = os.path.join(out_dir, name + ".html")
+        html = self.html.replace("</head>", f'<link rel="stylesheet" href="{name}.css"></head>', 1)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(os.path.join(out_dir, name + ".css"), "w", encoding="utf-8") as f:
+            f.write(self.css)
+        return html_path
+
+def add_page_arguments(ap):
+    ap.add_argument("--nodes", type=int, default=2000, help="approximate element count")
+    ap.add_argument("--depth", type=int, default=6, help="nested <div>s per chunk")
+    ap.add_argument("--list-width", type=int, default=10, help="<li> per list")
+    ap.add_argument("--text-length", type=int, default=60, help="characters per paragraph")
+    ap.add_argument("--rules", type=int, default=100, help="stylesheet rules")
+    ap.add_argument("--selector-mix", default="", help='weights, e.g. "tag=3,class=4,id=2,compound=1"')
+    ap.add_argument("--seed", type=int, default=0)
+
+def page_from_args(args):
+    return Page(args.nodes, args.depth, args.list_width, args.text_length,
+                args.rules, parse_mix(args.selector_mix), args.seed)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic benchmark page (HTML + CSS).")
+    add_page_arguments(ap)
+    ap.add_argument("-o", "--out-dir", default=".")
+    ap.add_argument("--name", default="page")
+    args = ap.parse_args(argv)
+    page = page_from_args(args)
+    path = page.write(args.out_dir, args.name)
+    print(f"{path}: {page.describe()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Time each pipeline stage for each variant on a generated page.
+
+For every (variant, stage) the stage runs `--warmup` times untimed, then
+`--repeat` timed runs; the median gives ops/sec and nodes/sec. One more run
+under tracemalloc gives the stage's peak allocation. Results (with the page
+parameters and the environment) are written as JSON; --compare prints the
+speedup between two such files.
+
+    python -m bench.run --nodes 5000 --rules 300 -o after.json
+    python -m bench.run --compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from bench import variants
+from bench.pages import add_page_arguments, page_from_args
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=variants.ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def measure(fn, repeat=5, warmup=1):
+    """Median/min wall time of fn() and its tracemalloc peak in bytes."""
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return {"median_s": statistics.median(times), "min_s": min(times), "peak_bytes": peak}
+
+def run(page, names=variants.VARIANTS, repeat=5, warmup=1, log=print):
+    elements = page.elements
+    results = {}
+    for name in names:
+        results[name] = per_stage = {}
+        try:
+            stage_list = variants.stages(name, page)
+        except Exception as e:
+            per_stage["setup"] = {"error": f"{type(e).__name__}: {e}"}
+            log(f"{name:6} setup failed: {type(e).__name__}: {e}")
+            continue
+        for stage, fn in stage_list:
+            try:
+                r = measure(fn, repeat, warmup)
+            except variants.Unavailable as e:
+                per_stage[stage] = {"skipped": str(e)}
+                log(f"{name:6} {stage:8} skipped: {e}")
+                continue
+            except RecursionError:
+                per_stage[stage] = {"error": "RecursionError"}
+                log(f"{name:6} {stage:8} RecursionError")
+                continue
+            except Exception as e:
+                per_stage[stage] = {"error": f"{type(e).__name__}: {e}"}
+                log(f"{name:6} {stage:8} error: {type(e).__name__}: {e}")
+                continue
+            median = r["median_s"]
+            r["ops_per_sec"] = 1.0 / median if median > 0 else None
+            r["nodes_per_sec"] = elements / median if median > 0 else None
+            per_stage[stage] = r
+            log(f"{name:6} {stage:8} {median * 1000:10.2f} ms  {r['ops_per_sec']:9.2f} ops/s  "
+                f"{r['nodes_per_sec']:12.0f} nodes/s  peak {r['peak_bytes'] / 1024:10.1f} KiB")
+    return results
+
+def report(page, results, repeat, warmup):
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "git": _git_revision(),
+            "repeat": repeat,
+            "warmup": warmup,
+        },
+        "page": page.describe(),
+        "results": results,
+    }
+
+def compare(before, after, log=print):
+    """Print per-stage median times of two result files and the speedup."""
+    if before["page"] != after["page"]:
+        log("warning: the two runs used different pages")
+    log(f"{'variant':7} {'stage':8} {'before ms':>11} {'after ms':>11} {'speedup':>8}")
+    for name, stages in after["results"].items():
+        old_stages = before["results"].get(name, {})
+        for stage, new in stages.items():
+            old = old_stages.get(stage, {})
+            if "median_s" not in new or "median_s" not in old:
+                log(f"{name:7} {stage:8} {'-':>11} {'-':>11} {'n/a':>8}")
+                continue
+            a, b = old["median_s"], new["median_s"]
+            log(f"{name:7} {stage:8} {a * 1000:11.2f} {b * 1000:11.2f} {a / b if b else float('inf'):7.2f}x")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the parse/css/cascade/layout/paint stages.")
+    add_page_arguments(ap)
+    ap.add_argument("--variants", default=",".join(variants.VARIANTS),
+                    help="comma-separated subset of " + ",".join(variants.VARIANTS))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--warmup", type=int, default=1)
+    ap.add_argument("-o", "--output", help="write the JSON results here")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            before = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            after = json.load(f)
+        compare(before, after)
+        return 0
+
+    page = page_from_args(args)
+    names = [n.strip() for n in args.variants.split(",") if n.strip()]
+    print(f"page: {page.describe()}")
+    results = run(page, names, args.repeat, args.warmup)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report(page, results, args.repeat, args.warmup), f, indent=2)
+        print(f"results -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
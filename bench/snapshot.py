@@ -0,0 +1,98 @@
+"""Cold vs warm page loads through the snapshot cache.
+
+Writes a generated page (HTML + linked stylesheet) to a temp directory and
+loads it with the root pipeline:
+
+  cold   read, parse, load the CSS, run scripts, cascade; then store the
+         snapshot (timed separately)
+  warm   read, hash, restore the snapshot (DOM, computed styles, rules)
+
+Both are then laid out and painted; the display lists must match (up to
+item keys, which hold node ids),
+and the warm one must not have run the cascade again.
+
+    python -m bench.snapshot                     # 100k elements
+    python -m bench.snapshot --nodes 300000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from bench import variants
+from bench.pages import add_page_arguments, page_from_args
+
+def _median(fn, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Snapshot cache: cold vs warm loads.")
+    add_page_arguments(ap)
+    ap.set_defaults(nodes=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    mods = variants.load("root", "page", "render", "css_parser", "snapshot", "headless")
+    page_mod, render, snapshot = mods["page"], mods["render"], mods["snapshot"]
+    CSSParser = mods["css_parser"].CSSParser
+    metrics = mods["headless"].AdvanceTableMetrics()
+    page = page_from_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = page.write(os.path.join(tmp, "site"))
+        base_dir = os.path.dirname(path)
+        cache = snapshot.SnapshotCache(os.path.join(tmp, "snapshots"))
+        print(f"page: {os.path.getsize(path) / 1e6:.1f} MB HTML, {page.elements} elements, "
+              f"{args.rules} rules")
+
+        def cold():
+            parser = CSSParser()
+            dom = page_mod.load_page(page_mod.read_file(path), parser, base_dir)
+            render._apply_css(dom, parser.index)
+            return dom, parser
+
+        def warm():
+            parser = CSSParser()
+            return cache.load(page_mod.read_file(path), base_dir, parser), parser
+
+        cold_s, (dom, parser) = _median(cold, args.repeat)
+        store_s, snap = _median(lambda: cache.store(page_mod.read_file(path), base_dir, dom, parser),
+                                args.repeat)
+        warm_s, (warm_dom, warm_parser) = _median(warm, args.repeat)
+        assert warm_dom is not None, "snapshot missed"
+
+        layout_cold, (_, cold_cmds, _) = _median(
+            lambda: render.paint_page(dom, parser.index, 800, 600, metrics), 1)
+        calls = 0
+        compute_style = render._compute_style
+
+        def counting(node, index, *args):
+            nonlocal calls
+            calls += 1
+            compute_style(node, index, *args)
+
+        render._compute_style = counting
+        try:
+            layout_warm, (_, warm_cmds, _) = _median(
+                lambda: render.paint_page(warm_dom, warm_parser.index, 800, 600, metrics), 1)
+        finally:
+            render._compute_style = compute_style
+        # Item keys hold id(node): compare everything else
+        same = ([(c.kind, c.coords, c.options) for c in cold_cmds]
+                == [(c.kind, c.coords, c.options) for c in warm_cmds])
+
+        print(f"snapshot: {os.path.getsize(snap) / 1e6:.1f} MB on disk, store {store_s * 1000:.0f} ms")
+        print(f"cold load (parse + css + scripts + cascade) {cold_s * 1000:8.0f} ms")
+        print(f"warm load (snapshot restore)                {warm_s * 1000:8.0f} ms  "
+              f"({cold_s / warm_s:.1f}x faster)")
+        print(f"layout + paint after cold {layout_cold * 1000:.0f} ms, after warm {layout_warm * 1000:.0f} ms; "
+              f"styles recomputed on warm: {calls}; display lists identical: {same}")
+
+if __name__ == "__main__":
+    main()
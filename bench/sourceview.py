@@ -0,0 +1,62 @@
+"""Showing a large page source: whole-text tk.Text vs the windowed SourceView.
+
+Times what SourceView does outside Tk (indexing the lines, cutting one
+screen of text, and a scroll through the whole document page by page). With
+a display, it also times inserting the full source into a tk.Text against
+SourceView.set_text; without one that part is reported as skipped.
+
+    python -m bench.sourceview --nodes 200000
+"""
+import argparse
+import time
+
+from bench import variants
+from bench.pages import add_page_arguments, page_from_args
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Large-source viewer timings.")
+    add_page_arguments(ap)
+    ap.set_defaults(nodes=200_000)
+    ap.add_argument("--lines", type=int, default=40, help="visible lines")
+    args = ap.parse_args(argv)
+
+    source_view = variants.load("root", "source_view")["source_view"]
+    html = page_from_args(args).html
+    print(f"source: {len(html) / 1e6:.1f} MB, {html.count(chr(10)) + 1} lines")
+
+    started = time.perf_counter()
+    index = source_view.LineIndex(html)
+    print(f"LineIndex          {(time.perf_counter() - started) * 1000:8.1f} ms  ({len(index)} display lines)")
+    started = time.perf_counter()
+    pages = 0
+    for top in range(0, len(index), args.lines):
+        index.lines(top, args.lines)
+        pages += 1
+    elapsed = time.perf_counter() - started
+    print(f"window extraction  {elapsed / pages * 1e6:8.1f} us/page over {pages} pages")
+
+    try:
+        canvas = variants.tk_canvas()
+    except variants.Unavailable as e:
+        print(f"tk.Text comparison skipped: {e}")
+        return
+    import tkinter as tk
+    root = canvas.winfo_toplevel()
+    text = tk.Text(root, height=args.lines)
+    started = time.perf_counter()
+    text.insert(tk.END, html)
+    text.update_idletasks()
+    print(f"tk.Text full insert  {(time.perf_counter() - started) * 1000:8.1f} ms")
+    view = source_view.SourceView(root, height=args.lines)
+    started = time.perf_counter()
+    view.set_text(html)
+    view.update_idletasks()
+    print(f"SourceView.set_text  {(time.perf_counter() - started) * 1000:8.1f} ms")
+    started = time.perf_counter()
+    for _ in range(100):
+        view.scroll_pages(1)
+    view.update_idletasks()
+    print(f"SourceView page down {(time.perf_counter() - started) * 10:8.2f} ms/page")
+
+if __name__ == "__main__":
+    main()
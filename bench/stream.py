@@ -0,0 +1,70 @@
+"""Time to first paint with streaming parsing, against the full load.
+
+Writes a generated page to a temp directory, then loads it with the root
+pipeline onto an in-memory surface, both ways:
+
+  whole     read the file, parse, style, lay out and paint at once
+  streamed  read_chunks + load_page_streaming, painting the first screen as
+            soon as first_screen_ready() says it is complete
+
+    python -m bench.stream --nodes 60000      # a few MB of HTML
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench import variants
+from bench.pages import add_page_arguments, page_from_args
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Streaming vs whole-document first paint.")
+    add_page_arguments(ap)
+    ap.set_defaults(nodes=60000)
+    ap.add_argument("--chunk-size", type=int, default=64 * 1024)
+    ap.add_argument("--height", type=int, default=600)
+    args = ap.parse_args(argv)
+
+    mods = variants.load("root", "page", "render", "css_parser", "headless")
+    page_mod, render, css_parser = mods["page"], mods["render"], mods["css_parser"]
+    page = page_from_args(args)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = page.write(tmp)
+        size_mb = os.path.getsize(path) / 1e6
+        base_dir = os.path.dirname(path)
+        print(f"page: {size_mb:.1f} MB, {page.elements} elements")
+
+        surface = mods["headless"].MemorySurface(800, args.height)
+        parser = css_parser.CSSParser()
+        started = time.perf_counter()
+        dom = page_mod.load_page(page_mod.read_file(path), parser, base_dir)
+        render.render_layout(surface, dom, parser.index)
+        whole = time.perf_counter() - started
+        print(f"whole:    first paint = complete = {whole * 1000:8.0f} ms")
+
+        surface = mods["headless"].MemorySurface(800, args.height)
+        parser = css_parser.CSSParser()
+        first_paint = None
+        started = time.perf_counter()
+
+        def on_partial(partial, open_nodes):
+            nonlocal first_paint
+            if not render.first_screen_ready(surface, partial, parser.index, open_nodes):
+                return False
+            render.render_layout(surface, partial, parser.index)
+            first_paint = time.perf_counter() - started
+            return True
+
+        dom = page_mod.load_page_streaming(page_mod.read_chunks(path, args.chunk_size),
+                                           parser, base_dir, on_partial)
+        render.render_layout(surface, dom, parser.index)
+        total = time.perf_counter() - started
+        if first_paint is None:
+            print(f"streamed: no early paint, complete = {total * 1000:8.0f} ms")
+        else:
+            print(f"streamed: first paint {first_paint * 1000:8.0f} ms, complete {total * 1000:8.0f} ms "
+                  f"({first_paint / total:.1%} of the load)")
+
+if __name__ == "__main__":
+    main()
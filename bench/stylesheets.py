@@ -0,0 +1,76 @@
+"""Page loads sharing stylesheets, with and without a StylesheetCache.
+
+Writes --pages small pages to a temporary directory, all linking the same
+generated framework-style sheet (--css-kb) and each with a <style> block of
+its own, then loads every page with page.load_page and builds its
+RuleIndex, as the first paint does:
+
+  uncached   every sheet parsed on every load (the previous behaviour)
+  memory     one StylesheetCache shared by all loads
+  disk       a fresh cache per load over a warm on-disk tier, as a new
+             process would see it
+
+and checks that every page ends up with the same rules either way.
+
+    python -m bench.stylesheets
+    python -m bench.stylesheets --pages 200 --css-kb 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench import variants
+from bench.css import _framework
+
+def _write_site(directory, pages, css_kb):
+    with open(os.path.join(directory, "site.css"), "w", encoding="utf-8") as f:
+        f.write(_framework(css_kb * 1024))
+    paths = []
+    for i in range(pages):
+        path = os.path.join(directory, f"page{i}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f'<html><head><link rel="stylesheet" href="site.css">'
+                    f'<style>.page{i % 10} {{ color: red }} h1 {{ margin: 0 }}</style></head>'
+                    f'<body><h1 class="page{i % 10}">Page {i}</h1><p>text</p></body></html>')
+        paths.append(path)
+    return paths
+
+def _load_all(page, css_parser, paths, cache_for):
+    started = time.perf_counter()
+    rules = []
+    for path in paths:
+        parser = css_parser.CSSParser()
+        page.load_page(page.read_file(path), parser, os.path.dirname(path), stylesheets=cache_for())
+        parser.index  # compiled as the first paint would
+        rules.append(parser.rules)
+    return time.perf_counter() - started, rules
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stylesheet parse cache across page loads.")
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--css-kb", type=int, default=500, help="size of the shared stylesheet")
+    args = ap.parse_args(argv)
+
+    mods = variants.load("root", "page", "css_parser", "stylesheet_cache")
+    page, css_parser, stylesheet_cache = mods["page"], mods["css_parser"], mods["stylesheet_cache"]
+
+    with tempfile.TemporaryDirectory() as site, tempfile.TemporaryDirectory() as disk:
+        paths = _write_site(site, args.pages, args.css_kb)
+        print(f"{args.pages} pages linking one {args.css_kb} kB stylesheet")
+
+        uncached, expected = _load_all(page, css_parser, paths, lambda: None)
+        shared = stylesheet_cache.StylesheetCache()
+        memory, memory_rules = _load_all(page, css_parser, paths, lambda: shared)
+        stylesheet_cache.StylesheetCache(directory=disk).parse_file(os.path.join(site, "site.css"))
+        on_disk, disk_rules = _load_all(page, css_parser, paths,
+                                        lambda: stylesheet_cache.StylesheetCache(directory=disk))
+
+        for name, elapsed in (("uncached", uncached), ("memory", memory), ("disk", on_disk)):
+            print(f"{name:9} {elapsed * 1000:9.1f} ms  {elapsed / args.pages * 1000:7.2f} ms/page  "
+                  f"({uncached / elapsed:5.1f}x)")
+        print(f"memory cache: {shared.hits} hits, {shared.misses} misses; "
+              f"same rules: {memory_rules == expected and disk_rules == expected}")
+
+if __name__ == "__main__":
+    main()
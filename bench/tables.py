@@ -0,0 +1,146 @@
+"""The cascade on a long table, with and without shared computed styles.
+
+The page is one table of --rows rows (<tr class="row odd|even">) of --cols
+cells, styled by a few rules on tags and classes, plus, with --combinators,
+rules like `table tr.odd > td`. Rows and cells only come in a handful of
+signatures, so the root and step4 cascades compute each style once and
+share it; they are timed against the same cascade with that memo defeated
+(root) or against a copy of the previous per-node loop (step4), and the
+memory the computed styles keep (tracemalloc) is compared too.
+
+    python -m bench.tables
+    python -m bench.tables --rows 100000 --combinators
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bench import variants
+
+def generate_html(rows, cols):
+    cells = "".join(f'<td class="cell c{j % 3}">v{j}</td>' for j in range(cols))
+    body = "".join(f'<tr class="row {"odd" if i % 2 else "even"}">{cells}</tr>' for i in range(rows))
+    return f'<html><body><table class="grid"><tbody>{body}</tbody></table></body></html>'
+
+def generate_css(combinators):
+    css = ("table { margin: 4px } tr { height: 20px } .odd { background: #eee } "
+           ".even { background: white } td { padding: 2px } .c0 { color: red } "
+           ".cell { font-size: 12px } #footer { color: gray }")
+    if combinators:
+        css += (" table tr.odd > td { color: blue } .grid .even .c1 { color: green }"
+                " ul > li { margin: 0 } .missing td { color: black }")
+    return css
+
+def _never_hit(memo_class):
+    class NoMemo(memo_class):
+        __slots__ = ()
+
+        def __init__(self, index):
+            super().__init__(index)
+            self.styles = _Forgetful()
+    return NoMemo
+
+class _Forgetful(dict):
+    def get(self, key, default=None):
+        return default
+
+def legacy_step4_apply(css_parser, dom_root, cascade):
+    """step4's apply_css_to_dom before computed styles were shared: one
+    new dict per element."""
+    entries = cascade.entries
+    class_sets = {}
+    ancestors = css_parser.AncestorFilter() if cascade.has_combinators else None
+
+    def style(node):
+        if not getattr(node, 'styles', None):
+            node.styles = {}
+        styles = node.styles
+        tag = (node.tag or '').lower()
+        attrs = getattr(node, 'attributes', {}) or {}
+        element_id = attrs.get('id')
+        classes = css_parser._class_set(attrs, class_sets)
+        for sel_tag, sel_id, sel_classes, decls, chained in entries:
+            if ((sel_tag is None or sel_tag == tag)
+                    and (sel_id is None or sel_id == element_id)
+                    and sel_classes <= classes
+                    and (chained is None
+                         or (ancestors.may_contain(chained.ancestor_hashes)
+                             and css_parser._match_chain(node, chained.chain, 0, class_sets)))):
+                styles.update(decls)
+        return tag, element_id, classes
+
+    def enter(node, _):
+        keys = style(node)
+        return ancestors.push(*keys) if ancestors is not None and node.children else None
+
+    def leave(node, hashes, _):
+        if hashes:
+            ancestors.pop(hashes)
+
+    css_parser.walk(dom_root, enter, leave)
+
+def _measure(parse, cascade, preorder):
+    """Time of cascade(dom) on a fresh DOM, then on another one the memory
+    it leaves allocated (tracemalloc would skew the timing), and the styles."""
+    dom = parse()
+    started = time.perf_counter()
+    cascade(dom)
+    elapsed = time.perf_counter() - started
+    styles = [sorted(n.styles.items()) for n in preorder(dom)]
+
+    dom = parse()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        cascade(dom)
+        gc.collect()
+        kept = tracemalloc.get_traced_memory()[0] - base
+    finally:
+        tracemalloc.stop()
+    return elapsed, kept, styles
+
+def _root(html, css):
+    mods = variants.load("root", "html_parser", "css_parser", "render", "traversal")
+    css_parser, render = mods["css_parser"], mods["render"]
+    parser = css_parser.CSSParser()
+    parser.parse_css(css)
+    parse = lambda: mods["html_parser"].parse_html(html)
+    apply = lambda dom: render._apply_css(dom, css_parser.RuleIndex(parser.rules))
+    shared = _measure(parse, apply, mods["traversal"].preorder)
+    real = render._StyleMemo
+    render._StyleMemo = _never_hit(real)
+    try:
+        per_node = _measure(parse, apply, mods["traversal"].preorder)
+    finally:
+        render._StyleMemo = real
+    return shared, per_node
+
+def _step4(html, css):
+    mods = variants.load("step4", "html_parser", "css_parser", "traversal")
+    css_parser = mods["css_parser"]
+    cascade = css_parser.Cascade(css_parser.CSSParser().parse_css(css))
+    parse = lambda: mods["html_parser"].parse_html(html)[0]
+    preorder = mods["traversal"].preorder
+    shared = _measure(parse, lambda dom: css_parser.apply_css_to_dom(dom, cascade), preorder)
+    per_node = _measure(parse, lambda dom: legacy_step4_apply(css_parser, dom, cascade), preorder)
+    return shared, per_node
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Shared computed styles on a long table.")
+    ap.add_argument("--rows", type=int, default=20000)
+    ap.add_argument("--cols", type=int, default=4)
+    ap.add_argument("--combinators", action="store_true", help="add descendant/child rules")
+    args = ap.parse_args(argv)
+
+    html, css = generate_html(args.rows, args.cols), generate_css(args.combinators)
+    print(f"{args.rows} rows x {args.cols} cells, combinators: {args.combinators}")
+    for name, run in (("root", _root), ("step4", _step4)):
+        (shared, shared_kb, expected), (per_node, per_node_kb, styles) = run(html, css)
+        print(f"{name:5}  shared {shared * 1000:8.1f} ms {shared_kb / 1024:9.0f} kB   "
+              f"per node {per_node * 1000:8.1f} ms {per_node_kb / 1024:9.0f} kB   "
+              f"({per_node / shared:4.1f}x)   same styles: {styles == expected}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Load the root pipeline and the step copies side by side.
+
+Every step directory is a flat set of modules with the same names
+(html_parser, css_parser, layout, render...) importing each other by those
+names. load() imports one directory's modules with that directory first on
+sys.path and hands them back without leaving them in sys.modules, so the
+variants do not see each other's modules.
+
+stages(name, page) returns the benchmarkable stages of one variant as
+(stage, callable) pairs. Inputs of a stage (the parsed DOM, the rules...)
+are produced once beforehand, so each callable times just its stage.
+"""
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VARIANTS = ("root", "step4", "step5", "step6", "step7")
+STAGES = ("parse", "css", "cascade", "layout", "paint")
+
+_MODULE_NAMES = ("html_parser", "css_parser", "layout", "render", "painter", "fonts",
+                 "resize", "page", "headless", "js_interpreter", "js_runtime", "browser",
+                 "traversal", "snapshot", "source_view", "stylesheet_cache")
+_loaded = {}
+
+class Unavailable(Exception):
+    """The stage cannot run here (e.g. it needs a display); reported as skipped."""
+
+def load(name, *modules):
+    """Import `modules` from variant `name`; returns {module name: module}."""
+    cache = _loaded.setdefault(name, {})
+    missing = [m for m in modules if m not in cache]
+    if missing:
+        path = ROOT if name == "root" else os.path.join(ROOT, name)
+        saved = {m: sys.modules.pop(m) for m in _MODULE_NAMES if m in sys.modules}
+        for m, mod in cache.items():
+            sys.modules[m] = mod
+        sys.path.insert(0, path)
+        try:
+            for m in missing:
+                cache[m] = importlib.import_module(m)
+            # Keep whatever the imports pulled in so later loads share them
+            for m in _MODULE_NAMES:
+                if m in sys.modules:
+                    cache.setdefault(m, sys.modules[m])
+        finally:
+            sys.path.remove(path)
+            for m in _MODULE_NAMES:
+                sys.modules.pop(m, None)
+            sys.modules.update(saved)
+    return {m: cache[m] for m in modules}
+
+_tk_root = None
+
+def tk_canvas(width=800, height=600):
+    """A real (withdrawn) Tk canvas, for renderers that measure through Tk."""
+    global _tk_root
+    import tkinter as tk
+    if _tk_root is None:
+        try:
+            _tk_root = tk.Tk()
+        except tk.TclError as e:
+            raise Unavailable(f"needs a display ({e})")
+        _tk_root.withdraw()
+    canvas = tk.Canvas(_tk_root, width=width, height=height)
+    canvas.update_idletasks()
+    return canvas
+
+def memory_surface(width=800, height=600):
+    return load("root", "headless")["headless"].MemorySurface(width, height)
+
+def count_nodes(root):
+    count, stack = 0, [root] if root is not None else []
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(getattr(node, "children", ()))
+    return count
+
+# -------- per-variant stages --------
+def _root_stages(page):
+    mods = load("root", "html_parser", "css_parser", "layout", "render", "headless")
+    html_parser, css_parser, render = mods["html_parser"], mods["css_parser"], mods["render"]
+    metrics = mods["headless"].AdvanceTableMetrics()
+
+    def parse_css():
+        parser = css_parser.CSSParser()
+        parser.parse_css(page.css)
+        return parser
+
+    dom = html_parser.parse_html(page.html)
+    rules = parse_css().rules
+    index = css_parser.RuleIndex(rules)
+    render._apply_css(dom, index)
+
+    def paint():
+        # styles are current for `index`, so this is measure + paint with a
+        # cold text-width cache: the cost of a first paint
+        render.reset_width_cache(clear_entries=True)
+        return render.paint_page(dom, index, 800, 600, metrics)
+
+    return [
+        ("parse", lambda: html_parser.parse_html(page.html)),
+        ("css", parse_css),
+        # a fresh index has a new generation, so every node is restyled
+        ("cascade", lambda: render._apply_css(dom, css_parser.RuleIndex(rules))),
+        ("layout", lambda: mods["layout"].build_layout_tree(dom)),
+        ("paint", paint),
+    ]
+
+def _french_step_stages(name, page, paint):
+    """step4-step6 share the (dom, errors) parser, CSSParser and layout API."""
+    mods = load(name, "html_parser", "css_parser", "layout")
+    html_parser, css_parser, layout = mods["html_parser"], mods["css_parser"], mods["layout"]
+
+    dom, _ = html_parser.parse_html(page.html)
+    rules = css_parser.CSSParser().parse_css(page.css)
+    css_parser.apply_css_to_dom(dom, rules)
+    stages = [
+        ("parse", lambda: html_parser.parse_html(page.html)),
+        ("css", lambda: css_parser.CSSParser().parse_css(page.css)),
+        ("cascade", lambda: css_parser.apply_css_to_dom(dom, rules)),
+        ("layout", lambda: layout.build_layout_tree(dom, viewport_width=800)),
+    ]
+    if paint:
+        stages.append(("paint", lambda: paint(name, layout.build_layout_tree(dom, viewport_width=800))))
+    return stages
+
+def _paint_on_surface(name, layout_root):
+    render = load(name, "render")["render"]
+    return render.render_layout(memory_surface(), layout_root)
+
+def _step7_stages(page):
+    mods = load("step7", "html_parser", "css_parser")
+    html_parser, css_parser = mods["html_parser"], mods["css_parser"]
+    dom = html_parser.parse_html(page.html)
+    rules = css_parser.CSSParser().parse_css(page.css)
+
+    def paint():
+        # step7 cascades inside render_layout and measures text on the canvas
+        canvas = tk_canvas()
+        try:
+            load("step7", "render")["render"].render_layout(canvas, dom, rules)
+        finally:
+            canvas.destroy()
+
+    return [
+        ("parse", lambda: html_parser.parse_html(page.html)),
+        ("css", lambda: css_parser.CSSParser().parse_css(page.css)),
+        ("paint", paint),
+    ]
+
+def stages(name, page):
+    if name == "root":
+        return _root_stages(page)
+    if name == "step4":
+        return _french_step_stages(name, page, paint=None)
+    if name in ("step5", "step6"):
+        return _french_step_stages(name, page, paint=_paint_on_surface)
+    if name == "step7":
+        return _step7_stages(page)
+    raise ValueError(f"unknown variant {name!r} (expected one of {', '.join(VARIANTS)})")
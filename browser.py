@@ -1,21 +1,36 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
+import json
 import os
+import time
 from urllib.parse import urlparse, unquote
 from urllib.request import url2pathname
 
-from html_parser import parse_html
 from css_parser import CSSParser
-from render import render_layout
-from js_interpreter import JSInterpreter
+from page import CHUNK_SIZE, load_page, load_page_streaming, read_file
+from render import first_screen_ready, render_layout, viewport_changed
+from resize import ResizeScheduler
+from snapshot import SnapshotCache
+from stylesheet_cache import StylesheetCache
+from source_view import SourceView
 
 
 class Browser:
-    def __init__(self, root):
+    def __init__(self, root, report=None):
+        """report(kind, stats), if given, is called with each page load's
+        timings ("load"), each resize drag's counts ("resize"), snapshot
+        failures ("snapshot_error") and stylesheet cache write failures
+        ("stylesheet_cache_error"); the latest of each is kept in self.stats."""
         self.root = root
         self.root.title("Mini Browser")
+        self.report = report
+        self.stats = {}
         self.current_dom = None
         self.css_parser = CSSParser()
+        self.snapshots = SnapshotCache()
+        # parsed CSS shared by every page loaded
+        self.stylesheets = StylesheetCache(on_error=lambda directory, e: self._report(
+            "stylesheet_cache_error", {"directory": directory, "error": str(e)}))
 
         # URL bar + load button
         top = tk.Frame(root)
@@ -26,22 +41,37 @@ class Browser:
         self.load_button = tk.Button(top, text="Load", command=self.load_url)
         self.load_button.pack(side=tk.LEFT, padx=4, pady=4)
 
-        # Source viewer
-        self.source_text = tk.Text(root, height=10)
-        self.source_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-
-        # Render surface
-        self.render_canvas = tk.Canvas(root, bg="white")
-        self.render_canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-
-        # Re-render on resize
-        self.render_canvas.bind("<Configure>", lambda e: self._rerender())
+        # Source viewer (only the visible lines live in Tk)
+        self.source_view = SourceView(root, height=10)
+        self.source_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        # Render surface (scrollable; items are created as they scroll into view)
+        render_frame = tk.Frame(root)
+        render_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.render_scroll = tk.Scrollbar(render_frame, orient=tk.VERTICAL)
+        self.render_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.render_canvas = tk.Canvas(render_frame, bg="white")
+        self.render_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.render_scroll.configure(command=self.render_canvas.yview)
+        self.render_canvas.configure(yscrollcommand=self._on_canvas_scroll)
+        self.render_canvas.bind("<MouseWheel>", self._on_mousewheel)
+        self.render_canvas.bind("<Button-4>", lambda e: self.render_canvas.yview_scroll(-3, "units"))
+        self.render_canvas.bind("<Button-5>", lambda e: self.render_canvas.yview_scroll(3, "units"))
+
+        # Re-render on resize, once per settled width
+        self.resize_scheduler = ResizeScheduler(
+            self.render_canvas, lambda w, h: self._rerender(), report=lambda drag: self._report("resize", drag))
+
+    # -------- scrolling --------
+    def _on_canvas_scroll(self, first, last):
+        self.render_scroll.set(first, last)
+        viewport_changed(self.render_canvas)
+
+    def _on_mousewheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        self.render_canvas.yview_scroll(step * 3, "units")
 
     # -------- path & file helpers --------
-    def _read_file(self, fp):
-        with open(fp, 'r', encoding='utf-8') as f:
-            return f.read()
-
     def _resolve_file_url(self, url):
         parsed = urlparse(url)
         path = url2pathname(unquote(parsed.path or ""))
@@ -50,24 +80,9 @@ class Browser:
             path = path[1:]
         return path if path else None
 
-    # -------- DOM utils --------
-    def _walk(self, node):
-        if node is None:
-            return
-        yield node
-        for child in getattr(node, "children", []) or []:
-            yield from self._walk(child)
-
-    def _find_all(self, node, tagname):
-        tagname = (tagname or "").lower()
-        for n in self._walk(node):
-            if getattr(n, "tag", "").lower() == tagname:
-                yield n
-
     # -------- main actions --------
     def load_url(self, event=None):
         url = self.url_entry.get().strip()
-        content = None
         file_path = None
 
         if not url:
@@ -78,7 +93,6 @@ class Browser:
                 return
             self.url_entry.delete(0, tk.END)
             self.url_entry.insert(0, f"file://{file_path}")
-            content = self._read_file(file_path)
 
         elif url.lower().startswith("file:"):
             path = self._resolve_file_url(url)
@@ -86,7 +100,6 @@ class Browser:
                 messagebox.showerror("Error", f"File not found:\n{url}")
                 return
             file_path = path
-            content = self._read_file(file_path)
 
         else:
             candidate = os.path.expanduser(url)
@@ -96,59 +109,88 @@ class Browser:
                 file_path = candidate
                 self.url_entry.delete(0, tk.END)
                 self.url_entry.insert(0, f"file://{file_path}")
-                content = self._read_file(file_path)
             else:
                 messagebox.showerror("Error", f"Not a file path:\n{url}")
                 return
 
-        self.source_text.delete(1.0, tk.END)
-        self.source_text.insert(tk.END, content)
-        self.render_content(content, base_dir=os.path.dirname(file_path) if file_path else None)
+        self.render_file(file_path)
 
     def _rerender(self):
         if self.current_dom is not None:
-            render_layout(self.render_canvas, self.current_dom, self.css_parser.rules)
+            render_layout(self.render_canvas, self.current_dom, self.css_parser.index)
+
+    def _report(self, kind, stats):
+        self.stats[kind] = stats
+        if self.report is not None:
+            self.report(kind, stats)
 
     def render_content(self, html_content, base_dir=None):
-        # Reset CSS between pages
-        self.css_parser.rules = []
-
-        # Parse HTML to DOM
-        self.current_dom = parse_html(html_content)
-
-        # Load local <link rel="stylesheet"> files
-        if base_dir:
-            for link in self._find_all(self.current_dom, "link"):
-                rel = (link.attributes.get("rel") or "").lower()
-                href = (link.attributes.get("href") or "").strip()
-                if rel == "stylesheet" and href and not href.lower().startswith(("http://", "https://")):
-                    css_path = href if os.path.isabs(href) else os.path.normpath(os.path.join(base_dir, href))
-                    if os.path.exists(css_path):
-                        try:
-                            self.css_parser.parse_css(self._read_file(css_path))
-                        except Exception as e:
-                            print(f"Failed to read CSS '{css_path}': {e}")
-
-        # Inline <style> blocks
-        for style_node in self._find_all(self.current_dom, "style"):
-            css_text = style_node.text or ""
-            if css_text.strip():
-                self.css_parser.parse_css(css_text)
-
-        # Execute very simple inline <script> blocks
-        interpreter = JSInterpreter(self.current_dom)
-        for script_node in self._find_all(self.current_dom, "script"):
-            js = (script_node.text or "").strip()
-            if js:
-                try:
-                    interpreter.execute(js)
-                except Exception as e:
-                    print(f"Script error: {e}")
+        # Parse, load the page's CSS and run its scripts
+        self.current_dom = load_page(html_content, self.css_parser, base_dir, stylesheets=self.stylesheets)
 
         # Render
-        self.render_canvas.delete("all")
-        render_layout(self.render_canvas, self.current_dom, self.css_parser.rules)
+        self.render_canvas.yview_moveto(0)
+        render_layout(self.render_canvas, self.current_dom, self.css_parser.index)
+        self.resize_scheduler.mark_rendered(self.render_canvas.winfo_width(),
+                                            self.render_canvas.winfo_height())
+
+    def _show_source(self, html):
+        # The DOM and CSSOM dumps are only built if their section is opened
+        self.source_view.set_sections([
+            ("Source", html),
+            ("DOM", lambda: repr(self.current_dom) if self.current_dom is not None else ""),
+            ("CSSOM", lambda: json.dumps([r.to_dict() for r in self.css_parser.rules], indent=2)),
+        ])
+
+    def render_file(self, file_path):
+        """Show a page from its snapshot if it was opened before with the same
+        HTML and stylesheets. Otherwise stream it in chunk by chunk: the first
+        screen is painted as soon as its content is complete, the whole page
+        once parsing ends, and the styled page is then snapshotted."""
+        canvas = self.render_canvas
+        started = time.perf_counter()
+        base_dir = os.path.dirname(file_path)
+        html = read_file(file_path)
+        self.source_view.clear()
+        canvas.yview_moveto(0)
+
+        dom = self.snapshots.load(html, base_dir, self.css_parser)
+        if dom is not None:
+            self.current_dom = dom
+            render_layout(canvas, dom, self.css_parser.index)
+            self.resize_scheduler.mark_rendered(canvas.winfo_width(), canvas.winfo_height())
+            self._show_source(html)
+            self._report("load", {"file": file_path, "snapshot": True, "first_paint": None,
+                                  "total": time.perf_counter() - started})
+            return
 
+        first_paint = None
+
+        def on_partial(dom, open_nodes):
+            nonlocal first_paint
+            if not first_screen_ready(canvas, dom, self.css_parser.index, open_nodes):
+                return False
+            self.current_dom = dom
+            render_layout(canvas, dom, self.css_parser.index)
+            canvas.update_idletasks()
+            first_paint = time.perf_counter() - started
+            return True
+
+        chunks = (html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE))
+        self.current_dom = load_page_streaming(chunks, self.css_parser, base_dir, on_partial,
+                                                stylesheets=self.stylesheets)
+        render_layout(canvas, self.current_dom, self.css_parser.index)
+        self.resize_scheduler.mark_rendered(canvas.winfo_width(), canvas.winfo_height())
+        total = time.perf_counter() - started
+        self._show_source(html)
+
+        self._report("load", {"file": file_path, "snapshot": False, "first_paint": first_paint,
+                              "total": total})
+        if self.current_dom is not None:
+            try:
+                self.snapshots.store(html, base_dir, self.current_dom, self.css_parser)
+            except OSError as e:
+                self._report("snapshot_error", {"file": file_path, "error": str(e)})
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -1,41 +1,536 @@
+import itertools
 import re
+from array import array
+
+# Every change to a rule set gets a new, process-unique generation number.
+# Nodes remember the generation their styles were computed for.
+_generations = itertools.count(1)
 
 class CSSParser:
+    """A page's rules, kept as the sequence of its stylesheets.
+
+    Each sheet is a tuple of Rule. Sheets from a StylesheetCache are shared
+    between pages: add_sheet() puts one in the cascade without copying it.
+    """
     def __init__(self):
-        self.rules = []
+        self._sheets = []
+        self._rules = None  # flattened view, built on demand
+        self._index = None
+        self.generation = next(_generations)
+
+    @property
+    def rules(self):
+        """Every rule of every sheet, in cascade order."""
+        if self._rules is None:
+            self._rules = [rule for sheet in self._sheets for rule in sheet]
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._sheets = [tuple(rules)] if rules else []
+        self._changed()
+
+    @property
+    def sheets(self):
+        return self._sheets
+
+    def _changed(self):
+        self._rules = None
+        self._index = None
+        self.generation = next(_generations)
+
+    @property
+    def legacy_rules(self):
+        """Per-selector view for older code that expects a single 'selector':
+           [{'selector': 'h1', 'style': {...}}, {'selector': '.btn', ...}]"""
+        return [{'selector': sel, 'style': rule.style}
+                for sheet in self._sheets for rule in sheet for sel in rule.selectors]
+
+    @property
+    def index(self):
+        """The rules compiled into a RuleIndex (rebuilt after each change;
+        the selectors of each sheet are only parsed once)."""
+        if self._index is None:
+            for sheet in self._sheets:
+                compile_rules(sheet)
+            self._index = RuleIndex(itertools.chain.from_iterable(self._sheets),
+                                    generation=self.generation)
+        return self._index
 
     def parse_css(self, css_content):
-        """Parse very simple CSS into rules:
-           {'selectors': ['h1', '.btn'], 'style': {'color':'red'}}"""
+        """Parse CSS and append its rules as a new sheet (see parse_stylesheet)."""
         if not css_content:
             return self.rules
+        self.add_sheet(tuple(parse_stylesheet(css_content)))
+        return self.rules
+
+    def add_sheet(self, rules):
+        """Append an already parsed sheet (a tuple of Rule, shared, not copied)."""
+        if rules:
+            self._sheets.append(rules)
+            self._changed()
+
+class Rule:
+    """One style rule: a tuple of selectors and a tuple of (property, value)
+    declarations in source order (a repeated property appears twice; applying
+    them in order lets the last one win)."""
+    __slots__ = ("selectors", "declarations", "_compiled")
+
+    def __init__(self, selectors, declarations):
+        self.selectors = selectors
+        self.declarations = declarations
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        """The selectors as parse_selector() Selectors (None where unsupported),
+        parsed on first use: rules of a cached sheet are shared between pages,
+        so each page's RuleIndex reuses them."""
+        if self._compiled is None:
+            self._compiled = tuple(parse_selector(sel.strip()) for sel in self.selectors)
+        return self._compiled
+
+    @property
+    def style(self):
+        return dict(self.declarations)
 
-        # Remove comments
-        css_content = re.sub(r'/\*.*?\*/', '', css_content, flags=re.DOTALL)
+    def to_dict(self):
+        return {"selectors": list(self.selectors), "style": self.style}
 
-        # Split into rules like "selector { decls }"
-        rule_pattern = re.compile(r'([^{]+)\{([^}]*)\}')
-        for match in rule_pattern.finditer(css_content):
-            selectors = [s.strip() for s in match.group(1).split(',') if s.strip()]
-            declarations = self._parse_declarations(match.group(2))
-            if not selectors:
+    def __eq__(self, other):
+        return (isinstance(other, Rule) and self.selectors == other.selectors
+                and self.declarations == other.declarations)
+
+    def __hash__(self):
+        return hash((self.selectors, self.declarations))
+
+    def __repr__(self):
+        return f"Rule({self.selectors!r}, {self.declarations!r})"
+
+# One token per match, never backtracking past its own end: comments (an
+# unterminated one runs to the end), strings (which may hold braces and
+# semicolons), the three structural characters, and runs of anything else.
+_TOKENS = re.compile(r"""
+      /\*.*?(?:\*/|\Z)
+    | "(?:[^"\\]|\\.)*(?:"|\Z)
+    | '(?:[^'\\]|\\.)*(?:'|\Z)
+    | [{};]
+    | [^{};"'/]+
+    | /
+""", re.S | re.X)
+
+# Most rules hold no comment, string, at-keyword or nested block: such a
+# rule is read in one match. It is anchored where the previous rule ended,
+# and a failed attempt stops at the first character it cannot take, so the
+# fast path keeps the parse linear.
+_PLAIN_RULE = re.compile(r"""([^{};"'/@]*)\{([^{}"'/]*)\}""")
+
+def _declarations(body):
+    declarations = []
+    for decl in body.split(";"):
+        name, colon, value = decl.partition(":")
+        if colon:
+            name = name.strip()
+            if name:
+                declarations.append((name, value.strip()))
+    return tuple(declarations)
+
+def _selectors(text):
+    if "," not in text:
+        text = text.strip()
+        return (text,) if text else ()
+    return tuple([s for s in map(str.strip, text.split(",")) if s])
+
+def parse_stylesheet(css):
+    """Parse a stylesheet into a list of Rule, in one linear pass.
+
+    At-rule blocks (@media, @font-face, @keyframes...) and blocks nested in a
+    rule are skipped whole, @import-style statements end at their ';', and a
+    rule still open at the end of the sheet is kept, as browsers do.
+    """
+    rules = []
+    append = rules.append
+    plain_rule, token = _PLAIN_RULE.match, _TOKENS.match
+    prelude = []      # text of the selector list (or at-rule) being read
+    skip = 0          # depth inside a skipped block
+    in_rule = False
+    selectors = ()
+    declarations = []
+    name = None       # property of the declaration being read, once its ':' is seen
+    pieces = []       # text of the property (before ':') or of the value (after)
+    pos, end = 0, len(css)
+
+    while pos < end:
+        if not (in_rule or skip or prelude):
+            m = plain_rule(css, pos)
+            if m:
+                pos = m.end()
+                selectors = _selectors(m.group(1))
+                if selectors:
+                    append(Rule(selectors, _declarations(m.group(2))))
                 continue
+        m = token(css, pos)
+        if m is None:
+            # An unbalanced quote the string patterns could not take
+            pos += 1
+            continue
+        tok = m.group()
+        pos = m.end()
+        first = tok[0]
+        if first == "/" and tok.startswith("/*"):
+            continue
+        if skip:
+            if first == "{":
+                skip += 1
+            elif first == "}":
+                skip -= 1
+            continue
+        if not in_rule:
+            if first == "{":
+                text = "".join(prelude).strip()
+                prelude = []
+                selectors = _selectors(text)
+                if text.startswith("@") or not selectors:
+                    skip = 1
+                else:
+                    in_rule = True
+            elif first == ";" or first == "}":
+                prelude = []
+            else:
+                prelude.append(tok)
+            continue
 
-            # Primary (what render.py consumes)
-            self.rules.append({'selectors': selectors, 'style': declarations})
+        if first == ";" or first == "}":
+            if name:
+                declarations.append((name, "".join(pieces).strip()))
+            name = None
+            pieces = []
+            if first == "}":
+                append(Rule(selectors, tuple(declarations)))
+                declarations = []
+                in_rule = False
+        elif first == "{":
+            # Not a declaration (nested rule, stray brace): drop it and its block
+            name = None
+            pieces = []
+            skip = 1
+        elif name is None and first not in "\"'" and ":" in tok:
+            before, after = tok.split(":", 1)
+            pieces.append(before)
+            name = "".join(pieces).strip()
+            pieces = [after]
+        else:
+            pieces.append(tok)
 
-            # Back-compat for any older code that expects single 'selector'
-            for sel in selectors:
-                self.rules.append({'selector': sel, 'style': declarations})
-        return self.rules
+    if in_rule:
+        if name:
+            declarations.append((name, "".join(pieces).strip()))
+        append(Rule(selectors, tuple(declarations)))
+    return rules
+
+# Selectors ----------------------------------------------------------------
+
+_COMPOUND = re.compile(r"(\*|[a-zA-Z][a-zA-Z0-9_-]*)?((?:[.#][a-zA-Z0-9_-]+)*)")
+_SIMPLE = re.compile(r"[.#][a-zA-Z0-9_-]+")
+_SELECTOR_TOKENS = re.compile(r">|[^\s>]+")
 
-    def _parse_declarations(self, declarations_str):
-        declarations = {}
-        for decl in declarations_str.split(';'):
-            decl = decl.strip()
-            if not decl:
+class Compound:
+    """A compound selector such as div.note#main: the tag (lowercase, None for
+    any), id and classes an element needs."""
+    __slots__ = ("tag", "id", "classes")
+
+    def __init__(self, tag, element_id, classes):
+        self.tag = tag
+        self.id = element_id
+        self.classes = classes
+
+    def matches(self, node):
+        if self.tag is not None and (getattr(node, "tag", "") or "").lower() != self.tag:
+            return False
+        attrs = getattr(node, "attributes", None) or {}
+        if self.id is not None and attrs.get("id") != self.id:
+            return False
+        if self.classes:
+            node_classes = (attrs.get("class") or "").split()
+            return all(c in node_classes for c in self.classes)
+        return True
+
+def _compound(text):
+    m = _COMPOUND.fullmatch(text)
+    if m is None:
+        return None  # pseudo-classes, attribute selectors... are not supported
+    tag = m.group(1)
+    ids, classes = set(), []
+    for part in _SIMPLE.findall(m.group(2)):
+        if part[0] == "#":
+            ids.add(part[1:])
+        elif part[1:] not in classes:
+            classes.append(part[1:])
+    if len(ids) > 1:
+        return None  # two different ids never match
+    return Compound(None if tag in (None, "*") else tag.lower(),
+                    ids.pop() if ids else None, tuple(classes))
+
+def _key_hashes(tag, element_id, classes):
+    """The hashes an AncestorFilter records for an element."""
+    hashes = [hash(tag)] if tag else []
+    if element_id:
+        hashes.append(hash("#" + element_id))
+    for cls in classes:
+        hashes.append(hash("." + cls))
+    return hashes
+
+class Selector:
+    """A complex selector, kept right to left as browsers match it: the
+    subject compound (the rightmost one) and the (combinator, compound)
+    pairs to find above it, combinator being '>' (parent) or ' ' (any
+    ancestor). ancestor_hashes are the keys every one of those ancestors
+    contributes to an AncestorFilter."""
+    __slots__ = ("text", "subject", "chain", "ancestor_hashes")
+
+    def __init__(self, text, subject, chain):
+        self.text = text
+        self.subject = subject
+        self.chain = chain
+        self.ancestor_hashes = tuple(h for _, c in chain for h in _key_hashes(c.tag, c.id, c.classes))
+
+    def matches(self, node, tag, element_id, classes, ancestors=None):
+        """Does the selector match node, whose lowercase tag, id and class
+        list are given? ancestors is the AncestorFilter of node's ancestors,
+        if the caller keeps one."""
+        subject = self.subject
+        if subject.tag is not None and subject.tag != tag:
+            return False
+        if subject.id is not None and subject.id != element_id:
+            return False
+        for cls in subject.classes:
+            if cls not in classes:
+                return False
+        if not self.chain:
+            return True
+        if ancestors is not None and not ancestors.may_contain(self.ancestor_hashes):
+            return False
+        return bool(_match_chain(node, self.chain, 0))
+
+    def matches_node(self, node):
+        attrs = getattr(node, "attributes", None) or {}
+        return self.matches(node, (getattr(node, "tag", "") or "").lower(), attrs.get("id"),
+                            (attrs.get("class") or "").split())
+
+    def __repr__(self):
+        return f"Selector({self.text!r})"
+
+def _match_chain(node, chain, i):
+    """Match chain[i:] against node's ancestors (node matched the compound to
+    the right). True on a match; False if it fails from node, though it
+    could from a higher element; None if it fails from every element above
+    too, so the callers stop looking (no ancestor of node has what none of
+    node's ancestors had)."""
+    if i == len(chain):
+        return True
+    combinator, compound = chain[i]
+    parent = node.parent
+    if combinator == ">":
+        if parent is None:
+            return None
+        if not compound.matches(parent):
+            return False
+        return _match_chain(parent, chain, i + 1)
+    while parent is not None:
+        if compound.matches(parent):
+            result = _match_chain(parent, chain, i + 1)
+            if result is not False:
+                return result
+        parent = parent.parent
+    return None
+
+def parse_selector(text):
+    """A Selector for `text` ('ul li', 'nav > a.active'...), or None if it
+    uses something unsupported or can never match."""
+    tokens = _SELECTOR_TOKENS.findall(text or "")
+    compounds = []
+    combinator = None
+    for tok in tokens:
+        if tok == ">":
+            if combinator is not None or not compounds:
+                return None
+            combinator = ">"
+            continue
+        compound = _compound(tok)
+        if compound is None:
+            return None
+        if compounds:
+            compounds.append(combinator or " ")
+        compounds.append(compound)
+        combinator = None
+    if not compounds or combinator is not None:
+        return None
+    # [c0, comb1, c1, comb2, c2...] left to right -> subject and pairs right to left
+    subject = compounds[-1]
+    chain = tuple((compounds[i - 1], compounds[i - 2]) for i in range(len(compounds) - 1, 1, -2))
+    return Selector(" ".join(tokens), subject, chain)
+
+def compile_rules(rules):
+    """Fill in Rule.compiled for a whole sheet, parsing each distinct selector
+    text once (a framework sheet repeats the same few many times)."""
+    parsed = {}
+    for rule in rules:
+        if rule._compiled is None:
+            compiled = []
+            for sel in rule.selectors:
+                selector = parsed.get(sel, False)
+                if selector is False:
+                    selector = parsed[sel] = parse_selector(sel.strip())
+                compiled.append(selector)
+            rule._compiled = tuple(compiled)
+    return rules
+
+class AncestorFilter:
+    """Counting Bloom filter of the tag, id and class keys of the elements
+    enclosing the node being styled.
+
+    The cascade pushes an element before styling its children and pops it
+    after, so the filter always describes the current node's ancestors. A
+    selector whose ancestor keys are not all in the filter cannot match and
+    is rejected without walking up the tree; a 'maybe' is confirmed by
+    matching right to left.
+    """
+    BITS = 12
+    MASK = (1 << BITS) - 1
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = array("i", bytes(4 << self.BITS))
+
+    def push(self, node):
+        """Record node; returns the hashes to hand back to pop()."""
+        attrs = getattr(node, "attributes", None) or {}
+        hashes = _key_hashes((getattr(node, "tag", "") or "").lower(), attrs.get("id"),
+                             (attrs.get("class") or "").split())
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            counts[h & mask] += 1
+            counts[(h >> bits) & mask] += 1
+        return hashes
+
+    def pop(self, hashes):
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            counts[h & mask] -= 1
+            counts[(h >> bits) & mask] -= 1
+
+    def may_contain(self, hashes):
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            if not counts[h & mask] or not counts[(h >> bits) & mask]:
+                return False
+        return True
+
+class RuleIndex:
+    """Rules bucketed by the key their selector can match on.
+
+    A node only looks at the buckets for its tag, its id and its classes,
+    instead of testing every selector of the stylesheet. A selector is
+    bucketed by its subject (rightmost) compound: by id if it has one, else
+    by a class, else by tag ('*' selectors go to `universal`). Entries are
+    (order, style, selector) triples, order being the rule's position in the
+    sheet, style the rule's declarations (a Rule's (property, value) tuple,
+    or the 'style' dict of a rule given as a dict), and selector the Selector
+    still to check, or None when being in the bucket is enough.
+    """
+    def __init__(self, rules=(), generation=None):
+        self.generation = generation if generation is not None else next(_generations)
+        self.by_tag = {}
+        self.by_id = {}
+        self.by_class = {}
+        self.universal = []
+        self.has_checks = False       # some entry needs its selector checked
+        self.has_combinators = False  # some selector looks at ancestors
+        for order, rule in enumerate(rules or []):
+            if isinstance(rule, Rule):
+                for sel in rule.compiled:
+                    self.add(sel, order, rule.declarations)
                 continue
-            if ':' in decl:
-                prop, value = decl.split(':', 1)
-                declarations[prop.strip()] = value.strip()
-        return declarations
+            # Accept either 'selectors': [...] OR legacy 'selector': '...'
+            selectors = list(rule.get('selectors', []) or [])
+            if not selectors and 'selector' in rule:
+                selectors = [rule['selector']]
+            style = rule.get('style', {}) or {}
+            for sel in selectors:
+                self.add(sel, order, style)
+
+    def add(self, selector, order, style):
+        """selector: its text, or a Selector already parsed (None is skipped)."""
+        if isinstance(selector, str):
+            selector = parse_selector(selector.strip())
+        if selector is None:
+            return
+        subject = selector.subject
+        check = selector
+        if subject.id is not None:
+            bucket, key = self.by_id, subject.id
+            if subject.tag is None and not subject.classes:
+                check = None
+        elif subject.classes:
+            bucket, key = self.by_class, subject.classes[0]
+            if subject.tag is None and len(subject.classes) == 1:
+                check = None
+        elif subject.tag is not None:
+            bucket, key = self.by_tag, subject.tag
+            check = None
+        else:
+            bucket, key = None, None
+            check = None
+        if selector.chain:
+            check = selector
+            self.has_combinators = True
+        if check is not None:
+            self.has_checks = True
+        entries = self.universal if bucket is None else bucket.setdefault(key, [])
+        # 'h1, h1' or a rule listed twice in one bucket only applies once
+        if not entries or entries[-1][0] != order or entries[-1][2] is not None:
+            entries.append((order, style, check))
+
+    def match(self, tag, element_id=None, classes=(), node=None, ancestors=None):
+        """Return the styles of the matching rules, in stylesheet order.
+
+        Selectors with several parts are checked against node (and, for
+        combinators, its ancestors, pre-filtered with the `ancestors`
+        AncestorFilter when given).
+        """
+        tag = (tag or '').lower()
+        groups = []
+        entries = self.by_tag.get(tag)
+        if entries:
+            groups.append(entries)
+        if element_id:
+            entries = self.by_id.get(element_id)
+            if entries:
+                groups.append(entries)
+        for cls in classes:
+            entries = self.by_class.get(cls)
+            if entries:
+                groups.append(entries)
+        if self.universal:
+            groups.append(self.universal)
+
+        if not groups:
+            return []
+        if not self.has_checks:
+            if len(groups) == 1:
+                return [style for _, style, _ in groups[0]]
+            # A rule like 'p, .note' can be reached through two buckets: keep it once
+            merged = {}
+            for entries in groups:
+                for order, style, _ in entries:
+                    merged[order] = style
+            return [merged[order] for order in sorted(merged)]
+
+        merged = {}
+        for entries in groups:
+            for order, style, check in entries:
+                if order in merged:
+                    continue
+                if check is None or check.matches(node, tag, element_id, classes, ancestors):
+                    merged[order] = style
+        return [merged[order] for order in sorted(merged)]
@@ -0,0 +1,86 @@
+"""Process-wide pool of Tk fonts.
+
+Every renderer asks for fonts by (family, size, weight, slant). The pool hands
+back the same tkinter Font for the same key, so repaints and resizes do not
+allocate new named fonts in the Tk interpreter, and the metrics Tk reports
+for a font are queried once and remembered.
+"""
+import tkinter as tk
+from tkinter.font import Font
+
+_pool = {}      # (family, size, weight, slant) -> Font
+_metrics = {}   # (family, size, weight, slant) -> {"linespace": .., "ascent": .., "descent": ..}
+_pool_root = None
+
+def _font_key(family, size, weight="normal", slant="roman"):
+    return (family, int(size), weight or "normal", slant or "roman")
+
+def _check_root():
+    """Fonts belong to one Tk interpreter; start over if the default root changed."""
+    global _pool_root
+    root = getattr(tk, "_default_root", None)
+    if root is not _pool_root:
+        _pool.clear()
+        _metrics.clear()
+        _pool_root = root
+
+def get_font(family, size, weight="normal", slant="roman"):
+    """Return the shared Font for this description, creating it on first use."""
+    _check_root()
+    key = _font_key(family, size, weight, slant)
+    font = _pool.get(key)
+    if font is None:
+        family, size, weight, slant = key
+        try:
+            font = Font(family=family, size=size, weight=weight, slant=slant)
+        except Exception:
+            font = Font(family="Arial", size=size, weight=weight, slant=slant)
+        _pool[key] = font
+    return font
+
+def font_metrics(family, size, weight="normal", slant="roman"):
+    """Return the cached {"linespace", "ascent", "descent"} metrics for a font."""
+    key = _font_key(family, size, weight, slant)
+    metrics = _metrics.get(key)
+    if metrics is None:
+        tk_metrics = get_font(*key).metrics()
+        metrics = {
+            "linespace": int(tk_metrics.get("linespace") or 16),
+            "ascent": int(tk_metrics.get("ascent") or 12),
+            "descent": int(tk_metrics.get("descent") or 4),
+        }
+        _metrics[key] = metrics
+    return metrics
+
+def linespace(family, size, weight="normal", slant="roman"):
+    return font_metrics(family, size, weight, slant)["linespace"]
+
+def ascent(family, size, weight="normal", slant="roman"):
+    return font_metrics(family, size, weight, slant)["ascent"]
+
+def font_pool_size():
+    return len(_pool)
+
+def clear_font_pool():
+    """Drop every pooled font (Tk frees them once nothing else holds them)."""
+    _pool.clear()
+    _metrics.clear()
+
+class TkFontMetrics:
+    """Text metrics from the pooled Tk fonts (needs a Tk root / display).
+
+    Renderers only talk to a metrics provider through font(spec),
+    measure(spec, text) and linespace(spec), spec being the
+    (family, size, weight, slant) tuple; headless.AdvanceTableMetrics
+    offers the same interface without Tk.
+    """
+    cache_id = "tk"
+
+    def font(self, spec):
+        return get_font(*spec)
+
+    def measure(self, spec, text):
+        return get_font(*spec).measure(text)
+
+    def linespace(self, spec):
+        return linespace(*spec)
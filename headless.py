@@ -0,0 +1,249 @@
+"""Headless rendering: parse, cascade, layout and paint without Tk.
+
+Text is measured from per-font advance tables instead of a realized canvas,
+and the page comes out as a JSON-serializable display list, so pages can be
+rendered on display-less workers.
+
+Usage:
+    python headless.py page.html [more.html ...] [-o OUT_DIR] [--width 800]
+                       [--height 600] [--metrics tables.json] [--arena]
+    python headless.py --build-metrics tables.json [--family Arial ...]
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+from css_parser import CSSParser
+from page import load_page, read_file
+from render import paint_page
+
+# Advance widths in 1/1000 em for printable ASCII (Helvetica/Arial metrics).
+_HELVETICA = dict(zip(
+    " !\"#$%&'()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[\\]^_`abcdefghijklmnopqrstuvwxyz{|}~",
+    (278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+     556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+     1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+     667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+     333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+     556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584)))
+
+DEFAULT_TABLE = {"advances": _HELVETICA, "default": 556, "ascent": 905, "descent": 212}
+
+# render's text width cache outlives metrics objects, so each one gets an id
+# that is never reused (id(self) can be, once the object is freed).
+_cache_ids = itertools.count(1)
+
+class AdvanceTableMetrics:
+    """Text metrics from precomputed advance tables (units of 1/1000 em).
+
+    tables maps "family" or "family/bold" to {"advances": {char: units},
+    "default": units, "ascent": units, "descent": units}. Unknown families
+    use DEFAULT_TABLE; a missing bold table is the regular one widened by
+    BOLD_FACTOR. Font sizes are points like Tk's, converted at px_per_point.
+    """
+    BOLD_FACTOR = 1.07
+
+    def __init__(self, tables=None, px_per_point=96 / 72):
+        self.tables = {k.lower(): v for k, v in (tables or {}).items()}
+        self.px_per_point = px_per_point
+        self.cache_id = ("advance", next(_cache_ids))
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.tables, f)
+
+    @classmethod
+    def from_tk(cls, families=("Arial",), chars=None):
+        """Measure real Tk fonts once (needs a display) to build the tables."""
+        from tkinter.font import Font
+        import tkinter as tk
+        chars = chars or "".join(_HELVETICA)
+        root = tk.Tk()
+        root.withdraw()
+        tables = {}
+        try:
+            for family in families:
+                for weight in ("normal", "bold"):
+                    font = Font(root=root, family=family, size=-1000, weight=weight)
+                    m = font.metrics()
+                    key = family if weight == "normal" else f"{family}/bold"
+                    tables[key] = {
+                        "advances": {ch: font.measure(ch) for ch in chars},
+                        "default": font.measure("n"),
+                        "ascent": m["ascent"],
+                        "descent": m["descent"],
+                    }
+        finally:
+            root.destroy()
+        return cls(tables)
+
+    # -------- metrics interface (see fonts.TkFontMetrics) --------
+    def _table(self, family, weight):
+        family = (family or "").lower()
+        if weight == "bold":
+            table = self.tables.get(f"{family}/bold")
+            if table is not None:
+                return table, 1.0
+        return self.tables.get(family, DEFAULT_TABLE), (self.BOLD_FACTOR if weight == "bold" else 1.0)
+
+    def _px(self, size):
+        # Tk convention: positive sizes are points, negative sizes are pixels
+        return -size if size < 0 else size * self.px_per_point
+
+    def font(self, spec):
+        family, size, weight, slant = spec
+        return (family, size, weight, slant)
+
+    def measure(self, spec, text):
+        family, size, weight, _ = spec
+        table, factor = self._table(family, weight)
+        advances, default = table["advances"], table["default"]
+        units = sum(advances.get(ch, default) for ch in text)
+        return int(round(units * factor * self._px(size) / 1000.0))
+
+    def linespace(self, spec):
+        family, size, weight, _ = spec
+        table, _ = self._table(family, weight)
+        return int(round((table["ascent"] + table["descent"]) * self._px(size) / 1000.0))
+
+class MemorySurface:
+    """Enough of the tk.Canvas API for render_layout, kept in memory.
+
+    Items are stored in stacking order; display_list() serializes them.
+    text_metrics is picked up by render_layout in place of Tk fonts.
+    """
+    def __init__(self, width=800, height=600, metrics=None):
+        self.width = width
+        self.height = height
+        self.text_metrics = metrics or AdvanceTableMetrics()
+        self.scroll_y = 0
+        self.options = {}
+        self._items = {}
+        self._order = []
+        self._next_id = 1
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def canvasy(self, y):
+        return self.scroll_y + y
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    config = configure
+
+    def _create(self, kind, coords, options):
+        item = self._next_id
+        self._next_id += 1
+        self._items[item] = [kind, list(coords), dict(options)]
+        self._order.append(item)
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", coords, options)
+
+    def coords(self, item, *coords):
+        if coords:
+            self._items[item][1] = list(coords)
+        return self._items[item][1]
+
+    def itemconfigure(self, item, **options):
+        self._items[item][2].update(options)
+
+    itemconfig = itemconfigure
+
+    def delete(self, *items):
+        if "all" in items:
+            self._items.clear()
+            self._order = []
+            return
+        for item in items:
+            self._items.pop(item, None)
+        self._order = [i for i in self._order if i in self._items]
+
+    def tag_lower(self, item, below=None):
+        self._order.remove(item)
+        self._order.insert(self._order.index(below) if below is not None else 0, item)
+
+    def tag_raise(self, item, above=None):
+        self._order.remove(item)
+        self._order.insert(self._order.index(above) + 1 if above is not None else len(self._order), item)
+
+    def display_list(self):
+        out = []
+        for item in self._order:
+            kind, coords, options = self._items[item]
+            options = {k: (list(v) if isinstance(v, tuple) else v) for k, v in options.items()}
+            out.append({"kind": kind, "coords": coords, "options": options})
+        return out
+
+def render_html(html_content, width=800, height=600, metrics=None, base_dir=None, arena=False):
+    """Render a whole page headlessly; returns a JSON-serializable dict.
+    arena=True parses into the array-backed DOM (html_parser.DOMArena)."""
+    metrics = metrics or AdvanceTableMetrics()
+    css_parser = CSSParser()
+    dom = load_page(html_content, css_parser, base_dir, arena=arena)
+    if dom is None:
+        return {"width": width, "height": height, "commands": []}
+    _, commands, page_height = paint_page(dom, css_parser.index, width, height, metrics)
+    return {
+        "width": width,
+        "height": page_height,
+        "commands": [cmd.to_dict() for cmd in commands],
+    }
+
+def render_file(path, width=800, height=600, metrics=None, arena=False):
+    return render_html(read_file(path), width, height, metrics,
+                       base_dir=os.path.dirname(os.path.abspath(path)), arena=arena)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Render HTML pages to JSON display lists without Tk.")
+    ap.add_argument("pages", nargs="*", help="HTML files to render")
+    ap.add_argument("-o", "--out-dir", help="write PAGE.display.json files here (default: stdout)")
+    ap.add_argument("--width", type=int, default=800)
+    ap.add_argument("--height", type=int, default=600)
+    ap.add_argument("--metrics", help="advance tables JSON (see --build-metrics)")
+    ap.add_argument("--arena", action="store_true", help="use the array-backed DOM (large pages)")
+    ap.add_argument("--build-metrics", metavar="PATH", help="measure Tk fonts and save advance tables")
+    ap.add_argument("--family", action="append", help="font family for --build-metrics")
+    args = ap.parse_args(argv)
+
+    if args.build_metrics:
+        AdvanceTableMetrics.from_tk(args.family or ["Arial"]).save(args.build_metrics)
+        print(f"Advance tables saved -> {args.build_metrics}")
+        return 0
+
+    metrics = AdvanceTableMetrics.load(args.metrics) if args.metrics else AdvanceTableMetrics()
+    started = time.perf_counter()
+    for path in args.pages:
+        result = render_file(path, args.width, args.height, metrics, args.arena)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+            out = os.path.join(args.out_dir, os.path.basename(path) + ".display.json")
+            with open(out, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+        else:
+            json.dump(result, sys.stdout)
+            sys.stdout.write("\n")
+    if args.out_dir and args.pages:
+        elapsed = time.perf_counter() - started
+        print(f"{len(args.pages)} page(s) in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,33 +1,143 @@
+import sys
+from array import array
 from html.parser import HTMLParser as _HTMLParser
+from types import MappingProxyType
+
+from traversal import indent as _indent, preorder, walk
+
+# Shared, read-only stand-ins for the containers of nodes that have none;
+# a node gets its own list/dict on first write (append_child, set_attribute)
+_NO_CHILDREN = ()
+_NO_ATTRIBUTES = MappingProxyType({})
+_NO_STYLES = MappingProxyType({})
 
 class DOMNode:
+    __slots__ = ("tag", "parent", "children", "attributes", "text", "styles",
+                 "style_generation", "dirty_descendants")
+
     def __init__(self, tag, parent=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if tag else tag
         self.parent = parent
-        self.children = []
-        self.attributes = {}
+        self.children = _NO_CHILDREN
+        self.attributes = _NO_ATTRIBUTES
         self.text = ""
-        self.styles = {}
+        self.styles = _NO_STYLES
+        # Stylesheet generation the styles were computed for (0 = never),
+        # and whether some descendant needs its styles recomputed.
+        self.style_generation = 0
+        self.dirty_descendants = False
+
+    def append_child(self, child):
+        if self.children is _NO_CHILDREN:
+            self.children = [child]
+        else:
+            self.children.append(child)
+
+    def set_attribute(self, name, value):
+        if self.attributes is _NO_ATTRIBUTES:
+            self.attributes = {}
+        self.attributes[sys.intern(name)] = value
+
+    def mark_dirty(self):
+        """Flag this node for a style/layout recompute on the next render."""
+        self.style_generation = 0
+        node = self.parent
+        while node is not None and not node.dirty_descendants:
+            node.dirty_descendants = True
+            node = node.parent
 
     def __repr__(self, indent=0):
-        res = "  " * indent + f"<{self.tag}"
-        if self.attributes:
-            res += " " + " ".join(f'{k}="{v}"' for k, v in self.attributes.items())
-        res += ">"
-        if self.text:
-            res += self.text
-        if self.children:
-            res += "\n"
-            res += "\n".join(child.__repr__(indent+1) for child in self.children)
-            res += "\n" + "  " * indent
-        res += f"</{self.tag}>"
-        return res
+        out = []
+
+        def enter(node, depth):
+            out.append(_indent(depth) + f"<{node.tag}")
+            if node.attributes:
+                out.append(" " + " ".join(f'{k}="{v}"' for k, v in node.attributes.items()))
+            out.append(">")
+            if node.text:
+                out.append(node.text)
+            if node.children:
+                out.append("\n")
+            return depth + 1
+
+        def leave(node, child_depth, depth):
+            if node.children:
+                out.append("\n" + _indent(depth) + f"</{node.tag}>")
+            else:
+                out.append(f"</{node.tag}>")
+            if node is not self and node.parent.children[-1] is not node:
+                out.append("\n")
+
+        walk(self, enter, leave, context=indent)
+        return "".join(out)
+
+# Elements that never have content or an end tag
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                 'link', 'meta', 'source', 'track', 'wbr'}
+
+def _attributes(attrs):
+    if not attrs:
+        return _NO_ATTRIBUTES
+    return {sys.intern(k): v for k, v in attrs}
+
+class DocumentIndex:
+    """What the page loaders look up, filled while the document is parsed.
+
+    links, styles and scripts are the <link rel="stylesheet">, <style> and
+    <script> elements in document order; ids maps an id to its first
+    element and tags a tag name to its elements, in document order.
+    """
+    __slots__ = ("links", "styles", "scripts", "ids", "tags")
+
+    def __init__(self):
+        self.links = []
+        self.styles = []
+        self.scripts = []
+        self.ids = {}
+        self.tags = {}
+
+    def add(self, node):
+        """Record an element; call in document order, attributes set."""
+        tag = node.tag
+        nodes = self.tags.get(tag)
+        if nodes is None:
+            self.tags[tag] = [node]
+        else:
+            nodes.append(node)
+        attributes = node.attributes
+        if attributes:
+            element_id = attributes.get("id")
+            if element_id and element_id not in self.ids:
+                self.ids[element_id] = node
+        if tag == "style":
+            self.styles.append(node)
+        elif tag == "script":
+            self.scripts.append(node)
+        elif tag == "link" and (attributes.get("rel") or "").lower() == "stylesheet":
+            self.links.append(node)
+
+    @classmethod
+    def build(cls, root):
+        """Index a tree that was not built by MiniHTMLParser (one pass)."""
+        index = cls()
+        for node in preorder(root):
+            index.add(node)
+        return index
 
 class MiniHTMLParser(_HTMLParser):
+    """Builds the DOM as it is fed; feed() can be called once per chunk and
+    the partial tree under `root` is usable between calls.
+
+    Text is collected as chunks per open element and joined into node.text
+    when the element ends (or at close()), so open elements have no text yet.
+    Every element goes into `index` (a DocumentIndex) at its start tag.
+    """
     def __init__(self):
         super().__init__()
         self.root = None
         self.current_node = None
+        self.index = DocumentIndex()
+        self._text_chunks = {}  # open node -> its stripped text chunks
 
     def handle_starttag(self, tag, attrs):
         if not self.root:
@@ -36,26 +146,474 @@ class MiniHTMLParser(_HTMLParser):
             self.current_node = node
         else:
             node = DOMNode(tag, self.current_node)
-            self.current_node.children.append(node)
-            self.current_node = node
-        self.current_node.attributes = dict(attrs)
+            self.current_node.append_child(node)
+            # Lets an incremental cascade find nodes added since the last one
+            node.mark_dirty()
+            if tag not in VOID_ELEMENTS:
+                self.current_node = node
+        node.attributes = _attributes(attrs)
+        self.index.add(node)
 
     def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
         if self.current_node and self.current_node.parent:
+            self._flush_text(self.current_node)
             self.current_node = self.current_node.parent
 
     def handle_data(self, data):
         if self.current_node:
             chunk = data.strip()
             if chunk:
-                if self.current_node.text and not self.current_node.text.endswith(" "):
-                    self.current_node.text += " "
-                self.current_node.text += chunk
+                chunks = self._text_chunks.get(self.current_node)
+                if chunks is None:
+                    self._text_chunks[self.current_node] = [chunk]
+                else:
+                    chunks.append(chunk)
+
+    def _flush_text(self, node):
+        chunks = self._text_chunks.pop(node, None)
+        if chunks:
+            node.text = " ".join(chunks)
+
+    def close(self):
+        super().close()
+        for node in list(self._text_chunks):
+            self._flush_text(node)
 
     def get_dom(self):
         return self.root
 
+    def open_elements(self):
+        """The elements still waiting for their end tag, innermost first.
+        Their text and children may still grow; everything else is final."""
+        out = []
+        node = self.current_node
+        while node is not None:
+            out.append(node)
+            node = node.parent
+        return out
+
 def parse_html(html_content):
+    return parse_document(html_content)[0]
+
+def parse_document(html_content):
+    """Parse html_content; returns (DOM root, DocumentIndex)."""
+    parser = MiniHTMLParser()
+    parser.feed(html_content or "")
+    parser.close()
+    return parser.get_dom(), parser.index
+
+def parse_html_chunks(chunks, on_chunk=None):
+    return parse_document_chunks(chunks, on_chunk)[0]
+
+def parse_document_chunks(chunks, on_chunk=None):
+    """Parse an iterable of text chunks incrementally; returns (DOM root,
+    DocumentIndex).
+
+    on_chunk(parser), if given, runs after each chunk with the partial DOM in
+    parser.root (and what has been indexed so far in parser.index); returning
+    True stops further calls.
+    """
     parser = MiniHTMLParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if on_chunk is not None and parser.root is not None and on_chunk(parser):
+            on_chunk = None
+    parser.close()
+    return parser.get_dom(), parser.index
+
+# Array-backed DOM ------------------------------------------------------------
+
+class DOMArena:
+    """A whole document as parallel arrays, for very large pages.
+
+    Node i is described by tag[i] (string id), parent[i], first_child[i],
+    last_child[i], next_sibling[i] (node indices, -1 for none), text[i]
+    (string id, -1 for none) and attr_start[i]/attr_count[i], a run in the
+    attr_keys/attr_values arrays. Tags, attribute keys and parsed attribute
+    values are deduplicated in the string table; texts are stored as they
+    come.
+    Cascade state (styles, style generation, dirty flag) lives in side
+    tables so NodeViews can be written to.
+
+    The arena is built for mostly-static documents but stays bounded under
+    script writes. A node owns its text's string slot, and set_text
+    rewrites it in place. An attribute value a script overwrites gets a
+    slot of its own, reused by the next write. Freed slots are recycled.
+    Attribute runs that had to move leave dead entries behind, and the
+    attribute arrays are compacted once those outnumber the live ones.
+    Interned strings (tags, keys, parsed values) are never freed.
+
+    Traversal, id lookup and serialization work on the arrays; view(i)
+    gives a DOMNode-like object for the existing cascade, layout and JS code.
+    """
+    def __init__(self):
+        self.tag = array('i')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.last_child = array('i')
+        self.next_sibling = array('i')
+        self.text = array('i')
+        self.attr_start = array('i')
+        self.attr_count = array('i')
+        self.attr_keys = array('i')
+        self.attr_values = array('i')
+        self.strings = []
+        self._string_ids = {}
+        self._owned = set()      # string ids owned by one attribute value slot
+        self._free_strings = []  # released owned slots, reused first
+        self._dead_attrs = 0     # attr_keys entries no run covers any more
+        self.style_generation = array('q')
+        self.dirty_descendants = bytearray()
+        self.styles = {}   # node -> computed style dict (sparse)
+        self.ids = {}      # id attribute -> first node carrying it
+
+    def __len__(self):
+        return len(self.tag)
+
+    # -------- strings --------
+    def intern(self, s):
+        """String id of s, shared by every equal string."""
+        sid = self._string_ids.get(s)
+        if sid is None:
+            sid = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return sid
+
+    def _add_string(self, s):
+        if self._free_strings:
+            sid = self._free_strings.pop()
+            self.strings[sid] = s
+            return sid
+        self.strings.append(s)
+        return len(self.strings) - 1
+
+    def _release(self, sid):
+        self.strings[sid] = None
+        self._free_strings.append(sid)
+
+    def string(self, sid):
+        return None if sid < 0 else self.strings[sid]
+
+    # -------- building --------
+    def create_element(self, tag, attrs=()):
+        node = len(self.tag)
+        self.tag.append(self.intern(tag))
+        for column in (self.parent, self.first_child, self.last_child, self.next_sibling, self.text):
+            column.append(-1)
+        self.attr_start.append(len(self.attr_keys))
+        self.attr_count.append(0)
+        self.style_generation.append(0)
+        self.dirty_descendants.append(0)
+        for name, value in attrs or ():
+            self.set_attribute(node, name, value)
+        return node
+
+    def append_child(self, parent, child):
+        self.parent[child] = parent
+        last = self.last_child[parent]
+        if last < 0:
+            self.first_child[parent] = child
+        else:
+            self.next_sibling[last] = child
+        self.last_child[parent] = child
+        self.mark_dirty(child)
+
+    def set_attribute(self, node, name, value):
+        key = self.intern(name)
+        start, count = self.attr_start[node], self.attr_count[node]
+        keys = self.attr_keys
+        for j in range(start, start + count):
+            if keys[j] == key:
+                self._rewrite_value(j, value)
+                break
+        else:
+            if start + count != len(keys):
+                # the run is not at the end: move it there, then grow it
+                self.attr_start[node] = len(keys)
+                for j in range(start, start + count):
+                    keys.append(keys[j])
+                    self.attr_values.append(self.attr_values[j])
+                self._dead_attrs += count
+            keys.append(key)
+            self.attr_values.append(-1 if value is None else self.intern(value))
+            self.attr_count[node] = count + 1
+            if self._dead_attrs > len(keys) // 2:
+                self._compact_attributes()
+        if name == "id" and value is not None:
+            self.ids.setdefault(value, node)
+
+    def _rewrite_value(self, j, value):
+        """Overwrite attribute slot j, in the slot's own string if it has one."""
+        old = self.attr_values[j]
+        owned = old in self._owned
+        if value is None:
+            if owned:
+                self._owned.discard(old)
+                self._release(old)
+            self.attr_values[j] = -1
+        elif owned:
+            self.strings[old] = value
+        else:
+            sid = self._add_string(value)
+            self._owned.add(sid)
+            self.attr_values[j] = sid
+
+    def _compact_attributes(self):
+        """Rebuild attr_keys/attr_values with only the live runs."""
+        keys, values = array('i'), array('i')
+        old_keys, old_values = self.attr_keys, self.attr_values
+        for node in range(len(self.tag)):
+            start, count = self.attr_start[node], self.attr_count[node]
+            self.attr_start[node] = len(keys)
+            keys.extend(old_keys[start:start + count])
+            values.extend(old_values[start:start + count])
+        self.attr_keys, self.attr_values = keys, values
+        self._dead_attrs = 0
+
+    def set_text(self, node, text):
+        # Texts are never shared, so the node's slot is rewritten in place
+        sid = self.text[node]
+        if not text:
+            if sid >= 0:
+                self._release(sid)
+            self.text[node] = -1
+        elif sid >= 0:
+            self.strings[sid] = text
+        else:
+            self.text[node] = self._add_string(text)
+
+    def mark_dirty(self, node):
+        self.style_generation[node] = 0
+        node = self.parent[node]
+        dirty = self.dirty_descendants
+        while node >= 0 and not dirty[node]:
+            dirty[node] = 1
+            node = self.parent[node]
+
+    # -------- reading --------
+    def attributes(self, node):
+        start = self.attr_start[node]
+        strings = self.strings
+        return {strings[self.attr_keys[j]]: self.string(self.attr_values[j])
+                for j in range(start, start + self.attr_count[node])}
+
+    def get_attribute(self, node, name):
+        key = self._string_ids.get(name)
+        if key is None:
+            return None
+        start = self.attr_start[node]
+        for j in range(start, start + self.attr_count[node]):
+            if self.attr_keys[j] == key:
+                return self.string(self.attr_values[j])
+        return None
+
+    def children(self, node):
+        out = []
+        child = self.first_child[node]
+        while child >= 0:
+            out.append(child)
+            child = self.next_sibling[child]
+        return out
+
+    def preorder(self, node=0):
+        """Node indices of the subtree rooted at `node`, in document order."""
+        if node >= len(self.tag):
+            return
+        first_child, next_sibling, parent = self.first_child, self.next_sibling, self.parent
+        current = node
+        while True:
+            yield current
+            child = first_child[current]
+            if child >= 0:
+                current = child
+                continue
+            while current != node and next_sibling[current] < 0:
+                current = parent[current]
+            if current == node:
+                return
+            current = next_sibling[current]
+
+    def element_by_id(self, element_id):
+        """First node whose id attribute is element_id, or -1."""
+        node = self.ids.get(element_id, -1)
+        if node >= 0 and self.get_attribute(node, "id") == element_id:
+            return node
+        # the id moved or was set after another node had it: scan
+        for node in self.preorder():
+            if self.get_attribute(node, "id") == element_id:
+                return node
+        return -1
+
+    def serialize(self, node=0, indent=0):
+        """Same text as DOMNode.__repr__, built without recursion."""
+        if node >= len(self.tag):
+            return ""
+        strings = self.strings
+        out = []
+        stack = [(node, indent)]  # a node to open, or a str to emit
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                out.append(item)
+                continue
+            n, depth = item
+            tag = strings[self.tag[n]]
+            out.append(_indent(depth) + f"<{tag}")
+            if self.attr_count[n]:
+                out.append(" " + " ".join(f'{k}="{v}"' for k, v in self.attributes(n).items()))
+            out.append(">")
+            if self.text[n] >= 0:
+                out.append(strings[self.text[n]])
+            kids = self.children(n)
+            if not kids:
+                out.append(f"</{tag}>")
+                continue
+            out.append("\n")
+            stack.append("\n" + _indent(depth) + f"</{tag}>")
+            for i in range(len(kids) - 1, -1, -1):
+                stack.append((kids[i], depth + 1))
+                if i:
+                    stack.append("\n")
+        return "".join(out)
+
+    def view(self, node):
+        """A NodeView of `node`, or None. Views are made on demand and not
+        kept: two views of the same node are equal, not identical."""
+        if node is None or node < 0:
+            return None
+        return NodeView(self, node)
+
+    @property
+    def root(self):
+        return self.view(0) if len(self.tag) else None
+
+class NodeView:
+    """DOMNode interface over one node of a DOMArena. Compare views with ==
+    (or use them as dict keys), not `is`."""
+    __slots__ = ("arena", "index")
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, NodeView) and other.index == self.index and other.arena is self.arena
+
+    def __hash__(self):
+        return hash((id(self.arena), self.index))
+
+    @property
+    def tag(self):
+        return self.arena.strings[self.arena.tag[self.index]]
+
+    @property
+    def parent(self):
+        return self.arena.view(self.arena.parent[self.index])
+
+    @property
+    def children(self):
+        view = self.arena.view
+        return [view(child) for child in self.arena.children(self.index)]
+
+    @property
+    def attributes(self):
+        """A snapshot dict; write through set_attribute()."""
+        if not self.arena.attr_count[self.index]:
+            return _NO_ATTRIBUTES
+        return self.arena.attributes(self.index)
+
+    @property
+    def text(self):
+        sid = self.arena.text[self.index]
+        return "" if sid < 0 else self.arena.strings[sid]
+
+    @text.setter
+    def text(self, value):
+        self.arena.set_text(self.index, value)
+
+    @property
+    def styles(self):
+        return self.arena.styles.get(self.index, _NO_STYLES)
+
+    @styles.setter
+    def styles(self, value):
+        self.arena.styles[self.index] = value
+
+    @property
+    def style_generation(self):
+        return self.arena.style_generation[self.index]
+
+    @style_generation.setter
+    def style_generation(self, value):
+        self.arena.style_generation[self.index] = value
+
+    @property
+    def dirty_descendants(self):
+        return bool(self.arena.dirty_descendants[self.index])
+
+    @dirty_descendants.setter
+    def dirty_descendants(self, value):
+        self.arena.dirty_descendants[self.index] = 1 if value else 0
+
+    def append_child(self, child):
+        self.arena.append_child(self.index, child.index)
+
+    def set_attribute(self, name, value):
+        self.arena.set_attribute(self.index, name, value)
+
+    def mark_dirty(self):
+        self.arena.mark_dirty(self.index)
+
+    def __repr__(self, indent=0):
+        return self.arena.serialize(self.index, indent)
+
+class ArenaHTMLParser(_HTMLParser):
+    """MiniHTMLParser's tree rules, building a DOMArena instead of DOMNodes."""
+    def __init__(self):
+        super().__init__()
+        self.arena = DOMArena()
+        self.current = -1
+        self._text_chunks = {}
+
+    def handle_starttag(self, tag, attrs):
+        arena = self.arena
+        node = arena.create_element(tag, attrs)
+        if node == 0:
+            self.current = node
+            return
+        arena.append_child(self.current, node)
+        if tag not in VOID_ELEMENTS:
+            self.current = node
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS or self.current < 0:
+            return
+        parent = self.arena.parent[self.current]
+        if parent >= 0:
+            self._flush_text(self.current)
+            self.current = parent
+
+    def handle_data(self, data):
+        if self.current >= 0:
+            chunk = data.strip()
+            if chunk:
+                self._text_chunks.setdefault(self.current, []).append(chunk)
+
+    def _flush_text(self, node):
+        chunks = self._text_chunks.pop(node, None)
+        if chunks:
+            self.arena.set_text(node, " ".join(chunks))
+
+    def close(self):
+        super().close()
+        for node in list(self._text_chunks):
+            self._flush_text(node)
+
+def parse_html_arena(html_content):
+    """Parse into a DOMArena; arena.root is the DOMNode-like root view."""
+    parser = ArenaHTMLParser()
     parser.feed(html_content or "")
-    return parser.get_dom()
+    parser.close()
+    return parser.arena
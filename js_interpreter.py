@@ -1,6 +1,12 @@
+from html_parser import DocumentIndex
+
 class JSInterpreter:
-    def __init__(self, dom_root):
+    """index is the DocumentIndex of dom_root (page.load_resources passes the
+    parser's); without one it is built on the first lookup. The scripts
+    supported here only change text, so its id map never goes stale."""
+    def __init__(self, dom_root, index=None):
         self.dom_root = dom_root
+        self.index = index
         self.variables = {}
 
     def execute(self, js_code):
@@ -24,16 +30,13 @@ class JSInterpreter:
                         element = self._find_element_by_id(self.dom_root, element_id)
                         if element:
                             element.text = new_content
+                            element.mark_dirty()
                 except Exception:
                     pass
 
     def _find_element_by_id(self, node, element_id):
-        if not node:
-            return None
-        if node.attributes.get('id') == element_id:
-            return node
-        for child in node.children:
-            found = self._find_element_by_id(child, element_id)
-            if found:
-                return found
-        return None
+        if node != self.dom_root:
+            return DocumentIndex.build(node).ids.get(element_id)
+        if self.index is None:
+            self.index = DocumentIndex.build(node)
+        return self.index.ids.get(element_id)
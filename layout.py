@@ -1,4 +1,5 @@
 from html_parser import DOMNode
+from traversal import walk
 import math
 
 class LayoutBox:
@@ -13,10 +14,21 @@ class LayoutBox:
         self.line_height = 20  # Default line height
 
     def layout(self, containing_block):
-        self._calculate_width(containing_block)
-        self._calculate_position(containing_block)
-        self._calculate_height()
-        self._layout_children()
+        """Lay out this box and its subtree. Each child is placed below the
+        ones before it, as the parent's height grows with them."""
+        def enter(node, parent_box):
+            box = self if parent_box is None else LayoutBox(node)
+            box._calculate_width(parent_box or containing_block)
+            box._calculate_position(parent_box or containing_block)
+            box._calculate_height()
+            return box
+
+        def leave(node, box, parent_box):
+            if parent_box is not None:
+                parent_box.children.append(box)
+                parent_box.height += box.height
+
+        walk(self.dom_node, enter, leave)
 
     def _calculate_width(self, containing_block):
         style = self.dom_node.styles
@@ -71,13 +83,6 @@ class LayoutBox:
             content_height = num_lines * self.line_height
             self.height = content_height + padding_top + padding_bottom + border_top + border_bottom
 
-    def _layout_children(self):
-        for child in self.dom_node.children:
-            child_box = LayoutBox(child)
-            child_box.layout(self)
-            self.children.append(child_box)
-            self.height += child_box.height
-
     def _parse_px(self, value):
         if isinstance(value, str):
             if value.endswith('px'):
@@ -0,0 +1,136 @@
+"""Turn an HTML document into a DOM ready for styling.
+
+Shared by the Tk Browser and the headless renderer: parse the HTML, load
+its local stylesheets and <style> blocks into a CSSParser, and run its
+inline scripts. load_page_streaming does the same from a stream of chunks,
+handing out the partial DOM on the way for an early first paint.
+
+Given a StylesheetCache (`stylesheets=`), pages reuse the parsed rules of
+stylesheets an earlier page already loaded.
+"""
+import os
+
+from html_parser import DocumentIndex, parse_document, parse_document_chunks, parse_html_arena
+from js_interpreter import JSInterpreter
+from traversal import preorder
+
+CHUNK_SIZE = 64 * 1024
+
+def read_file(fp):
+    with open(fp, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def walk(node):
+    """Every node of the tree, in document order."""
+    return preorder(node)
+
+def find_all(node, tagname):
+    tagname = (tagname or "").lower()
+    for n in walk(node):
+        if getattr(n, "tag", "").lower() == tagname:
+            yield n
+
+def read_chunks(fp, chunk_size=CHUNK_SIZE):
+    """Yield the file's text chunk by chunk."""
+    with open(fp, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+def load_page(html_content, css_parser, base_dir=None, arena=False, stylesheets=None):
+    """Parse html_content, fill css_parser with the page's CSS and run its
+    scripts. Returns the DOM root (a DOMArena root view if `arena`)."""
+    if arena:
+        dom, index = parse_html_arena(html_content).root, None
+    else:
+        dom, index = parse_document(html_content)
+    load_resources(dom, css_parser, base_dir, index, stylesheets)
+    return dom
+
+def load_page_streaming(chunks, css_parser, base_dir=None, on_partial=None, stylesheets=None):
+    """Like load_page, but parses `chunks` (e.g. read_chunks(path)) as they
+    come in.
+
+    After each chunk, on_partial(dom, open_nodes) gets the partial DOM and the
+    elements still open, until it returns True: that is where the caller
+    paints the first screen early. Stylesheets are loaded as soon as their
+    element is complete so the early paint is styled; scripts only run once
+    the whole document is in, and the CSS is then reloaded in document order.
+    """
+    css_parser.rules = []
+    loaded = set()
+
+    def on_chunk(parser):
+        open_nodes = parser.open_elements()
+        open_ids = {id(n) for n in open_nodes}
+        for node in parser.index.links + parser.index.styles:
+            if id(node) in loaded or id(node) in open_ids:
+                continue
+            loaded.add(id(node))
+            _load_stylesheet(node, css_parser, base_dir, stylesheets)
+        return on_partial(parser.root, open_nodes)
+
+    dom, index = parse_document_chunks(chunks, on_chunk if on_partial is not None else None)
+    load_resources(dom, css_parser, base_dir, index, stylesheets)
+    return dom
+
+def _load_stylesheet(node, css_parser, base_dir, stylesheets=None):
+    """Add the CSS of a <style> block or a local <link rel="stylesheet">."""
+    tag = getattr(node, "tag", "").lower()
+    if tag == "style":
+        css_text = node.text or ""
+        if css_text.strip():
+            if stylesheets is not None:
+                css_parser.add_sheet(stylesheets.parse(css_text))
+            else:
+                css_parser.parse_css(css_text)
+        return
+    css_path = stylesheet_path(node, base_dir)
+    if css_path is not None and os.path.exists(css_path):
+        try:
+            if stylesheets is not None:
+                css_parser.add_sheet(stylesheets.parse_file(css_path))
+            else:
+                css_parser.parse_css(read_file(css_path))
+        except Exception as e:
+            print(f"Failed to read CSS '{css_path}': {e}")
+
+def stylesheet_path(node, base_dir):
+    """Local file a <link rel="stylesheet"> points to, or None."""
+    if getattr(node, "tag", "").lower() != "link" or not base_dir:
+        return None
+    rel = (node.attributes.get("rel") or "").lower()
+    href = (node.attributes.get("href") or "").strip()
+    if rel != "stylesheet" or not href or href.lower().startswith(("http://", "https://")):
+        return None
+    return href if os.path.isabs(href) else os.path.normpath(os.path.join(base_dir, href))
+
+def load_resources(dom, css_parser, base_dir=None, index=None, stylesheets=None):
+    """(Re)load the page's CSS into css_parser and run its scripts.
+
+    index is the parser's DocumentIndex for dom; without one (e.g. an arena
+    DOM) it is built in a single pass. stylesheets is an optional
+    StylesheetCache the parsed sheets are taken from.
+    """
+    if index is None:
+        index = DocumentIndex.build(dom)
+    # Reset CSS between pages
+    css_parser.rules = []
+
+    # Local <link rel="stylesheet"> files, then inline <style> blocks
+    for link in index.links:
+        _load_stylesheet(link, css_parser, base_dir, stylesheets)
+    for style_node in index.styles:
+        _load_stylesheet(style_node, css_parser, base_dir, stylesheets)
+
+    # Execute very simple inline <script> blocks
+    interpreter = JSInterpreter(dom, index)
+    for script_node in index.scripts:
+        js = (script_node.text or "").strip()
+        if js:
+            try:
+                interpreter.execute(js)
+            except Exception as e:
+                print(f"Script error: {e}")
@@ -1,78 +1,225 @@
 import tkinter as tk
-from tkinter.font import Font
+import weakref
+from collections import OrderedDict
+from types import MappingProxyType
+
+from css_parser import AncestorFilter, RuleIndex, parse_selector
+from fonts import TkFontMetrics
+from painter import DrawCommand, ViewportPainter
+from traversal import SKIP, preorder, walk
 
 # Public API --------------------------------------------------------------
 
-def render_layout(canvas: tk.Canvas, dom_root, css_rules):
+TK_METRICS = TkFontMetrics()
+
+def render_layout(canvas: tk.Canvas, dom_root, css_rules, metrics=None):
     """
     Render the DOM tree to the given Tkinter canvas using a simple block layout.
+    Only the part of the page around the visible region gets canvas items;
+    call viewport_changed(canvas) when the view scrolls.
+
+    Text is measured with `metrics`, else the canvas' own text_metrics
+    attribute (in-memory surfaces), else Tk fonts.
+    Returns the measured RenderBox tree.
     """
-    canvas.delete("all")
+    painter = _painter_for(canvas)
     if dom_root is None:
-        return
+        painter.clear()
+        return None
+    if metrics is None:
+        metrics = getattr(canvas, "text_metrics", None) or TK_METRICS
+    total_width, total_height = _canvas_size(canvas)
+
+    root_box, commands, page_height = paint_page(dom_root, css_rules, total_width, total_height, metrics)
+    painter.paint(commands, total_width, page_height)
+    return root_box
 
-    # Apply CSS (very basic: tag, .class, #id)
+def first_screen_ready(canvas, dom_root, css_rules, open_nodes=(), metrics=None):
+    """
+    True once a partially parsed page fills the canvas' first screen: some
+    finished element (not in open_nodes) starts below the visible height.
+    Later content only flows below it, so what is above is final and can be
+    painted with render_layout() before the rest of the document arrives.
+    """
+    if dom_root is None:
+        return False
+    if metrics is None:
+        metrics = getattr(canvas, "text_metrics", None) or TK_METRICS
+    width, height = _canvas_size(canvas)
     _apply_css(dom_root, css_rules)
+    root_box = build_render_tree(dom_root, max_width=width - 20, x=10, y=10, metrics=metrics)
+    open_set = set(open_nodes)
+    return any(box.y >= height and box.node not in open_set for box in preorder(root_box))
 
+def _canvas_size(canvas):
     # Canvas size fallback if not realized yet
     try:
-        total_width = int(canvas.winfo_width())
-        total_height = int(canvas.winfo_height())
-        if total_width <= 1: total_width = 800
-        if total_height <= 1: total_height = 600
+        width = int(canvas.winfo_width())
+        height = int(canvas.winfo_height())
+        if width <= 1: width = 800
+        if height <= 1: height = 600
     except Exception:
-        total_width, total_height = 800, 600
+        width, height = 800, 600
+    return width, height
+
+def paint_page(dom_root, css_rules, width, height, metrics=None):
+    """
+    Cascade, measure and paint the page into a display list, without any
+    canvas. Returns (root_box, commands, page_height).
+    """
+    metrics = metrics or TK_METRICS
+
+    # Apply CSS (very basic: tag, .class, #id); css_rules may be a RuleIndex
+    _apply_css(dom_root, css_rules)
+
+    # Measure once from (10, 10) inward with small page margins
+    root_box = build_render_tree(dom_root, max_width=width - 20, x=10, y=10, metrics=metrics)
+    page_height = max(height, root_box.next_y + 10 if root_box is not None else 0)
+
+    # Page backdrop, then the boxes
+    commands = [DrawCommand("rectangle", (0, 0, width, page_height),
+                            {"fill": "white", "outline": ""}, key="page")]
+    if root_box is not None:
+        _paint_node(commands, root_box)
+    return root_box, commands, page_height
+
+def viewport_changed(canvas: tk.Canvas):
+    """Create the items that scrolled into view since the last paint."""
+    painter = _painters.get(canvas)
+    if painter is not None:
+        painter.refresh()
 
-    # Page backdrop
-    canvas.create_rectangle(0, 0, total_width, total_height, fill="white", outline="")
+_painters = weakref.WeakKeyDictionary()
 
-    # Lay out from (10, 10) inward with small page margins
-    _paint_node(canvas, dom_root, x=10, y=10, max_width=total_width - 20)
+def _painter_for(canvas):
+    painter = _painters.get(canvas)
+    if painter is None:
+        painter = _painters[canvas] = ViewportPainter(canvas)
+    return painter
 
-def render(canvas: tk.Canvas, dom_root, css_rules):
+def render(canvas: tk.Canvas, dom_root, css_rules, metrics=None):
     """Backward-compatible alias some earlier versions used."""
-    render_layout(canvas, dom_root, css_rules)
+    return render_layout(canvas, dom_root, css_rules, metrics)
 
 # CSS application ---------------------------------------------------------
 
 def _apply_css(node, rules):
-    """Populate node.styles by applying simple rules (tag, .class, #id)."""
-    if not hasattr(node, "styles") or node.styles is None:
-        node.styles = {}
-
-    for rule in rules or []:
-        # Accept either 'selectors': [...] OR legacy 'selector': '...'
-        sels = list(rule.get("selectors", []) or [])
-        if not sels and "selector" in rule:
-            sels = [rule["selector"]]
-        for sel in sels:
-            if _matches_selector(node, sel):
-                for prop, val in (rule.get("style", {}) or {}).items():
-                    node.styles[prop] = val
-
-    # Default indentation for lists if author CSS didn't set it
-    tag = getattr(node, "tag", "").lower()
-    if tag in ("ul", "ol"):
-        node.styles.setdefault("margin-left", "20px")
-        node.styles.setdefault("margin-bottom", "8px")
+    """Populate node.styles by applying the rules (tag, .class, #id,
+    compounds and descendant/child combinators).
+
+    Styles are computed once per stylesheet generation: nodes already styled
+    for the index's generation are skipped unless marked dirty, so repaints
+    that only change the canvas size do not re-run the cascade. When some
+    selector has a combinator, an AncestorFilter follows the walk so most of
+    them are rejected without looking at the ancestors; a node's style then
+    depends on its ancestors, so restyling a node restyles its subtree too.
+
+    Elements with the same signature get the same computed style object
+    (see _StyleMemo), so the rows of a long table are matched once.
+    """
+    index = rules if isinstance(rules, RuleIndex) else RuleIndex(rules)
+    restyle_all = getattr(node, "style_generation", 0) != index.generation
+    memo = _StyleMemo(index)
+    if not index.has_combinators:
+        walk(node, lambda n, _: _cascade(n, index, restyle_all, memo))
+        return
 
-    for child in getattr(node, "children", []) or []:
-        _apply_css(child, rules)
+    # What matches depends on the ancestors too: the memo key is the
+    # element's context, its signature under its parent's context.
+    ancestors = AncestorFilter()
+    chain = []
+    parent = getattr(node, "parent", None)
+    while parent is not None:
+        chain.append(parent)
+        parent = parent.parent
+    context = None
+    for parent in reversed(chain):
+        ancestors.push(parent)
+        context = memo.context(parent, context)
+
+    def enter(n, parent_result):
+        _, parent_context, forced = parent_result
+        context = memo.context(n, parent_context)
+        restyle = forced or getattr(n, "style_generation", 0) != index.generation
+        if _cascade(n, index, restyle_all, memo, context, ancestors, restyle) is SKIP:
+            return SKIP
+        return (ancestors.push(n) if n.children else None), context, restyle
+
+    def leave(n, result, _):
+        if result[0]:
+            ancestors.pop(result[0])
+
+    walk(node, enter, leave, context=(None, context, False))
+
+def _cascade(node, index, restyle_all, memo=None, key=None, ancestors=None, force=False):
+    """Restyle one node if needed (or forced); SKIP its subtree when nothing
+    below is dirty."""
+    if force or getattr(node, "style_generation", 0) != index.generation:
+        _compute_style(node, index, memo, key, ancestors)
+
+    if restyle_all or force or getattr(node, "dirty_descendants", True):
+        node.dirty_descendants = False
+        return None
+    return SKIP
+
+def _compute_style(node, index, memo=None, key=None, ancestors=None):
+    if memo is None:
+        memo = _StyleMemo(index)
+    if key is None:
+        key = memo.signature(node)
+    styles = memo.styles.get(key)
+    if styles is None:
+        tag, element_id, classes = memo.signature(node)
+        computed = {}
+        for style in index.match(tag, element_id, classes, node, ancestors):
+            computed.update(style)
+
+        # Default indentation for lists if author CSS didn't set it
+        if tag in ("ul", "ol"):
+            computed.setdefault("margin-left", "20px")
+            computed.setdefault("margin-bottom", "8px")
+        styles = memo.styles[key] = MappingProxyType(computed)
+
+    node.styles = styles
+    node.style_generation = index.generation
+
+class _StyleMemo:
+    """Computed styles of one cascade pass, shared between elements.
+
+    An element's signature is its tag, id and set of classes: rules without
+    combinators only look at those, so elements with the same signature get
+    the same read-only style mapping. Code that changes an element's style
+    assigns it a new dict instead of modifying the shared one (copy on
+    write). With combinators the key is the element's context instead, a
+    number standing for its signature and its parent's context, i.e. for
+    the signatures of the element and of all its ancestors.
+    """
+    __slots__ = ("index", "styles", "class_sets", "contexts")
+
+    def __init__(self, index):
+        self.index = index
+        self.styles = {}      # signature or context -> MappingProxyType
+        self.class_sets = {}  # class attribute -> frozenset of classes
+        self.contexts = {}    # (signature, parent context) -> context
+
+    def signature(self, node):
+        attrs = getattr(node, "attributes", None) or {}
+        raw = attrs.get("class") or ""
+        classes = self.class_sets.get(raw)
+        if classes is None:
+            classes = self.class_sets[raw] = frozenset(raw.split())
+        return getattr(node, "tag", "").lower(), attrs.get("id"), classes
+
+    def context(self, node, parent_context):
+        key = (self.signature(node), parent_context)
+        context = self.contexts.get(key)
+        if context is None:
+            context = self.contexts[key] = len(self.contexts)
+        return context
 
 def _matches_selector(node, selector: str) -> bool:
-    selector = (selector or "").strip()
-    if not selector:
-        return False
-    attrs = getattr(node, "attributes", {}) or {}
-    tag = getattr(node, "tag", "").lower()
-
-    if selector.startswith("."):
-        cls = selector[1:]
-        classes = (attrs.get("class") or "").split()
-        return cls in classes
-    if selector.startswith("#"):
-        return attrs.get("id") == selector[1:]
-    return tag == selector.lower()
+    selector = parse_selector((selector or "").strip())
+    return selector is not None and selector.matches_node(node)
 
 # Utilities ---------------------------------------------------------------
 
@@ -102,7 +249,8 @@ def _heading_font_size(tag):
     sizes = {"h1": 28, "h2": 24, "h3": 20, "h4": 18, "h5": 16, "h6": 15}
     return sizes.get(tag.lower(), None)
 
-def _font_for(node):
+def _font_spec(node):
+    """Return the (family, size, weight, slant) tuple describing node's font."""
     # base size & family
     base_size = int(_px(_get_style(node, "font-size", 14), 14))
     family = _get_style(node, "font-family", "Arial")
@@ -127,133 +275,229 @@ def _font_for(node):
     if fs == "italic":
         slant = "italic"
 
-    try:
-        return Font(name=None, exists=False, family=family, size=base_size, weight=weight, slant=slant)
-    except Exception:
-        return Font(name=None, exists=False, family="Arial", size=base_size, weight=weight, slant=slant)
-
-def _text_bbox(canvas, text, font):
-    item = canvas.create_text(0, 0, anchor="nw", text=text, font=font, state="hidden")
-    bbox = canvas.bbox(item)
-    canvas.delete(item)
-    return bbox or (0, 0, 0, 0)
-
-def _wrap_text(canvas, text, font, max_width):
+    return family, base_size, weight, slant
+
+# Text measurement --------------------------------------------------------
+
+# LRU of rendered text widths keyed by (metrics, font spec, text). Wrapping
+# measures single words, so a page only pays one Tk round trip per distinct
+# word/font.
+WIDTH_CACHE_SIZE = 8192
+_width_cache = OrderedDict()
+_width_stats = {"hits": 0, "misses": 0}
+
+def width_cache_stats():
+    """Return the text-width cache counters: hits, misses, rates and size."""
+    hits, misses = _width_stats["hits"], _width_stats["misses"]
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / lookups if lookups else 0.0,
+        "miss_rate": misses / lookups if lookups else 0.0,
+        "size": len(_width_cache),
+        "max_size": WIDTH_CACHE_SIZE,
+    }
+
+def reset_width_cache(clear_entries=False):
+    """Zero the hit/miss counters (and optionally drop the cached widths)."""
+    _width_stats["hits"] = 0
+    _width_stats["misses"] = 0
+    if clear_entries:
+        _width_cache.clear()
+
+def _text_width(text, font_key, metrics):
+    key = (metrics.cache_id, font_key, text)
+    width = _width_cache.get(key)
+    if width is not None:
+        _width_stats["hits"] += 1
+        _width_cache.move_to_end(key)
+        return width
+    _width_stats["misses"] += 1
+    width = metrics.measure(font_key, text)
+    _width_cache[key] = width
+    if len(_width_cache) > WIDTH_CACHE_SIZE:
+        _width_cache.popitem(last=False)
+    return width
+
+def _wrap_text(text, max_width, font_key, metrics):
+    """Greedy word wrap; line widths are accumulated from cached word widths."""
     words = (text or "").split()
     if not words:
         return []
-    lines, cur = [], ""
+    space_w = _text_width(" ", font_key, metrics)
+    lines, cur, cur_w = [], [], 0.0
     for w in words:
-        test = (cur + " " + w).strip()
-        x1, y1, x2, y2 = _text_bbox(canvas, test, font)
-        if (x2 - x1) <= max_width or not cur:
-            cur = test
+        word_w = _text_width(w, font_key, metrics)
+        if not cur:
+            cur, cur_w = [w], word_w
+        elif cur_w + space_w + word_w <= max_width:
+            cur.append(w)
+            cur_w += space_w + word_w
         else:
-            lines.append(cur)
-            cur = w
+            lines.append(" ".join(cur))
+            cur, cur_w = [w], word_w
     if cur:
-        lines.append(cur)
+        lines.append(" ".join(cur))
     return lines
 
 # Measurement pass --------------------------------------------------------
 
-def _measure_and_metrics(canvas, node, content_width):
-    """Return (total_height, lines, line_height, text_height, font) for node."""
-    pad_t = _px(_get_style(node, "padding-top", 4))
-    pad_b = _px(_get_style(node, "padding-bottom", 4))
-    border_w = _px(_get_style(node, "border-width", 0))
+_HIDDEN_TAGS = ("head", "style", "script")
 
-    font = _font_for(node)
-    text = (getattr(node, "text", "") or "").strip()
-    lines = _wrap_text(canvas, text, font, content_width) if text else []
-    line_height = int(font.metrics("linespace") or 16)
-    text_height = line_height * len(lines) if lines else 0
+class RenderBox:
+    """Geometry and paint data measured once for a node.
 
-    children_total = 0.0
-    for child in getattr(node, "children", []) or []:
-        ch_total, *_ = _measure_and_metrics(canvas, child, content_width)
-        children_total += ch_total
+    (x, y) is the top-left of the border box in canvas coordinates and
+    height covers border + padding + text + children. Painting only reads it.
+    """
+    def __init__(self, node):
+        self.node = node
+        self.x = 0.0
+        self.y = 0.0
+        self.width = 0.0
+        self.height = 0.0
+        self.content_width = 0.0
+        self.margin_bottom = 0.0
+        self.padding_top = 0.0
+        self.padding_bottom = 0.0
+        self.padding_left = 0.0
+        self.border_width = 0.0
+        self.border_color = "#000"
+        self.background = None
+        self.color = "black"
+        self.font = None
+        self.lines = []
+        self.line_height = 0
+        self.text_height = 0
+        self.is_li = False
+        self.children = []
+        self.child_y = 0.0  # while measuring: where the next child goes
+
+    @property
+    def next_y(self):
+        """y where the following sibling starts (after margin-bottom)."""
+        return self.y + self.height + self.margin_bottom
+
+def build_render_tree(dom_root, max_width, x=10, y=10, metrics=None):
+    """Measure the DOM (styles already applied) into a tree of RenderBox."""
+    if dom_root is None:
+        return None
+    metrics = metrics or TK_METRICS
+    measured = []
 
-    total_height = border_w + pad_t + text_height + children_total + pad_b + border_w
-    return total_height, lines, line_height, text_height, font
+    def enter(node, parent):
+        if parent is None:
+            box = _measure(node, x, y, max_width, metrics)
+        else:
+            box = _measure(node, parent.x + parent.border_width + parent.padding_left,
+                           parent.child_y, parent.content_width, metrics)
+        return SKIP if box is None else box
+
+    def leave(node, box, parent):
+        # Children are measured exactly once, stacked below the text
+        box.height = (box.child_y - box.y) + box.padding_bottom + box.border_width
+        if parent is None:
+            measured.append(box)
+        else:
+            parent.children.append(box)
+            parent.child_y = box.next_y
 
-# Painting pass -----------------------------------------------------------
+    walk(dom_root, enter, leave)
+    return measured[0] if measured else None
 
-def _paint_node(canvas, node, x, y, max_width):
-    """
-    Paint one node and its subtree. Returns y of next line (after margin-bottom).
-    """
+def _measure(node, x, y, max_width, metrics):
+    """Measure one node; its children are added by build_render_tree."""
     tag = getattr(node, "tag", "").lower()
 
     # Do not paint head/style/script
-    if tag in ("head", "style", "script"):
-        return y
+    if tag in _HIDDEN_TAGS:
+        return None
+
+    box = RenderBox(node)
 
     # Margins / padding / border
     margin_t = _px(_get_style(node, "margin-top", 0))
-    margin_b = _px(_get_style(node, "margin-bottom", 8))  # simple block spacing
     margin_l = _px(_get_style(node, "margin-left", 0))
     margin_r = _px(_get_style(node, "margin-right", 0))
+    box.margin_bottom = _px(_get_style(node, "margin-bottom", 8))  # simple block spacing
 
-    pad_t = _px(_get_style(node, "padding-top", 4))
-    pad_b = _px(_get_style(node, "padding-bottom", 4))
-    pad_l = _px(_get_style(node, "padding-left", 6))
+    pad_t = box.padding_top = _px(_get_style(node, "padding-top", 4))
+    box.padding_bottom = _px(_get_style(node, "padding-bottom", 4))
+    pad_l = box.padding_left = _px(_get_style(node, "padding-left", 6))
     pad_r = _px(_get_style(node, "padding-right", 6))
 
-    border_w = _px(_get_style(node, "border-width", 0))
-    border_color = _color(_get_style(node, "border-color", "#000"), "#000")
-    bg = _color(_get_style(node, "background-color", None), None)
+    border_w = box.border_width = _px(_get_style(node, "border-width", 0))
+    box.border_color = _color(_get_style(node, "border-color", "#000"), "#000")
+    box.background = _color(_get_style(node, "background-color", None), None)
+    box.color = _color(_get_style(node, "color", "black"), "black")
+    box.is_li = (tag == "li")
 
     # Width resolution
     declared_w = _get_style(node, "width", None)
     if declared_w is not None:
         content_width = max(0.0, _px(declared_w))
-        total_w = content_width + pad_l + pad_r + 2 * border_w
+        box.width = content_width + pad_l + pad_r + 2 * border_w
     else:
-        total_w = max(0.0, max_width - margin_l - margin_r)
-        content_width = max(0.0, total_w - pad_l - pad_r - 2 * border_w)
+        box.width = max(0.0, max_width - margin_l - margin_r)
+        content_width = max(0.0, box.width - pad_l - pad_r - 2 * border_w)
+    box.content_width = content_width
 
     # Position after top/left margins
-    cur_x = x + margin_l
-    cur_y = y + margin_t
+    box.x = x + margin_l
+    box.y = y + margin_t
+
+    # Text
+    font_key = _font_spec(node)
+    box.font = metrics.font(font_key)
+    text = (getattr(node, "text", "") or "").strip()
+    box.lines = _wrap_text(text, content_width, font_key, metrics) if text else []
+    box.line_height = metrics.linespace(font_key)
+    box.text_height = box.line_height * len(box.lines) if box.lines else 0
+
+    # Children stack below the text
+    box.child_y = box.y + border_w + pad_t + box.text_height
+    return box
+
+# Painting pass -----------------------------------------------------------
+
+def _paint_node(commands, root_box):
+    """Emit draw commands for a measured box tree, parents below children.
+    Reads the box tree only."""
+    for box in preorder(root_box):
+        _paint_box(commands, box)
 
-    # Measure first so we can paint backgrounds BEFORE children
-    total_inner_h, lines, line_h, text_h, font = _measure_and_metrics(canvas, node, content_width)
-    total_h = total_inner_h  # includes border+padding+text+children
+def _paint_box(commands, box):
+    """Draw commands for one box, keyed by (node, part) so repaints can
+    reuse canvas items (a node, or an equal view of an arena node)."""
+    node_key = box.node
+    x1, y1 = box.x, box.y
+    x2, y2 = box.x + box.width, box.y + box.height
+    border_w = box.border_width
 
     # Background & border FIRST
-    x1, y1 = cur_x, cur_y
-    x2, y2 = cur_x + total_w, cur_y + total_h
-    if bg:
-        canvas.create_rectangle(x1, y1, x2, y2, fill=bg, outline="")
+    if box.background:
+        commands.append(DrawCommand("rectangle", (x1, y1, x2, y2),
+                                    {"fill": box.background, "outline": ""}, key=(node_key, "bg")))
     if border_w > 0:
-        canvas.create_rectangle(x1, y1, x2, y2, outline=border_color, width=border_w)
+        commands.append(DrawCommand("rectangle", (x1, y1, x2, y2),
+                                    {"outline": box.border_color, "width": border_w}, key=(node_key, "border")))
 
     # Text drawing (with bullet for <li>)
-    text_color = _color(_get_style(node, "color", "black"), "black")
-    ty = cur_y + border_w + pad_t
-    is_li = (tag == "li")
-
-    if lines:
-        if is_li:
-            bullet_x = cur_x + border_w + max(2.0, pad_l * 0.3)
-            bullet_y = ty
-            canvas.create_text(bullet_x, bullet_y, anchor="nw", font=_font_for(node), fill=text_color, text="•")
-            text_start_x = cur_x + border_w + pad_l + 12  # room for bullet
+    ty = y1 + border_w + box.padding_top
+    if box.lines:
+        if box.is_li:
+            bullet_x = x1 + border_w + max(2.0, box.padding_left * 0.3)
+            commands.append(DrawCommand("text", (bullet_x, ty),
+                                        {"anchor": "nw", "font": box.font, "fill": box.color, "text": "•"},
+                                        (bullet_x, ty, bullet_x + 12, ty + box.line_height), (node_key, "bullet")))
+            text_start_x = x1 + border_w + box.padding_left + 12  # room for bullet
         else:
-            text_start_x = cur_x + border_w + pad_l
-
-        for line in lines:
-            canvas.create_text(text_start_x, ty, anchor="nw", font=font, fill=text_color, text=line)
-            ty += line_h
-
-    # Then draw children on top
-    child_y = cur_y + border_w + pad_t + text_h
-    for child in getattr(node, "children", []) or []:
-        child_y = _paint_node(canvas, child,
-                              x=cur_x + border_w + pad_l,
-                              y=child_y,
-                              max_width=content_width)
-
-    # Return next y after this block (including bottom margin)
-    return y2 + margin_b
+            text_start_x = x1 + border_w + box.padding_left
+
+        text_end_x = text_start_x + box.content_width
+        for n, line in enumerate(box.lines):
+            commands.append(DrawCommand("text", (text_start_x, ty),
+                                        {"anchor": "nw", "font": box.font, "fill": box.color, "text": line},
+                                        (text_start_x, ty, text_end_x, ty + box.line_height), (node_key, n)))
+            ty += box.line_height
@@ -0,0 +1,228 @@
+"""On-disk snapshots of styled pages, so reopening a page skips straight to layout.
+
+A snapshot holds a page's DOM as it stands after its scripts ran, with every
+node's computed styles, plus the CSS rules that produced them. It is keyed
+by a hash of the HTML and of every local stylesheet it links: a page whose
+HTML or CSS changed misses the cache instead of coming back stale.
+
+The stylesheets a page links are only known once it has been parsed, so a
+small manifest maps the HTML's hash to the stylesheet paths found when its
+snapshot was stored. Snapshots are marshal'ed tuples of flat arrays (one
+entry per node, in document order) over a string table, zlib-compressed;
+the least recently used ones are evicted once the directory outgrows
+max_bytes.
+"""
+import hashlib
+import json
+import marshal
+import os
+import zlib
+from array import array
+from types import MappingProxyType
+
+from css_parser import Rule
+from html_parser import DOMNode, DocumentIndex
+from page import stylesheet_path
+
+FORMAT = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+def default_directory():
+    return os.environ.get("MINIBROWSER_SNAPSHOTS") or os.path.join(
+        os.path.expanduser("~"), ".cache", "minibrowser", "snapshots")
+
+class SnapshotCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self._manifest = None
+        self.hits = 0
+        self.misses = 0
+
+    # -------- keys --------
+    @staticmethod
+    def _page_key(html_content, base_dir):
+        h = hashlib.sha256((html_content or "").encode("utf-8"))
+        h.update(b"\0" + os.path.abspath(base_dir or "").encode("utf-8"))
+        return h.hexdigest()
+
+    @staticmethod
+    def _snapshot_key(page_key, css_paths):
+        h = hashlib.sha256(page_key.encode("ascii"))
+        for path in css_paths:
+            h.update(b"\0" + path.encode("utf-8") + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                h.update(b"missing")
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".snap")
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _load_manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                    self._manifest = json.load(f)
+            except (OSError, ValueError):
+                self._manifest = {}
+        return self._manifest
+
+    # -------- lookups --------
+    def load(self, html_content, base_dir, css_parser):
+        """The page's snapshot DOM, or None on a miss.
+
+        On a hit css_parser gets the snapshot's rules and every node is
+        stamped with their generation, so the next render skips the cascade.
+        """
+        page_key = self._page_key(html_content, base_dir)
+        css_paths = self._load_manifest().get(page_key)
+        if css_paths is None:
+            self.misses += 1
+            return None
+        path = self._path(self._snapshot_key(page_key, css_paths))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            dom = decode(data, css_parser)
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass  # read-only or someone else's snapshot directory: still a hit
+        self.hits += 1
+        return dom
+
+    def store(self, html_content, base_dir, dom_root, css_parser, index=None):
+        """Snapshot a loaded, styled page (run the cascade first). Returns the
+        snapshot's path."""
+        index = index or DocumentIndex.build(dom_root)
+        css_paths = [p for p in (stylesheet_path(n, base_dir) for n in index.links) if p]
+        page_key = self._page_key(html_content, base_dir)
+        path = self._path(self._snapshot_key(page_key, css_paths))
+
+        os.makedirs(self.directory, exist_ok=True)
+        _write_atomic(path, encode(dom_root, css_parser.rules))
+        manifest = self._load_manifest()
+        manifest[page_key] = css_paths
+        _write_atomic(self._manifest_path(), json.dumps(manifest).encode("utf-8"))
+        self._evict()
+        return path
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".snap"):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime, st.st_size, name))
+                total += st.st_size
+        entries.sort()
+        # Keep at least the newest snapshot even if it alone is too big
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".snap") or name == "manifest.json":
+                    os.remove(os.path.join(self.directory, name))
+        self._manifest = None
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+# Format ------------------------------------------------------------------
+
+def encode(dom_root, rules):
+    """Serialize a styled DOM and its rules to bytes."""
+    strings, string_ids = [], {}
+
+    def sid(s):
+        i = string_ids.get(s)
+        if i is None:
+            i = string_ids[s] = len(strings)
+            strings.append(s)
+        return i
+
+    tags, parents, texts = array("i"), array("i"), array("i")
+    attr_counts, attr_ids, style_ids = array("i"), array("i"), array("i")
+    style_table, style_table_ids = [], {}
+
+    stack = [(dom_root, -1)] if dom_root is not None else []
+    while stack:
+        node, parent = stack.pop()
+        position = len(tags)
+        tags.append(sid(node.tag))
+        parents.append(parent)
+        texts.append(sid(node.text or ""))
+        attributes = node.attributes
+        attr_counts.append(len(attributes))
+        for k, v in attributes.items():
+            attr_ids.append(sid(k))
+            attr_ids.append(sid(v))  # None for valueless attributes
+        style = tuple(sid(x) for kv in (node.styles or {}).items() for x in kv)
+        i = style_table_ids.get(style)
+        if i is None:
+            i = style_table_ids[style] = len(style_table)
+            style_table.append(style)
+        style_ids.append(i)
+        kids = node.children
+        if kids:
+            stack.extend((kid, position) for kid in reversed(kids))
+
+    payload = (FORMAT, strings, tags.tobytes(), parents.tobytes(), texts.tobytes(),
+               attr_counts.tobytes(), attr_ids.tobytes(), style_ids.tobytes(), style_table,
+               [(r.selectors, r.declarations) for r in rules])
+    return zlib.compress(marshal.dumps(payload), 1)
+
+def decode(data, css_parser):
+    """Rebuild the DOM from encode()'s bytes; css_parser gets the rules."""
+    payload = marshal.loads(zlib.decompress(data))
+    if payload[0] != FORMAT:
+        raise ValueError(f"snapshot format {payload[0]}, expected {FORMAT}")
+    _, strings, *arrays, style_table, rules = payload
+    tags, parents, texts, attr_counts, attr_ids, style_ids = (_ints(a) for a in arrays)
+
+    css_parser.rules = [Rule(selectors, declarations) for selectors, declarations in rules]
+    generation = css_parser.index.generation
+    # Shared read-only styles, as the cascade leaves them (see render._StyleMemo)
+    styles = [MappingProxyType(dict(zip(*[iter(strings[i] for i in style)] * 2))) for style in style_table]
+
+    nodes = []
+    a = 0
+    for i in range(len(tags)):
+        parent = nodes[parents[i]] if parents[i] >= 0 else None
+        node = DOMNode(strings[tags[i]], parent)
+        if parent is not None:
+            parent.append_child(node)
+        count = attr_counts[i]
+        if count:
+            for j in range(a, a + 2 * count, 2):
+                node.set_attribute(strings[attr_ids[j]], strings[attr_ids[j + 1]])
+            a += 2 * count
+        node.text = strings[texts[i]]
+        node.styles = styles[style_ids[i]]
+        node.style_generation = generation
+        nodes.append(node)
+    return nodes[0] if nodes else None
+
+def _ints(data):
+    a = array("i")
+    a.frombytes(data)
+    return a
@@ -0,0 +1,153 @@
+"""A read-only text viewer for sources too big for a tk.Text.
+
+The text stays in a Python string. LineIndex records where each display
+line starts (very long lines, e.g. minified HTML, are cut every MAX_COLUMNS
+characters), and SourceView only puts the lines currently on screen into
+its Text widget, refilling it when the view scrolls. Scrolling moves by
+lines (wheel, arrows) or by pages (Page Up/Down, scrollbar trough).
+
+A view can hold several sections (page source, DOM dump, CSSOM dump...);
+a section given as a callable is only produced the first time it is shown.
+"""
+import tkinter as tk
+import tkinter.font as tkfont
+from array import array
+
+MAX_COLUMNS = 1000
+
+class LineIndex:
+    """Display lines of `text`: physical lines, cut every max_columns characters."""
+    def __init__(self, text, max_columns=MAX_COLUMNS):
+        self.text = text
+        starts = array("q", [0])
+        find, end_of_text, pos = text.find, len(text), 0
+        while True:
+            newline = find("\n", pos)
+            end = end_of_text if newline < 0 else newline
+            while end - pos > max_columns:
+                pos += max_columns
+                starts.append(pos)
+            if newline < 0:
+                break
+            pos = newline + 1
+            starts.append(pos)
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    def line(self, i):
+        start = self.starts[i]
+        end = self.starts[i + 1] if i + 1 < len(self.starts) else len(self.text)
+        if end > start and self.text[end - 1] == "\n":
+            end -= 1
+        return self.text[start:end]
+
+    def lines(self, first, count):
+        """Lines first .. first+count-1 (clipped), joined with newlines."""
+        last = min(first + count, len(self.starts))
+        return "\n".join(self.line(i) for i in range(max(first, 0), last))
+
+class SourceView(tk.Frame):
+    def __init__(self, master, height=10, **text_options):
+        super().__init__(master)
+        self.sections = []  # [name, text or callable, LineIndex or None]
+        self.current = None
+        self.top = 0
+        self.visible_lines = height
+
+        self.buttons = tk.Frame(self)
+        self.text = tk.Text(self, height=height, wrap="none", state="disabled", **text_options)
+        self.scroll = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._font = tkfont.Font(font=self.text.cget("font"))
+
+        text = self.text
+        text.bind("<Configure>", self._on_configure)
+        text.bind("<MouseWheel>", lambda e: self.scroll_lines(-3 if e.delta > 0 else 3))
+        text.bind("<Button-4>", lambda e: self.scroll_lines(-3))
+        text.bind("<Button-5>", lambda e: self.scroll_lines(3))
+        text.bind("<Up>", lambda e: self.scroll_lines(-1))
+        text.bind("<Down>", lambda e: self.scroll_lines(1))
+        text.bind("<Prior>", lambda e: self.scroll_pages(-1))
+        text.bind("<Next>", lambda e: self.scroll_pages(1))
+        text.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        text.bind("<Control-End>", lambda e: self.scroll_to(self.line_count()))
+        text.bind("<Button-1>", lambda e: text.focus_set(), add="+")
+
+    # -------- content --------
+    def set_sections(self, sections):
+        """sections: [(name, text or zero-argument callable returning text)]."""
+        self.sections = [[name, content, None] for name, content in sections]
+        for child in self.buttons.winfo_children():
+            child.destroy()
+        if len(self.sections) > 1:
+            for name, _, _ in self.sections:
+                tk.Button(self.buttons, text=name, command=lambda n=name: self.show(n)).pack(side=tk.LEFT)
+            self.buttons.pack(side=tk.TOP, fill=tk.X, before=self.scroll)
+        else:
+            self.buttons.pack_forget()
+        self.current = None
+        if self.sections:
+            self.show(self.sections[0][0])
+        else:
+            self._render()
+
+    def set_text(self, text):
+        self.set_sections([("Source", text)])
+
+    def clear(self):
+        self.set_sections([])
+
+    def show(self, name):
+        for section in self.sections:
+            if section[0] == name:
+                if section[2] is None:
+                    content = section[1]() if callable(section[1]) else section[1]
+                    section[2] = LineIndex(content or "")
+                self.current = section
+                self.top = 0
+                self._render()
+                return
+
+    def line_count(self):
+        return len(self.current[2]) if self.current else 0
+
+    # -------- scrolling --------
+    def scroll_to(self, line):
+        self.top = max(0, min(line, self.line_count() - self.visible_lines))
+        self._render()
+        return "break"
+
+    def scroll_lines(self, n):
+        return self.scroll_to(self.top + n)
+
+    def scroll_pages(self, n):
+        return self.scroll_to(self.top + n * max(1, self.visible_lines - 1))
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.line_count()))
+        elif unit == "pages":
+            self.scroll_pages(int(amount))
+        else:
+            self.scroll_lines(int(amount))
+
+    def _on_configure(self, event):
+        lines = max(1, event.height // max(1, self._font.metrics("linespace")))
+        if lines != self.visible_lines:
+            self.visible_lines = lines
+            self.scroll_to(self.top)
+
+    def _render(self):
+        text = self.text
+        text.configure(state="normal")
+        text.delete("1.0", tk.END)
+        total = self.line_count()
+        if total:
+            text.insert("1.0", self.current[2].lines(self.top, self.visible_lines))
+            self.scroll.set(self.top / total, min(1.0, (self.top + self.visible_lines) / total))
+        else:
+            self.scroll.set(0.0, 1.0)
+        text.configure(state="disabled")
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
+from source_view import SourceView
 
 class Browser:
     def __init__(self, root):
@@ -15,8 +16,8 @@ class Browser:
         self.url_entry.bind("<Return>", self.load_url)
         tk.Button(top, text="Load", command=self.load_url).pack(side=tk.LEFT, padx=4, pady=4)
 
-        self.source_text = tk.Text(root, height=12)
-        self.source_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.source_view = SourceView(root, height=12)
+        self.source_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas = tk.Canvas(root, bg="white")
         self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
@@ -34,8 +35,7 @@ class Browser:
 
         with open(url, "r", encoding="utf-8") as f:
             self.current_html = f.read()
-        self.source_text.delete("1.0", tk.END)
-        self.source_text.insert(tk.END, self.current_html)
+        self.source_view.set_text(self.current_html)
         self.canvas.delete("all")  # no rendering yet
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
 from html_parser import parse_html, dom_to_string
+from source_view import SourceView
 
 class Browser:
     def __init__(self, root):
@@ -14,7 +15,7 @@ class Browser:
         self.url_entry.bind("<Return>", self.load_url)
         tk.Button(top, text="Load", command=self.load_url).pack(side=tk.LEFT, padx=4, pady=4)
 
-        self.source_text = tk.Text(root, height=16); self.source_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.source_view = SourceView(root, height=16); self.source_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas = tk.Canvas(root, bg="white"); self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
     def load_url(self, event=None):
@@ -30,8 +31,8 @@ class Browser:
             html = f.read()
 
         self.dom = parse_html(html)
-        self.source_text.delete("1.0", tk.END)
-        self.source_text.insert(tk.END, html + "\n\n----- DOM -----\n" + dom_to_string(self.dom))
+        # DOM dump built only when its section is opened
+        self.source_view.set_sections([("Source", html), ("DOM", lambda: dom_to_string(self.dom))])
         self.canvas.delete("all")  # rendering comes later
 
 if __name__ == "__main__":
@@ -1,13 +1,30 @@
+import sys
 from html.parser import HTMLParser as _HTMLParser
+from types import MappingProxyType
+
+# shared empty containers; a node gets its own on first write
+_NO_CHILDREN = ()
+_NO_ATTRIBUTES = MappingProxyType({})
+_NO_STYLES = MappingProxyType({})
 
 class DOMNode:
+    __slots__ = ("tag", "parent", "children", "attributes", "text", "styles")
+
     def __init__(self, tag, parent=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if tag else tag
         self.parent = parent
-        self.children = []
-        self.attributes = {}
+        self.children = _NO_CHILDREN
+        self.attributes = _NO_ATTRIBUTES
         self.text = ""
-        self.styles = {}
+        self.styles = _NO_STYLES
+
+    def append_child(self, child):
+        if self.children is _NO_CHILDREN: self.children = [child]
+        else: self.children.append(child)
+
+    def set_attribute(self, name, value):
+        if self.attributes is _NO_ATTRIBUTES: self.attributes = {}
+        self.attributes[sys.intern(name)] = value
 
 def dom_to_string(node, indent=0):
     if not node: return ""
@@ -29,25 +46,32 @@ class MiniHTMLParser(_HTMLParser):
         super().__init__()
         self.root = None
         self.cur = None
+        self.texts = {}  # open node -> text chunks, joined when it ends
 
     def handle_starttag(self, tag, attrs):
         node = DOMNode(tag, self.cur)
-        node.attributes = dict(attrs)
-        if self.cur: self.cur.children.append(node)
+        if attrs: node.attributes = {sys.intern(k): v for k, v in attrs}
+        if self.cur: self.cur.append_child(node)
         else: self.root = node
         self.cur = node
 
     def handle_endtag(self, tag):
         if self.cur and self.cur.parent:
+            self.flush_text(self.cur)
             self.cur = self.cur.parent
 
     def handle_data(self, data):
         if self.cur:
             txt = data.strip()
-            if txt:
-                if self.cur.text and not self.cur.text.endswith(" "):
-                    self.cur.text += " "
-                self.cur.text += txt
+            if txt: self.texts.setdefault(self.cur, []).append(txt)
+
+    def flush_text(self, node):
+        parts = self.texts.pop(node, None)
+        if parts: node.text = " ".join(parts)
+
+    def close(self):
+        super().close()
+        for node in list(self.texts): self.flush_text(node)
 
 def parse_html(html):
-    p = MiniHTMLParser(); p.feed(html or ""); return p.root
+    p = MiniHTMLParser(); p.feed(html or ""); p.close(); return p.root
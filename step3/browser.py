@@ -3,6 +3,7 @@ from tkinter import filedialog, messagebox
 import os, json
 from html_parser import parse_html, dom_to_string
 from css_parser import CSSParser
+from source_view import SourceView
 
 class Browser:
     def __init__(self, root):
@@ -16,7 +17,7 @@ class Browser:
         self.url_entry.bind("<Return>", self.load_url)
         tk.Button(top, text="Load", command=self.load_url).pack(side=tk.LEFT, padx=4, pady=4)
 
-        self.source_text = tk.Text(root, height=18); self.source_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.source_view = SourceView(root, height=18); self.source_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas = tk.Canvas(root, bg="white"); self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
     def _walk(self, n):
@@ -24,19 +25,46 @@ class Browser:
         yield n
         for c in n.children: yield from self._walk(c)
 
-    def _apply_css(self, node, rules):
+    def _apply_css(self, node, rules, anc=None):
+        # anc: keys (tag, #id, .class) of the ancestors -> count, kept along the recursion
+        if anc is None: anc = {}
         node.styles = node.styles or {}
         for r in rules:
             sels = list(r.get("selectors", []) or [])
             if not sels and "selector" in r: sels = [r["selector"]]
             for sel in sels:
-                if self._match(node, sel):
+                if self._match(node, sel, anc):
                     node.styles.update(r.get("style", {}))
-        for c in node.children: self._apply_css(c, rules)
+        attrs = node.attributes
+        keys = [node.tag.lower()] + (["#" + attrs["id"]] if attrs.get("id") else []) + \
+               ["." + c for c in (attrs.get("class") or "").split()]
+        for k in keys: anc[k] = anc.get(k, 0) + 1
+        for c in node.children: self._apply_css(c, rules, anc)
+        for k in keys:
+            anc[k] -= 1
+            if not anc[k]: del anc[k]
+
+    def _match(self, node, sel, anc=None):
+        # "nav > a", "ul li": matched right to left; ancestors missing from anc reject it at once
+        parts = (sel or "").replace(">", " > ").split()
+        if not parts or parts[0] == ">" or parts[-1] == ">": return False
+        if anc is not None and any((p if p[0] in ".#" else p.lower()) not in anc
+                                   for p in parts[:-1] if p != ">"): return False
+        return bool(self._match_from(node, parts, len(parts) - 1))
+
+    def _match_from(self, node, parts, i):
+        # True: match; False: fails from node, a higher one may do; None: no higher one can either
+        if not self._match_one(node, parts[i]): return False
+        if i == 0: return True
+        if parts[i - 1] == ">": return None if node.parent is None else self._match_from(node.parent, parts, i - 2)
+        p = node.parent
+        while p is not None:
+            r = self._match_from(p, parts, i - 1)
+            if r is not False: return r
+            p = p.parent
+        return None
 
-    def _match(self, node, sel):
-        sel = (sel or "").strip()
-        if not sel: return False
+    def _match_one(self, node, sel):
         tag = node.tag.lower()
         attrs = node.attributes
         if sel.startswith("."): return sel[1:] in (attrs.get("class") or "").split()
@@ -76,9 +104,9 @@ class Browser:
 
         self._apply_css(self.dom, self.css.rules)
 
-        self.source_text.delete("1.0", tk.END)
-        self.source_text.insert(tk.END, html + "\n\n----- DOM -----\n" + dom_to_string(self.dom))
-        self.source_text.insert(tk.END, "\n\n----- CSSOM -----\n" + json.dumps(self.css.rules, indent=2))
+        # DOM / CSSOM dumps built only when their section is opened
+        self.source_view.set_sections([("Source", html), ("DOM", lambda: dom_to_string(self.dom)),
+                                       ("CSSOM", lambda: json.dumps(self.css.rules, indent=2))])
         self.canvas.delete("all")  # rendering comes later
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+# Step 4 — Layout en lot : parse → cascade → layout → export texte, en parallèle
+# Usage:
+#   python batch.py pages/ [autres/*.html ...] [--css style.css] [--workers 8]
+#                   [--chunksize 16] [--out-dir sorties/] [--report timings.tsv]
+#
+# Chaque page produit PAGE.layout.txt (à côté de la page, ou dans --out-dir).
+# Les pages sont réparties sur un pool de processus : le CSS est parsé une
+# seule fois par processus, et chaque processus écrit lui-même ses sorties,
+# seuls un statut et un temps remontent au processus principal.
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from html_parser import parse_html
+from css_parser import Cascade, CSSParser, apply_css_to_dom
+from layout import build_layout_tree, layout_to_string
+
+HTML_EXTENSIONS = (".html", ".htm")
+
+# Règles du processus courant, déjà dans l'ordre de la cascade (initialisées par _init_worker)
+_rules = Cascade([])
+_options = {}
+
+def _init_worker(css, viewport_width, out_dir):
+    global _rules, _options
+    _rules = Cascade(CSSParser().parse_css(css))
+    _options = {"viewport_width": viewport_width, "out_dir": out_dir}
+
+def output_path(html_path, out_dir=None):
+    if not out_dir:
+        return html_path + ".layout.txt"
+    return os.path.join(out_dir, os.path.basename(html_path) + ".layout.txt")
+
+def layout_file(html_path):
+    """Une page : (chemin, ok, secondes, nb d'avertissements, erreur)."""
+    started = time.perf_counter()
+    try:
+        with open(html_path, "r", encoding="utf-8", errors="ignore") as f:
+            html = f.read()
+        dom_root, errors = parse_html(html)
+        apply_css_to_dom(dom_root, _rules)
+        layout_root = build_layout_tree(dom_root, viewport_width=_options["viewport_width"])
+        with open(output_path(html_path, _options["out_dir"]), "w", encoding="utf-8") as f:
+            f.write(layout_to_string(layout_root))
+        return html_path, True, time.perf_counter() - started, errors.total, ""
+    except Exception as e:
+        return html_path, False, time.perf_counter() - started, 0, f"{type(e).__name__}: {e}"
+
+def collect_pages(inputs, recursive=False):
+    """Fichiers HTML désignés par des chemins, des dossiers ou des motifs glob (sans doublons, triés)."""
+    pages = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*") if recursive else os.path.join(item, "*")
+            candidates = glob.glob(pattern, recursive=recursive)
+        elif glob.has_magic(item):
+            candidates = glob.glob(item, recursive=True)
+        else:
+            candidates = [item]
+        pages.extend(p for p in candidates
+                     if os.path.isfile(p) and p.lower().endswith(HTML_EXTENSIONS))
+    return sorted(set(pages))
+
+def run_batch(pages, css="", workers=None, chunksize=None, viewport_width=800, out_dir=None):
+    """Met en page toutes les pages ; renvoie la liste des résultats de layout_file."""
+    workers = workers or os.cpu_count() or 1
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if workers == 1:
+        _init_worker(css, viewport_width, out_dir)
+        return [layout_file(p) for p in pages]
+    # Des paquets assez gros pour amortir l'aller-retour, assez petits pour équilibrer la fin
+    chunksize = chunksize or max(1, min(64, len(pages) // (workers * 8)))
+    with multiprocessing.Pool(workers, _init_worker, (css, viewport_width, out_dir)) as pool:
+        return list(pool.imap_unordered(layout_file, pages, chunksize))
+
+def summarize(results, elapsed, workers, slowest=5):
+    ok = [r for r in results if r[1]]
+    failed = [r for r in results if not r[1]]
+    busy = sum(r[2] for r in results)
+    lines = [f"{len(results)} page(s) en {elapsed:.2f}s avec {workers} processus : "
+             f"{len(ok)} ok, {len(failed)} échec(s), {len(results) / elapsed if elapsed else 0:.1f} pages/s",
+             f"temps cumulé par page {busy:.2f}s (moyenne {busy / len(results) * 1000 if results else 0:.1f} ms), "
+             f"{sum(r[3] for r in results)} avertissement(s) de parsing"]
+    if ok:
+        lines.append("plus lentes :")
+        for path, _, seconds, _, _ in sorted(ok, key=lambda r: r[2], reverse=True)[:slowest]:
+            lines.append(f"  {seconds * 1000:8.1f} ms  {path}")
+    if failed:
+        lines.append("échecs :")
+        for path, _, _, _, error in failed:
+            lines.append(f"  {path}: {error}")
+    return "\n".join(lines)
+
+def write_report(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("page\tstatut\tms\tavertissements\terreur\n")
+        for page, ok, seconds, warnings, error in sorted(results):
+            f.write(f"{page}\t{'ok' if ok else 'échec'}\t{seconds * 1000:.2f}\t{warnings}\t{error}\n")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Layout de pages HTML en lot (sorties PAGE.layout.txt).")
+    ap.add_argument("inputs", nargs="+", help="fichiers, dossiers ou motifs glob de pages HTML")
+    ap.add_argument("--css", help="feuille de style appliquée à toutes les pages")
+    ap.add_argument("-r", "--recursive", action="store_true", help="parcourir les sous-dossiers")
+    ap.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunksize", type=int, help="pages envoyées par lot à un processus (défaut : auto)")
+    ap.add_argument("--viewport", type=int, default=800, help="largeur du viewport")
+    ap.add_argument("-o", "--out-dir", help="dossier des .layout.txt (défaut : à côté des pages)")
+    ap.add_argument("--report", help="fichier TSV des temps par page")
+    args = ap.parse_args(argv)
+
+    pages = collect_pages(args.inputs, args.recursive)
+    if not pages:
+        print("Aucune page HTML trouvée.", file=sys.stderr)
+        return 1
+    css = ""
+    if args.css:
+        with open(args.css, "r", encoding="utf-8", errors="ignore") as f:
+            css = f.read()
+
+    started = time.perf_counter()
+    results = run_batch(pages, css, args.workers, args.chunksize, args.viewport, args.out_dir)
+    elapsed = time.perf_counter() - started
+    print(summarize(results, elapsed, args.workers))
+    if args.report:
+        write_report(results, args.report)
+        print(f"Temps par page → {args.report}")
+    return 1 if any(not r[1] for r in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 # Step 4 — Layout Engine : box model, block/inline, position: static/relative/absolute
 # Usage:
 #   python browser.py path/to/file.html [path/to/file.css]
+#   (plusieurs pages à la fois : voir batch.py)
 #
 # Affiche un arbre de layout (x,y,w,h) avec marges/paddings/bordures et positions.
 # Cette étape ne dessine rien (le rendu viendra en S5).
@@ -18,12 +19,13 @@ def pick_file(title, patterns):
 def main():
     if len(sys.argv) >= 2:
         html_path = sys.argv[1]
+        # HTML passé en argument : pas de boîte de dialogue, le CSS reste facultatif
+        css_path = sys.argv[2] if len(sys.argv) >= 3 else None
     else:
         html_path = pick_file("Choisir un fichier HTML", [("Fichiers HTML","*.html;*.htm"), ("Tous","*.*")])
         if not html_path:
             print("Aucun fichier HTML choisi."); return
-
-    css_path = sys.argv[2] if len(sys.argv) >= 3 else pick_file("Choisir un fichier CSS (facultatif)", [("Fichiers CSS","*.css"), ("Tous","*.*")])
+        css_path = pick_file("Choisir un fichier CSS (facultatif)", [("Fichiers CSS","*.css"), ("Tous","*.*")])
 
     html = open(html_path, "r", encoding="utf-8", errors="ignore").read()
     dom_root, errors = parse_html(html)
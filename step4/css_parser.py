@@ -1,100 +1,408 @@
 # Step 4 — Parser CSS (repris de S3) + application au DOM
 import re
+from array import array
+from types import MappingProxyType
 
-def _strip_comments(s: str) -> str:
-    return re.sub(r'/\*.*?\*/', '', s, flags=re.DOTALL)
-
-def _parse_declarations(body: str):
-    decls = {}
-    for d in body.split(';'):
-        if not d or ':' not in d: continue
-        k, v = d.split(':', 1)
-        k = k.strip().lower()
-        v = v.strip()
-        if not k: continue
-        decls[k] = v
-    return decls
+from traversal import preorder, walk
 
 def _specificity_for_selector(sel: str):
     sel = (sel or '').strip()
     a = sel.count('#')
     b = sel.count('.')
-    c = 0
-    m = re.match(r'^[a-zA-Z][a-zA-Z0-9_-]*', sel)
-    if m: c = 1
+    first = sel[:1]
+    c = 1 if first.isascii() and first.isalpha() else 0  # commence par un nom de balise
     return (a, b, c)
 
+_TAG = re.compile(r'^([a-zA-Z][a-zA-Z0-9_-]*)')
+_PARTS = re.compile(r'([.#])([a-zA-Z0-9_-]+)')
+_SELECTOR_TOKENS = re.compile(r'>|[^\s>]+')
+
+class Compound:
+    """Sélecteur composé (div.note#main) : balise (minuscules), id et classes
+    exigés. Comme l'ancien _match, seuls le nom de balise en tête et les
+    .classe / #id comptent ; le reste du texte est ignoré."""
+    __slots__ = ("tag", "id", "classes", "possible")
+
+    def __init__(self, text: str):
+        m = _TAG.match(text)
+        self.tag = m.group(1).lower() if m else None
+        ids = set()
+        classes = set()
+        for kind, name in _PARTS.findall(text[m.end():] if m else text):
+            (ids if kind == '#' else classes).add(name)
+        self.id = next(iter(ids)) if len(ids) == 1 else None
+        self.classes = frozenset(classes)
+        # deux #id différents ne correspondent à rien
+        self.possible = len(ids) <= 1
+
+    def matches_node(self, node, class_sets) -> bool:
+        attrs = getattr(node, 'attributes', {}) or {}
+        return ((self.tag is None or self.tag == (node.tag or '').lower())
+                and (self.id is None or self.id == attrs.get('id'))
+                and self.classes <= _class_set(attrs, class_sets))
+
+def _key_hashes(tag, element_id, classes):
+    """Empreintes qu'un élément laisse dans un AncestorFilter."""
+    hashes = [hash(tag)] if tag else []
+    if element_id:
+        hashes.append(hash('#' + element_id))
+    for cls in classes:
+        hashes.append(hash('.' + cls))
+    return hashes
+
+class Selector:
+    """Sélecteur compilé, lu de droite à gauche comme dans les navigateurs.
+
+    tag / id / classes : ceux du sujet (le composé le plus à droite) ;
+    chain : les paires (combinateur, Compound) à trouver au-dessus de lui,
+    '>' pour le parent, ' ' pour un ancêtre quelconque ; ancestor_hashes :
+    les clés que ces ancêtres doivent avoir laissées dans l'AncestorFilter.
+    """
+    __slots__ = ("text", "tag", "id", "classes", "chain", "ancestor_hashes",
+                 "specificity", "possible")
+
+    def __init__(self, text: str):
+        self.text = text = (text or '').strip()
+        tokens = _SELECTOR_TOKENS.findall(text)
+        compounds, combinators, pending, valid = [], [], None, bool(tokens)
+        for tok in tokens:
+            if tok == '>':
+                valid = valid and pending is None and bool(compounds)
+                pending = '>'
+            else:
+                if compounds:
+                    combinators.append(pending or ' ')
+                compounds.append(tok)
+                pending = None
+        valid = valid and pending is None
+
+        parsed = [Compound(c) for c in compounds] or [Compound('')]
+        subject = parsed[-1]
+        self.tag, self.id, self.classes = subject.tag, subject.id, subject.classes
+        self.chain = tuple(zip(reversed(combinators), reversed(parsed[:-1])))
+        self.ancestor_hashes = tuple(h for _, c in self.chain for h in _key_hashes(c.tag, c.id, c.classes))
+        specificities = [_specificity_for_selector(c) for c in compounds] or [(0, 0, 0)]
+        self.specificity = tuple(map(sum, zip(*specificities)))
+        self.possible = valid and all(c.possible for c in parsed)
+
+    def matches(self, tag, element_id, classes, node=None, class_sets=None) -> bool:
+        """tag en minuscules, classes : ensemble des classes du nœud ; node
+        est nécessaire dès que le sélecteur a un combinateur."""
+        return (self.possible
+                and (self.tag is None or self.tag == tag)
+                and (self.id is None or self.id == element_id)
+                and self.classes <= classes
+                and (not self.chain
+                     or bool(_match_chain(node, self.chain, 0, {} if class_sets is None else class_sets))))
+
+    def __repr__(self):
+        return f"Selector({self.text!r})"
+
+def _match_chain(node, chain, i, class_sets):
+    """chain[i:] contre les ancêtres de node (qui correspond au composé de
+    droite). True : correspondance ; False : échec depuis node, mais un
+    élément plus haut pourrait convenir ; None : échec depuis tout élément
+    plus haut aussi, l'appelant arrête de remonter."""
+    if i == len(chain):
+        return True
+    combinator, compound = chain[i]
+    parent = node.parent
+    if combinator == '>':
+        if parent is None:
+            return None
+        if not compound.matches_node(parent, class_sets):
+            return False
+        return _match_chain(parent, chain, i + 1, class_sets)
+    while parent is not None:
+        if compound.matches_node(parent, class_sets):
+            result = _match_chain(parent, chain, i + 1, class_sets)
+            if result is not False:
+                return result
+        parent = parent.parent
+    return None
+
+class AncestorFilter:
+    """Filtre de Bloom à compteurs des clés (balise, #id, .classe) des
+    ancêtres du nœud en cours : un élément y entre avant ses enfants et en
+    sort après eux. Un sélecteur dont une clé d'ancêtre manque est rejeté
+    sans remonter l'arbre ; un « peut-être » est vérifié de droite à gauche."""
+    BITS = 12
+    MASK = (1 << BITS) - 1
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts = array('i', bytes(4 << self.BITS))
+
+    def push(self, tag, element_id, classes):
+        """Ajoute un élément ; renvoie ses empreintes, à rendre à pop()."""
+        hashes = _key_hashes(tag, element_id, classes)
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            counts[h & mask] += 1
+            counts[(h >> bits) & mask] += 1
+        return hashes
+
+    def pop(self, hashes):
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            counts[h & mask] -= 1
+            counts[(h >> bits) & mask] -= 1
+
+    def may_contain(self, hashes):
+        counts, mask, bits = self.counts, self.MASK, self.BITS
+        for h in hashes:
+            if not counts[h & mask] or not counts[(h >> bits) & mask]:
+                return False
+        return True
+
+class Rule:
+    """Une règle : sélecteurs (texte, compilés à la première demande),
+    déclarations (propriété, valeur) dans l'ordre du source et rang dans la
+    feuille. Le parsing ne compile rien : c'est Cascade qui le fait."""
+    __slots__ = ("selectors", "declarations", "order", "_matchers")
+
+    def __init__(self, selectors, declarations, order=0):
+        self.selectors = selectors
+        self.declarations = declarations
+        self.order = order
+        self._matchers = None
+
+    @property
+    def matchers(self):
+        if self._matchers is None:
+            self._matchers = tuple(Selector(s) for s in self.selectors)
+        return self._matchers
+
+    @property
+    def specificities(self):
+        return tuple(m.specificity for m in self.matchers)
+
+    @property
+    def style(self):
+        return dict(self.declarations)
+
+    def __repr__(self):
+        return f"Rule({self.selectors!r}, {self.declarations!r}, order={self.order})"
+
+# Un jeton par correspondance, sans jamais revenir en arrière : commentaires
+# (non terminé : jusqu'à la fin), chaînes (qui peuvent contenir { } ;),
+# les trois caractères de structure, et les suites de tout le reste.
+_TOKENS = re.compile(r"""
+      /\*.*?(?:\*/|\Z)
+    | "(?:[^"\\]|\\.)*(?:"|\Z)
+    | '(?:[^'\\]|\\.)*(?:'|\Z)
+    | [{};]
+    | [^{};"'/]+
+    | /
+""", re.S | re.X)
+
+# Chemin rapide : une règle sans commentaire, chaîne, @ ni bloc imbriqué est
+# lue d'un seul coup, ancrée là où finit la précédente ; un échec s'arrête
+# au premier caractère refusé, le parsing reste linéaire.
+_PLAIN_RULE = re.compile(r"""([^{};"'/@]*)\{([^{}"'/]*)\}""")
+
+def _parse_declarations(body: str):
+    decls = []
+    for d in body.split(';'):
+        k, colon, v = d.partition(':')
+        if not colon: continue
+        k = k.strip().lower()
+        if not k: continue
+        decls.append((k, v.strip()))
+    return tuple(decls)
+
 def _split_selectors(sel_group: str):
-    return [s.strip() for s in sel_group.split(',') if s.strip()]
+    if ',' not in sel_group:
+        sel = sel_group.strip()
+        return (sel,) if sel else ()
+    return tuple([s for s in map(str.strip, sel_group.split(',')) if s])
+
+def parse_stylesheet(css: str):
+    """Feuille de style → liste de Rule, en une seule passe linéaire.
+
+    Les blocs @media, @font-face, @keyframes... et les blocs imbriqués dans
+    une règle sont sautés en entier ; @import... s'arrête au ';' ; une règle
+    encore ouverte en fin de feuille est gardée, comme dans les navigateurs.
+    """
+    rules = []
+    plain_rule, token = _PLAIN_RULE.match, _TOKENS.match
+    prelude = []      # texte de la liste de sélecteurs (ou de la @-règle) en cours
+    skip = 0          # profondeur dans un bloc sauté
+    in_rule = False
+    selectors = ()
+    decls = []
+    name = None       # propriété de la déclaration en cours, une fois son ':' lu
+    pieces = []       # texte de la propriété (avant ':') ou de la valeur (après)
+    pos, end = 0, len(css)
+
+    while pos < end:
+        if not (in_rule or skip or prelude):
+            m = plain_rule(css, pos)
+            if m:
+                pos = m.end()
+                selectors = _split_selectors(m.group(1))
+                if selectors:
+                    rules.append(Rule(selectors, _parse_declarations(m.group(2)), len(rules)))
+                continue
+        m = token(css, pos)
+        if m is None:
+            # guillemet isolé que les motifs de chaîne n'ont pas pris
+            pos += 1
+            continue
+        tok = m.group()
+        pos = m.end()
+        first = tok[0]
+        if first == "/" and tok.startswith("/*"):
+            continue
+        if skip:
+            if first == "{":
+                skip += 1
+            elif first == "}":
+                skip -= 1
+            continue
+        if not in_rule:
+            if first == "{":
+                text = "".join(prelude).strip()
+                prelude = []
+                selectors = _split_selectors(text)
+                if text.startswith("@") or not selectors:
+                    skip = 1
+                else:
+                    in_rule = True
+            elif first == ";" or first == "}":
+                prelude = []
+            else:
+                prelude.append(tok)
+            continue
+
+        if first == ";" or first == "}":
+            if name:
+                decls.append((name, "".join(pieces).strip()))
+            name = None
+            pieces = []
+            if first == "}":
+                rules.append(Rule(selectors, tuple(decls), len(rules)))
+                decls = []
+                in_rule = False
+        elif first == "{":
+            # Pas une déclaration (règle imbriquée, accolade parasite) : on saute son bloc
+            name = None
+            pieces = []
+            skip = 1
+        elif name is None and first not in "\"'" and ":" in tok:
+            before, after = tok.split(":", 1)
+            pieces.append(before)
+            name = "".join(pieces).strip().lower()
+            pieces = [after]
+        else:
+            pieces.append(tok)
+
+    if in_rule:
+        if name:
+            decls.append((name, "".join(pieces).strip()))
+        rules.append(Rule(selectors, tuple(decls), len(rules)))
+    return rules
 
 class CSSParser:
     def __init__(self):
         self.rules = []
 
     def parse_css(self, css: str):
-        self.rules = []
-        if not css: return self.rules
-        css = _strip_comments(css)
-        order = 0
-        for m in re.finditer(r'([^{]+)\{([^}]*)\}', css):
-            sel_group = m.group(1).strip()
-            body = m.group(2)
-            decls = _parse_declarations(body)
-            selectors = _split_selectors(sel_group)
-            if not selectors: continue
-            specificities = {s: _specificity_for_selector(s) for s in selectors}
-            rule = {'selectors': selectors, 'style': decls, 'order': order, 'specificities': specificities}
-            self.rules.append(rule)
-            for s in selectors:
-                self.rules.append({'selector': s, 'style': decls, 'order': order, 'specificity': specificities[s]})
-            order += 1
+        self.rules = parse_stylesheet(css) if css else []
         return self.rules
 
-def _classes(attrs):
-    cl = (attrs.get('class') or '').strip()
-    return [c for c in cl.split() if c]
+class Cascade:
+    """Les sélecteurs de toutes les règles, triés une fois pour toutes dans
+    l'ordre de la cascade (spécificité, puis rang) : les correspondances d'un
+    nœud sortent déjà triées. Entrées : (balise, id, classes, déclarations,
+    sélecteur) — le sélecteur seulement s'il a des ancêtres à vérifier."""
+    __slots__ = ("entries", "has_combinators")
+
+    def __init__(self, rules):
+        rules = list(rules)
+        compiled = {}  # texte → Selector : chaque sélecteur distinct compilé une fois
+        for r in rules:
+            if r._matchers is None:
+                r._matchers = tuple([compiled[s] if s in compiled else compiled.setdefault(s, Selector(s))
+                                     for s in r.selectors])
+        matched = sorted(((m.specificity, r.order, m, r.declarations)
+                          for r in rules for m in r.matchers if m.possible),
+                         key=lambda e: (e[0], e[1]))
+        self.entries = tuple((m.tag, m.id, m.classes, decls, m if m.chain else None)
+                             for _, _, m, decls in matched)
+        self.has_combinators = any(e[4] is not None for e in self.entries)
+
+def _class_set(attrs, cache):
+    raw = attrs.get('class')
+    if not raw:
+        return frozenset()
+    classes = cache.get(raw)
+    if classes is None:
+        classes = cache[raw] = frozenset(raw.split())
+    return classes
 
 def _match(node, sel: str) -> bool:
-    sel = (sel or '').strip()
-    if not sel: return False
-    tag = (node.tag or '').lower()
     attrs = getattr(node, 'attributes', {}) or {}
-
-    m = re.match(r'^([a-zA-Z][a-zA-Z0-9_-]*)', sel)
-    if m:
-        if tag != m.group(1).lower():
-            return False
-        remainder = sel[m.end():]
-    else:
-        remainder = sel
-
-    for part in re.finditer(r'([.#])([a-zA-Z0-9_-]+)', remainder):
-        kind, name = part.group(1), part.group(2)
-        if kind == '#':
-            if attrs.get('id') != name:
-                return False
-        else:
-            if name not in _classes(attrs):
-                return False
-    return True
+    class_sets = {}
+    return Selector(sel).matches((node.tag or '').lower(), attrs.get('id'),
+                                 _class_set(attrs, class_sets), node, class_sets)
 
 def apply_css_to_dom(dom_root, rules):
+    """rules : liste de Rule (parse_css) ou Cascade déjà construite.
+
+    Avec des combinateurs, un AncestorFilter suit le parcours : la plupart
+    des sélecteurs à ancêtres sont écartés sans remonter l'arbre.
+
+    Les éléments de même signature (balise, id, ensemble de classes) ont le
+    même style calculé : un dict en lecture seule (MappingProxyType) partagé,
+    calculé une fois ; pour le modifier, on en affecte un nouveau à
+    node.styles. Avec des combinateurs, la clé est le contexte de l'élément,
+    un numéro pour sa signature et le contexte de son parent."""
     if dom_root is None: return
+    cascade = rules if isinstance(rules, Cascade) else Cascade(rules)
+    entries = cascade.entries
+    class_sets = {}  # valeur de l'attribut class → frozenset, partagé entre nœuds
+    computed = {}    # signature ou contexte → style partagé
+    ancestors = AncestorFilter() if cascade.has_combinators else None
 
-    def walk(node):
-        if getattr(node, 'styles', None) is None:
-            node.styles = {}
-        matches = []
-        for r in rules:
-            sel = r.get('selector')
-            if not sel: continue
-            if _match(node, sel):
-                matches.append(r)
-        matches.sort(key=lambda r: (r.get('specificity', (0,0,0)), r.get('order', 0)))
-        for r in matches:
-            for k, v in (r.get('style') or {}).items():
-                node.styles[k] = v
-        for c in getattr(node, 'children', []):
-            walk(c)
-
-    walk(dom_root)
+    def signature(node):
+        attrs = getattr(node, 'attributes', {}) or {}
+        return (node.tag or '').lower(), attrs.get('id'), _class_set(attrs, class_sets)
+
+    def style(node, key):
+        shared = computed.get(key)
+        if shared is None:
+            tag, element_id, classes = signature(node)
+            styles = {}
+            for sel_tag, sel_id, sel_classes, decls, chained in entries:
+                if ((sel_tag is None or sel_tag == tag)
+                        and (sel_id is None or sel_id == element_id)
+                        and sel_classes <= classes
+                        and (chained is None
+                             or (ancestors.may_contain(chained.ancestor_hashes)
+                                 and _match_chain(node, chained.chain, 0, class_sets)))):
+                    styles.update(decls)
+            shared = computed[key] = MappingProxyType(styles)
+        if getattr(node, 'styles', None):
+            node.styles = {**node.styles, **shared}  # garde les styles déjà posés
+        else:
+            node.styles = shared
+
+    if ancestors is None:
+        for node in preorder(dom_root):
+            style(node, signature(node))
+        return
+
+    contexts = {}  # (signature, contexte du parent) → contexte
+
+    def enter(node, parent):
+        keys = signature(node)
+        context = contexts.setdefault((keys, parent[1]), len(contexts))
+        style(node, context)
+        return (ancestors.push(*keys) if node.children else None), context
+
+    def leave(node, result, _):
+        if result[0]:
+            ancestors.pop(result[0])
+
+    walk(dom_root, enter, leave, context=(None, None))
@@ -1,62 +1,145 @@
 # Step 4 — Parseur HTML (repris de S2/S3) : DOM + récupération d'erreurs basiques
+import sys
 from html.parser import HTMLParser as _HTMLParser
+from types import MappingProxyType
+
+# Conteneurs vides partagés (lecture seule) : un nœud n'alloue les siens
+# qu'à la première écriture
+_NO_CHILDREN = ()
+_NO_ATTRIBUTES = MappingProxyType({})
+_NO_STYLES = MappingProxyType({})
 
 class DOMNode:
+    __slots__ = ('tag', 'parent', 'children', 'attributes', 'text', 'styles')
+
     def __init__(self, tag, parent=None):
-        self.tag = (tag or '').lower()
+        self.tag = sys.intern((tag or '').lower())
         self.parent = parent
-        self.children = []
-        self.attributes = {}
+        self.children = _NO_CHILDREN
+        self.attributes = _NO_ATTRIBUTES
         self.text = ""
-        self.styles = {}
+        self.styles = _NO_STYLES
+
+    def append_child(self, child):
+        if self.children is _NO_CHILDREN:
+            self.children = [child]
+        else:
+            self.children.append(child)
+
+    def set_attribute(self, name, value):
+        if self.attributes is _NO_ATTRIBUTES:
+            self.attributes = {}
+        self.attributes[sys.intern(name)] = value
 
 SELF_CLOSING = {'br','img','hr','meta','link','input','source'}
 AUTO_CLOSE_ON_START = {'p','li'}
 
+# Au-delà de MAX_ERRORS messages, les erreurs sont seulement comptées par type
+MAX_ERRORS = 100
+
+class ParseErrors(list):
+    """Messages d'erreur (au plus `limit`) ; counts compte toutes les erreurs par type."""
+    def __init__(self, limit=MAX_ERRORS):
+        super().__init__()
+        self.limit = limit
+        self.counts = {}
+
+    def add(self, kind, message):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if len(self) < self.limit:
+            self.append(message)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def finish(self):
+        """Ajoute une ligne récapitulant les erreurs non conservées, s'il y en a."""
+        dropped = self.total - len(self)
+        if dropped > 0:
+            kinds = ", ".join(f"{kind} × {n}" for kind, n in sorted(self.counts.items(), key=lambda kv: -kv[1]))
+            self.append(f"… {dropped} autre(s) erreur(s) non détaillée(s) (total par type : {kinds}).")
+
 class _MiniHTMLParser(_HTMLParser):
+    """Pile explicite des éléments ouverts + nombre d'éléments ouverts par tag :
+    une balise fermante sans élément ouvert correspondant est rejetée en O(1),
+    et chaque élément n'est dépilé qu'une fois (coût total linéaire même sur
+    un document très mal formé)."""
     def __init__(self):
         super().__init__(convert_charrefs=True)
         self.root = DOMNode('document', None)
-        self.cur = self.root
-        self.errors = []
+        self.stack = [self.root]
+        self.open_counts = {'document': 1}
+        self.errors = ParseErrors()
+        self.texts = {}  # nœud ouvert -> morceaux de texte, joints à la fermeture
+
+    @property
+    def cur(self):
+        return self.stack[-1]
+
+    def _pop(self):
+        node = self.stack.pop()
+        self.open_counts[node.tag] -= 1
+        self._flush_text(node)
+        return node
 
     def handle_starttag(self, tag, attrs):
         tag = (tag or '').lower()
-        if self.cur.tag == tag and tag in AUTO_CLOSE_ON_START and self.cur.parent:
-            self.errors.append(f"Auto-fermeture de <{tag}> avant nouvelle ouverture.")
-            self.cur = self.cur.parent
-        node = DOMNode(tag, self.cur)
-        node.attributes = dict(attrs or [])
-        self.cur.children.append(node)
+        cur = self.stack[-1]
+        if cur.tag == tag and tag in AUTO_CLOSE_ON_START and cur.parent:
+            self.errors.add('auto-fermeture', f"Auto-fermeture de <{tag}> avant nouvelle ouverture.")
+            self._pop()
+            cur = self.stack[-1]
+        node = DOMNode(tag, cur)
+        if attrs:
+            node.attributes = {sys.intern(k): v for k, v in attrs}
+        cur.append_child(node)
         if tag not in SELF_CLOSING:
-            self.cur = node
+            self.stack.append(node)
+            self.open_counts[node.tag] = self.open_counts.get(node.tag, 0) + 1
 
     def handle_endtag(self, tag):
         tag = (tag or '').lower()
-        n = self.cur
-        while n is not None and n.tag != tag:
-            n = n.parent
-        if n is None:
-            self.errors.append(f"Balise fermante orpheline </{tag}> ignorée.")
+        if not self.open_counts.get(tag):
+            self.errors.add('orpheline', f"Balise fermante orpheline </{tag}> ignorée.")
             return
-        self.cur = n.parent if n.parent else self.root
+        # Ferme implicitement tout ce qui est ouvert au-dessus de l'élément correspondant
+        # (la racine 'document' reste ouverte)
+        while len(self.stack) > 1:
+            if self._pop().tag == tag:
+                break
 
     def handle_data(self, data):
-        if not data or self.cur is None: return
+        if not data: return
         txt = data.strip()
         if not txt: return
-        if self.cur.text and not self.cur.text.endswith(" "):
-            self.cur.text += " "
-        self.cur.text += txt
+        cur = self.stack[-1]
+        parts = self.texts.get(cur)
+        if parts is None:
+            self.texts[cur] = [txt]
+        else:
+            parts.append(txt)
+
+    def _flush_text(self, node):
+        parts = self.texts.pop(node, None)
+        if parts:
+            node.text = " ".join(parts)
+
+    def close(self):
+        super().close()
+        for node in list(self.texts):
+            self._flush_text(node)
 
 def parse_html(html: str):
     p = _MiniHTMLParser()
     try:
         p.feed(html or "")
-        while p.cur and p.cur.parent:
-            if p.cur.tag not in SELF_CLOSING:
-                p.errors.append(f"Balise <{p.cur.tag}> non fermée — auto-fermeture en fin de document.")
-            p.cur = p.cur.parent
+        p.close()
+        for node in reversed(p.stack[1:]):
+            if node.tag not in SELF_CLOSING:
+                p.errors.add('non fermée', f"Balise <{node.tag}> non fermée — auto-fermeture en fin de document.")
+        del p.stack[1:]
     except Exception as e:
-        p.errors.append(f"Erreur de parsing: {e!r}")
+        p.errors.add('parsing', f"Erreur de parsing: {e!r}")
+    p.errors.finish()
     return p.root, p.errors
@@ -5,6 +5,8 @@
 from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Any, Tuple
 
+from traversal import indent as _indent, walk
+
 # ------------- Utils -------------
 def _px(v, default: float = 0.0) -> float:
     """Parse a CSS length "12px" → 12.0. Accepts numbers. None → default."""
@@ -72,6 +74,9 @@ class LayoutBox:
     children: List['LayoutBox'] = field(default_factory=list)
     position: str = "static"
     display: str = "block"
+    # Pendant le layout : bloc contenant et y du prochain enfant
+    containing_block: Optional['LayoutBox'] = field(default=None, repr=False, compare=False)
+    cursor_y: float = field(default=0, repr=False, compare=False)
 
     def add_child(self, child: 'LayoutBox'):
         self.children.append(child)
@@ -114,31 +119,64 @@ def _compute_box_model(node, containing_width: float) -> Dimensions:
     return d
 
 def _layout_node(node, avail_w: float, cur_x: float, cur_y: float, containing_block: Optional[LayoutBox]) -> LayoutBox:
+    """Lay out `node` and its subtree; parcours itératif (traversal.walk)."""
+    result: List[LayoutBox] = []
+
+    def enter(n, parent: Optional[LayoutBox]):
+        if parent is None:
+            return _begin_node(n, avail_w, cur_x, cur_y, containing_block)
+        return _begin_node(n, parent.dims.content_w, parent.x, parent.cursor_y, parent)
+
+    def leave(n, box: LayoutBox, parent: Optional[LayoutBox]):
+        _finish_node(n, box)
+        if parent is None:
+            result.append(box)
+        else:
+            parent.add_child(box)
+            _remember_layout(box)
+            parent.cursor_y = box.y + box.h + _get_extra_box_space(box)  # already includes margins
+
+    # Seuls les blocs placent leurs enfants (le texte inline est mesuré seul)
+    walk(node, enter, leave, children=lambda n: _children(n) if _display_of(n) == "block" else ())
+    return result[0]
+
+def _display_of(node) -> str:
+    return _style(node).get("display", _display_for_tag(getattr(node, "tag", "div")))
+
+def _begin_node(node, avail_w: float, cur_x: float, cur_y: float, containing_block: Optional[LayoutBox]) -> LayoutBox:
     st = _style(node)
-    display = st.get("display", _display_for_tag(getattr(node,"tag","div")))
+    display = _display_of(node)
     position = st.get("position", "static")
 
     # Create box
     box = LayoutBox(node=node, position=position, display=display)
     box.dims = _compute_box_model(node, avail_w)
+    box.containing_block = containing_block
+
+    # Layout based on display
+    if display == "block":
+        _begin_block(node, box, avail_w, cur_x, cur_y)
+    else:
+        _layout_inline(node, box, avail_w, cur_x, cur_y, containing_block)
+    return box
 
+def _finish_node(node, box: LayoutBox):
+    st = _style(node)
+    if box.display == "block":
+        _end_block(box)
+
+    containing_block = box.containing_block
     # Determine containing block for absolute
     positioned_ancestor = containing_block
-    if position != "static":
+    if box.position != "static":
         # climb to nearest positioned ancestor (not static)
         pa = containing_block
         while pa is not None and pa.position == "static":
             pa = _get_parent_layout(pa)
         positioned_ancestor = pa or containing_block
 
-    # Layout based on display
-    if display == "block":
-        _layout_block(node, box, avail_w, cur_x, cur_y, containing_block)
-    else:
-        _layout_inline(node, box, avail_w, cur_x, cur_y, containing_block)
-
     # Positioning adjustments
-    if position == "relative":
+    if box.position == "relative":
         top = _px(st.get("top"))
         left = _px(st.get("left"))
         right = _px(st.get("right"))
@@ -146,7 +184,7 @@ def _layout_node(node, avail_w: float, cur_x: float, cur_y: float, containing_bl
         # Only use top/left if provided; simplistic
         box.x += left - right
         box.y += top - bottom
-    elif position == "absolute":
+    elif box.position == "absolute":
         ref = positioned_ancestor or containing_block
         ref_x = 0 if ref is None else ref.x
         ref_y = 0 if ref is None else ref.y
@@ -161,8 +199,6 @@ def _layout_node(node, avail_w: float, cur_x: float, cur_y: float, containing_bl
         elif bottom is not None and ref is not None:
             box.y = ref_y + (ref.h - box.h - _px(bottom))
 
-    return box
-
 # We keep a weak map from node to layout for traversing ancestors when needed
 _NODE_TO_LAYOUT: Dict[int, LayoutBox] = {}
 
@@ -175,8 +211,7 @@ def _get_parent_layout(box: Optional[LayoutBox]) -> Optional[LayoutBox]:
     if parent is None: return None
     return _NODE_TO_LAYOUT.get(id(parent))
 
-def _layout_block(node, box: LayoutBox, avail_w: float, cur_x: float, cur_y: float, containing_block: Optional[LayoutBox]):
-    st = _style(node)
+def _begin_block(node, box: LayoutBox, avail_w: float, cur_x: float, cur_y: float):
     d = box.dims
 
     # Compute content width:
@@ -190,15 +225,11 @@ def _layout_block(node, box: LayoutBox, avail_w: float, cur_x: float, cur_y: flo
     box.x = cur_x + d.margin_left + d.border_left + d.padding_left
     box.y = cur_y + d.margin_top + d.border_top + d.padding_top
 
-    # Children layout: stack vertically
-    child_y = box.y
-    max_child_w = 0.0
-    for child in _children(node):
-        child_box = _layout_node(child, d.content_w, box.x, child_y, containing_block=box)
-        box.add_child(child_box)
-        _remember_layout(child_box)
-        child_y = child_box.y + child_box.h + _get_extra_box_space(child_box)  # already includes margins
-        max_child_w = max(max_child_w, child_box.w)
+    # Children layout: stack vertically from the content top
+    box.cursor_y = box.y
+
+def _end_block(box: LayoutBox):
+    d = box.dims
 
     # Compute content height
     if d.content_h == 0:
@@ -261,14 +292,17 @@ def _layout_inline(node, box: LayoutBox, avail_w: float, cur_x: float, cur_y: fl
 def layout_to_string(box: LayoutBox, indent: int = 0) -> str:
     if box is None:
         return ""
-    pad = "  " * indent
-    node = box.node
-    attrs = getattr(node, "attributes", {}) or {}
-    st = _style(node)
-    cls = attrs.get("class"); _id = attrs.get("id")
-    head = f'{pad}<{getattr(node,"tag","?")} id={_id} class={cls} display={box.display} position={box.position}> x={box.x:.0f} y={box.y:.0f} w={box.w:.0f} h={box.h:.0f}'
-    lines = [head]
-    for c in box.children:
-        lines.append(layout_to_string(c, indent+1))
-    lines.append(f"{pad}</{getattr(node,'tag','?')}>")
+    lines = []
+
+    def enter(b: LayoutBox, depth: int) -> int:
+        node = b.node
+        attrs = getattr(node, "attributes", {}) or {}
+        cls = attrs.get("class"); _id = attrs.get("id")
+        lines.append(f'{_indent(depth)}<{getattr(node,"tag","?")} id={_id} class={cls} display={b.display} position={b.position}> x={b.x:.0f} y={b.y:.0f} w={b.w:.0f} h={b.h:.0f}')
+        return depth + 1
+
+    def leave(b: LayoutBox, child_depth: int, depth: int):
+        lines.append(f"{_indent(depth)}</{getattr(b.node,'tag','?')}>")
+
+    walk(box, enter, leave, context=indent)
     return "\n".join(lines)
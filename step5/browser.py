@@ -10,7 +10,8 @@ from tkinter import filedialog
 from html_parser import parse_html
 from css_parser import CSSParser, apply_css_to_dom
 from layout import build_layout_tree
-from render import render_layout
+from render import render_layout, install_scrolling
+from resize import ResizeScheduler
 
 def pick_file(title, patterns):
     root = tk.Tk(); root.withdraw()
@@ -23,7 +24,8 @@ class App:
         self.root = tk.Tk()
         self.root.title("Mini Browser — Step 5 (Rendering)")
         self.canvas = tk.Canvas(self.root, width=900, height=700, background="white", highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        install_scrolling(self.canvas)
 
         top = tk.Frame(self.root); top.place(x=0, y=0, relwidth=1.0)
         self.btn_reload = tk.Button(top, text="Ouvrir HTML/CSS", command=self.load_files)
@@ -35,7 +37,8 @@ class App:
         self.layout_root = None
         self.rules = []
 
-        self.root.bind("<Configure>", lambda e: self.render())
+        # Un seul rendu par largeur stable pendant un redimensionnement
+        self.resize = ResizeScheduler(self.canvas, self._on_resize)
 
         if not self.html_path:
             self.load_files()
@@ -62,11 +65,13 @@ class App:
         self.layout_root = build_layout_tree(self.dom_root, viewport_width=max(800, int(self.canvas.winfo_width() or 800)))
         self.render()
 
+    def _on_resize(self, width, height):
+        if self.dom_root is None: return
+        self.layout_root = build_layout_tree(self.dom_root, viewport_width=max(800, width))
+        self.render()
+
     def render(self):
         if self.layout_root is None: return
-        w = max(800, int(self.canvas.winfo_width() or 800))
-        h = max(600, int(self.canvas.winfo_height() or 600))
-        self.canvas.config(scrollregion=(0,0,w,h))
         render_layout(self.canvas, self.layout_root)
 
 def main():
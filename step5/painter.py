@@ -0,0 +1,177 @@
+# Step 5 — Peinture limitée à la zone visible (identique à la racine)
+"""Retained, viewport-culled painting of draw commands onto a Tk canvas.
+
+Renderers describe a page as a display list: DrawCommand objects in paint
+order, each with a key that stays the same across repaints for the same
+piece of the same box. The ViewportPainter sizes the canvas scrollregion to
+the whole page but only creates canvas items for commands that intersect the
+visible region plus an overscan margin; more are created as the view scrolls.
+
+A repaint is diffed against the previous display list by key: existing items
+are moved (coords) or restyled (itemconfigure) only when they changed (an
+option the new command no longer sets goes back to Tk's default), and items
+whose key disappeared are deleted. Tk work per frame therefore follows the
+size of the change, not the size of the page.
+"""
+from bisect import bisect_right, insort
+
+# Tk's defaults for the item options renderers use: an option a reused item
+# had and its new command dropped is put back to these
+ITEM_DEFAULTS = {
+    "rectangle": {"fill": "", "outline": "black", "width": 1, "dash": "", "stipple": ""},
+    "text": {"fill": "black", "font": "TkDefaultFont", "anchor": "center", "text": "",
+             "justify": "left", "width": 0, "angle": 0.0},
+}
+
+class DrawCommand:
+    """One canvas item: kind is "rectangle" or "text"; bbox is (x1, y1, x2, y2).
+    key identifies the item across repaints (None: never reused)."""
+    __slots__ = ("kind", "coords", "options", "bbox", "key")
+
+    def __init__(self, kind, coords, options, bbox=None, key=None):
+        self.kind = kind
+        self.coords = tuple(coords)
+        self.options = options
+        self.bbox = bbox if bbox is not None else self.coords
+        self.key = key
+
+    def to_dict(self):
+        """JSON-friendly form: fonts become their description or Tk name. The
+        key is left out: it holds id()s, which differ on every run, and the
+        serialized list must be the same for the same page."""
+        options = {}
+        for name, value in self.options.items():
+            if isinstance(value, tuple):
+                value = list(value)
+            elif not isinstance(value, (str, int, float, bool, type(None), list)):
+                value = str(value)
+            options[name] = value
+        return {"kind": self.kind, "coords": list(self.coords), "options": options}
+
+class ViewportPainter:
+    BAND = 256  # px of document height per culling bucket
+
+    def __init__(self, canvas, overscan=300):
+        self.canvas = canvas
+        self.overscan = overscan
+        self.commands = []
+        self.items = []      # command index -> canvas item id (None until created)
+        self._painted = []   # sorted command indices that have an item
+        self._bands = {}     # band -> command indices, in paint order
+
+    def paint(self, commands, width, height):
+        """Show `commands`, reusing the items of the previous paint with the same key.
+        The page spans (0, 0, width, height)."""
+        canvas = self.canvas
+        old_items = {}
+        for i in self._painted:
+            key = self.commands[i].key
+            if key is not None:
+                old_items[key] = (self.commands[i], self.items[i], i)
+            else:
+                canvas.delete(self.items[i])
+
+        self.commands = commands
+        self.items = items = [None] * len(commands)
+        self._bands = bands = {}
+        band = self.BAND
+        painted = []
+        old_order = []  # previous paint index of each reused item, in new order
+        for i, cmd in enumerate(commands):
+            y1, y2 = cmd.bbox[1], cmd.bbox[3]
+            for b in range(int(y1 // band), int(y2 // band) + 1):
+                bands.setdefault(b, []).append(i)
+
+            old = old_items.pop(cmd.key, None) if cmd.key is not None else None
+            if old is None:
+                continue
+            prev, item, prev_index = old
+            if prev.kind != cmd.kind:
+                canvas.delete(item)
+                continue
+            if prev.coords != cmd.coords:
+                canvas.coords(item, *cmd.coords)
+            if prev.options != cmd.options:
+                changed = {k: v for k, v in cmd.options.items() if prev.options.get(k) != v}
+                dropped = prev.options.keys() - cmd.options.keys()
+                if dropped:
+                    defaults = ITEM_DEFAULTS[cmd.kind]
+                    if not dropped <= defaults.keys():
+                        # No known default to go back to: let refresh() recreate it
+                        canvas.delete(item)
+                        continue
+                    changed.update((k, defaults[k]) for k in dropped)
+                if changed:
+                    canvas.itemconfigure(item, **changed)
+            items[i] = item
+            painted.append(i)
+            old_order.append(prev_index)
+
+        # Keys that vanished: their items go away
+        if old_items:
+            canvas.delete(*[item for _, item, _ in old_items.values()])
+
+        # Reused items keep their stacking (the old paint order); restack
+        # them only if that order changed
+        if any(a > b for a, b in zip(old_order, old_order[1:])):
+            for i in painted:
+                canvas.tag_raise(items[i])
+        self._painted = painted
+
+        canvas.configure(scrollregion=(0, 0, width, height))
+        self.refresh()
+
+    def clear(self):
+        if self._painted:
+            self.canvas.delete(*[self.items[i] for i in self._painted])
+        self.commands = []
+        self.items = []
+        self._painted = []
+        self._bands = {}
+
+    def visible_range(self):
+        """(top, bottom) of the visible region in canvas coordinates."""
+        try:
+            view_h = int(self.canvas.winfo_height())
+            top = self.canvas.canvasy(0)
+        except Exception:
+            view_h, top = 0, 0
+        if view_h <= 1:
+            view_h = 600
+        return top, top + view_h
+
+    def refresh(self):
+        """Create the items that entered the visible region (+ overscan)."""
+        if not self.commands:
+            return 0
+        top, bottom = self.visible_range()
+        top -= self.overscan
+        bottom += self.overscan
+        band = self.BAND
+        pending = set()
+        for b in range(int(max(0, top) // band), int(bottom // band) + 1):
+            for i in self._bands.get(b, ()):
+                if self.items[i] is None:
+                    cmd = self.commands[i]
+                    if cmd.bbox[3] >= top and cmd.bbox[1] <= bottom:
+                        pending.add(i)
+        for i in sorted(pending):
+            self._create(i)
+        return len(pending)
+
+    def _create(self, i):
+        cmd = self.commands[i]
+        if cmd.kind == "text":
+            item = self.canvas.create_text(*cmd.coords, **cmd.options)
+        else:
+            item = self.canvas.create_rectangle(*cmd.coords, **cmd.options)
+        self.items[i] = item
+        # Keep paint order when an earlier command shows up after later ones
+        pos = bisect_right(self._painted, i)
+        if pos < len(self._painted):
+            self.canvas.tag_lower(item, self.items[self._painted[pos]])
+        insort(self._painted, i)
+
+    @property
+    def item_count(self):
+        return len(self._painted)
@@ -1,6 +1,7 @@
 
 # Step 5 — Rendering Tkinter: backgrounds, borders, text + simple z-index
 import sys
+import weakref
 import tkinter as tk
 from tkinter.font import Font
 from typing import Any, List, Tuple
@@ -8,6 +9,8 @@ from typing import Any, List, Tuple
 from html_parser import parse_html
 from css_parser import CSSParser, apply_css_to_dom
 from layout import build_layout_tree
+from resize import ResizeScheduler
+from painter import DrawCommand, ViewportPainter
 
 # ---------- Style helpers ----------
 def _get(node, name, default=None):
@@ -38,7 +41,7 @@ def _font_for(node):
     return (fam, size, weight)
 
 # ---------- Render primitives ----------
-def _draw_background(canvas: tk.Canvas, box) -> None:
+def _draw_background(out: List[DrawCommand], box) -> None:
     st = getattr(box.node, "styles", {}) or {}
     bg = _color(st.get("background-color"))
     if not bg: return
@@ -48,9 +51,9 @@ def _draw_background(canvas: tk.Canvas, box) -> None:
     y0 = box.y - d.padding_top - d.border_top
     x1 = box.x + box.w + d.padding_right + d.border_right - (d.padding_left + d.border_left)
     y1 = box.y + box.h + d.padding_bottom + d.border_bottom - (d.padding_top + d.border_top)
-    canvas.create_rectangle(x0, y0, x1, y1, outline="", fill=bg)
+    out.append(DrawCommand("rectangle", (x0, y0, x1, y1), {"outline": "", "fill": bg}, key=(id(box.node), "bg")))
 
-def _draw_borders(canvas: tk.Canvas, box) -> None:
+def _draw_borders(out: List[DrawCommand], box) -> None:
     st = getattr(box.node, "styles", {}) or {}
     d = box.dims
 
@@ -74,16 +77,16 @@ def _draw_borders(canvas: tk.Canvas, box) -> None:
 
     # Top
     if wt > 0:
-        canvas.create_rectangle(x - wl, y - wt, x + w + wr, y, outline="", fill=col_top)
+        out.append(DrawCommand("rectangle", (x - wl, y - wt, x + w + wr, y), {"outline": "", "fill": col_top}, key=(id(box.node), "border-top")))
     # Bottom
     if wb > 0:
-        canvas.create_rectangle(x - wl, y + h, x + w + wr, y + h + wb, outline="", fill=col_bottom)
+        out.append(DrawCommand("rectangle", (x - wl, y + h, x + w + wr, y + h + wb), {"outline": "", "fill": col_bottom}, key=(id(box.node), "border-bottom")))
     # Left
     if wl > 0:
-        canvas.create_rectangle(x - wl, y - wt, x, y + h + wb, outline="", fill=col_left)
+        out.append(DrawCommand("rectangle", (x - wl, y - wt, x, y + h + wb), {"outline": "", "fill": col_left}, key=(id(box.node), "border-left")))
     # Right
     if wr > 0:
-        canvas.create_rectangle(x + w, y - wt, x + w + wr, y + h + wb, outline="", fill=col_right)
+        out.append(DrawCommand("rectangle", (x + w, y - wt, x + w + wr, y + h + wb), {"outline": "", "fill": col_right}, key=(id(box.node), "border-right")))
 
 def _content_box_xy(box):
     d = box.dims
@@ -93,7 +96,7 @@ def _content_box_wh(box):
     d = box.dims
     return (box.w, box.h)
 
-def _draw_text(canvas: tk.Canvas, box) -> None:
+def _draw_text(out: List[DrawCommand], box) -> None:
     node = box.node
     text = (getattr(node, "text", "") or "").strip()
     if not text: return
@@ -105,7 +108,9 @@ def _draw_text(canvas: tk.Canvas, box) -> None:
     font_tuple = _font_for(node)
 
     # Use wraplength so long lines don’t overflow; it is in pixels.
-    canvas.create_text(x, y, anchor="nw", text=text, fill=fill, font=font_tuple, width=max(1, int(w)))
+    out.append(DrawCommand("text", (x, y),
+                           {"anchor": "nw", "text": text, "fill": fill, "font": font_tuple, "width": max(1, int(w))},
+                           (x, y, x + w, y + max(h, 1)), (id(node), "text")))
 
 # ---------- Tree traversal & z-index ----------
 def _flatten(box, out, order=[0]):
@@ -120,24 +125,57 @@ def _flatten(box, out, order=[0]):
     for c in getattr(box, "children", []) or []:
         _flatten(c, out, order)
 
+_painters = weakref.WeakKeyDictionary()
+
+def _painter_for(canvas):
+    painter = _painters.get(canvas)
+    if painter is None:
+        painter = _painters[canvas] = ViewportPainter(canvas)
+    return painter
+
+def viewport_changed(canvas: tk.Canvas) -> None:
+    """A appeler quand la vue défile : crée les items devenus visibles."""
+    painter = _painters.get(canvas)
+    if painter is not None:
+        painter.refresh()
+
 def render_layout(canvas: tk.Canvas, layout_root) -> None:
-    if layout_root is None: return
-    canvas.delete("all")
+    painter = _painter_for(canvas)
+    if layout_root is None:
+        painter.clear(); return
 
     flat: List[Tuple[int,int,Any]] = []
     _flatten(layout_root, flat)
     # Sort by z-index then document order
     flat.sort(key=lambda t: (t[0], t[1]))
 
+    out: List[DrawCommand] = []
     # First pass: backgrounds
     for _, _, b in flat:
-        _draw_background(canvas, b)
+        _draw_background(out, b)
     # Second: borders
     for _, _, b in flat:
-        _draw_borders(canvas, b)
+        _draw_borders(out, b)
     # Third: text
     for _, _, b in flat:
-        _draw_text(canvas, b)
+        _draw_text(out, b)
+
+    # Scrollregion = page extent; only the visible part gets canvas items
+    width = max([c.bbox[2] for c in out] + [1])
+    height = max([c.bbox[3] for c in out] + [1])
+    painter.paint(out, width + 20, height + 20)
+
+def install_scrolling(canvas: tk.Canvas) -> tk.Scrollbar:
+    """Scrollbar vertical + molette ; crée les items au fil du défilement."""
+    bar = tk.Scrollbar(canvas.master, orient=tk.VERTICAL, command=canvas.yview)
+    bar.pack(side=tk.RIGHT, fill=tk.Y, before=canvas)
+    def on_scroll(first, last):
+        bar.set(first, last); viewport_changed(canvas)
+    canvas.configure(yscrollcommand=on_scroll)
+    canvas.bind("<MouseWheel>", lambda e: canvas.yview_scroll(-3 if e.delta > 0 else 3, "units"))
+    canvas.bind("<Button-4>", lambda e: canvas.yview_scroll(-3, "units"))
+    canvas.bind("<Button-5>", lambda e: canvas.yview_scroll(3, "units"))
+    return bar
 
 # ---------- Demo / Tkinter integration ----------
 class App:
@@ -145,7 +183,8 @@ class App:
         self.root = tk.Tk()
         self.root.title("Mini‑browser — Step 5 Rendering")
         self.canvas = tk.Canvas(self.root, width=viewport[0], height=viewport[1], bg="white")
-        self.canvas.pack(fill="both", expand=True)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        install_scrolling(self.canvas)
 
         # Load files (optional pickers if not provided)
         if not html_path:
@@ -179,18 +218,18 @@ class App:
         # Initial render
         render_layout(self.canvas, self.layout_root)
 
-        # Re-render on resize
-        self.canvas.bind("<Configure>", self._on_resize)
+        # Re-render on resize: bursts are coalesced, height-only changes keep the paint
+        self.resize = ResizeScheduler(self.canvas, self._on_resize)
+        self.resize.mark_rendered(vw, self.canvas.winfo_reqheight())
 
-    def _on_resize(self, event):
+    def _on_resize(self, width, height):
         # Recompute layout with new viewport width, then repaint
-        w = max(200, int(event.width))
+        w = max(200, int(width))
         # (Height is not required by our layout; we let content define scrollregion)
         # Rebuild DOM/styles? Keep same DOM, recompute layout:
         # For simplicity we don't re-parse; build_layout_tree is pure from DOM+styles.
         self.layout_root = build_layout_tree(self.layout_root.node, viewport_width=w)
-        # Update scroll region to content bbox
-        self.canvas.config(scrollregion=(0,0,max(w, int(self.layout_root.w + 40)), int(self.layout_root.h + 80)))
+        # render_layout sizes the scroll region to the content
         render_layout(self.canvas, self.layout_root)
 
     def _merge_inline_styles(self, node):
@@ -10,8 +10,9 @@ from tkinter import filedialog
 from html_parser import parse_html
 from css_parser import CSSParser, apply_css_to_dom
 from layout import build_layout_tree
-from render import render_layout
+from render import render_layout, viewport_changed
 from js_interpreter import JSInterpreter
+from resize import ResizeScheduler
 
 def pick_file(title, patterns):
     root = tk.Tk(); root.withdraw()
@@ -23,8 +24,15 @@ class App:
     def __init__(self, html_path=None, css_path=None):
         self.root = tk.Tk()
         self.root.title("Mini Browser — Step 6 (JavaScript)")
+        self.scroll = tk.Scrollbar(self.root, orient=tk.VERTICAL)
+        self.scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.canvas = tk.Canvas(self.root, width=900, height=700, background="white", highlightthickness=0)
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scroll.configure(command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-3 if e.delta > 0 else 3, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-3, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(3, "units"))
 
         top = tk.Frame(self.root); top.place(x=0, y=0, relwidth=1.0)
         tk.Button(top, text="Ouvrir HTML/CSS", command=self.load_files).pack(side=tk.LEFT, padx=6, pady=6)
@@ -39,7 +47,8 @@ class App:
         self.js = JSInterpreter(dom_root=None, refresh_callback=self.refresh)
 
         self.canvas.bind("<Button-1>", self.on_click)
-        self.root.bind("<Configure>", lambda e: self.render())
+        # <Configure> du canvas seulement (celui de la fenêtre remonte de chaque widget)
+        self.resize = ResizeScheduler(self.canvas, lambda w, h: self.render())
 
         if not self.html_path:
             self.load_files()
@@ -63,14 +72,11 @@ class App:
         self.rules = parser.parse_css(css)
         apply_css_to_dom(self.dom_root, self.rules)
 
-        # Exécuter tous les <script> inline très simples: on scanne le DOM pour trouver du .text dans <script>
-        def run_scripts(node):
-            if node.tag == "script" and node.text.strip():
-                self.js.dom_root = self.dom_root
+        # Exécuter tous les <script> inline très simples, relevés par le parseur (dom_root.index)
+        self.js.dom_root = self.dom_root
+        for node in self.dom_root.index.scripts:
+            if node.text.strip():
                 self.js.execute(node.text)
-            for c in node.children:
-                run_scripts(c)
-        run_scripts(self.dom_root)
 
         self.layout_root = build_layout_tree(self.dom_root, viewport_width=max(800, int(self.canvas.winfo_width() or 800)))
         self.render()
@@ -82,6 +88,11 @@ class App:
         # mettre à jour la cible DOM de l'interpréteur (au cas où)
         self.js.dom_root = self.dom_root
 
+    def _on_scroll(self, first, last):
+        # la vue a bougé : créer les items qui deviennent visibles
+        self.scroll.set(first, last)
+        viewport_changed(self.canvas)
+
     def refresh(self):
         # callback appelé par le JS quand il modifie le DOM
         self.render()
@@ -95,7 +106,8 @@ class App:
         return best[4] if best else None
 
     def on_click(self, event):
-        node = self._hit_test(event.x, event.y)
+        # coordonnées fenêtre -> coordonnées canvas (la vue peut avoir défilé)
+        node = self._hit_test(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         if not node: return
         # On déclenche l'événement 'click' pour l'élément cliqué (si id présent)
         eid = (node.attributes or {}).get("id")
@@ -10,6 +10,29 @@ class DOMNode:
         self.text = ""
         self.styles = {}
 
+class DocumentIndex:
+    """Index du document rempli pendant le parsing (une entrée par balise ouvrante) :
+    liens stylesheet, <style> et <script> dans l'ordre du document, id → premier
+    élément, tag → éléments. Accessible via la racine : dom_root.index."""
+    def __init__(self):
+        self.links = []
+        self.styles = []
+        self.scripts = []
+        self.ids = {}
+        self.tags = {}
+
+    def add(self, node):
+        self.tags.setdefault(node.tag, []).append(node)
+        _id = node.attributes.get('id')
+        if _id and _id not in self.ids:
+            self.ids[_id] = node
+        if node.tag == 'style':
+            self.styles.append(node)
+        elif node.tag == 'script':
+            self.scripts.append(node)
+        elif node.tag == 'link' and (node.attributes.get('rel') or '').lower() == 'stylesheet':
+            self.links.append(node)
+
 SELF_CLOSING = {'br','img','hr','meta','link','input','source'}
 AUTO_CLOSE_ON_START = {'p','li'}
 
@@ -17,6 +40,7 @@ class _MiniHTMLParser(_HTMLParser):
     def __init__(self):
         super().__init__(convert_charrefs=True)
         self.root = DOMNode('document', None)
+        self.root.index = DocumentIndex()
         self.cur = self.root
         self.errors = []
 
@@ -27,6 +51,7 @@ class _MiniHTMLParser(_HTMLParser):
             self.cur = self.cur.parent
         node = DOMNode(tag, self.cur)
         node.attributes = dict(attrs or [])
+        self.root.index.add(node)
         self.cur.children.append(node)
         if tag not in SELF_CLOSING:
             self.cur = node
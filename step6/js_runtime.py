@@ -1,6 +1,8 @@
 
 # Step 6 — Mini JavaScript runtime (subset) + DOM bindings
 from typing import Any, Dict, List, Optional, Callable
+import heapq
+import itertools
 import re
 
 class JSEvalError(Exception): pass
@@ -113,18 +115,199 @@ class JSEnvironment:
         raise JSEvalError('Undefined ' + name)
     def set(self, name, val): self.vars[name] = val; return val
 
+class ElementIndex:
+    """Index id / classe / tag du document pour des recherches en O(1).
+
+    Tenu à jour par les mutations de JSElement (setAttribute, appendChild,
+    remove) : modifier attributes / children directement depuis Python le
+    désynchronise. Chaque clé mène à un ensemble ordonné (dict) de nœuds ;
+    s'il y en a plusieurs, le premier dans l'ordre du document gagne.
+
+    Chaque nœud porte pour cela une position croissante dans l'ordre préfixe,
+    avec des trous : un sous-arbre inséré ou déplacé prend des positions entre
+    celles de ses voisins, et le document n'est renuméroté que si le trou est
+    épuisé. Une clé déjà cherchée garde un tas (position, nœud) : ses entrées
+    périmées (nœud retiré, ou renuméroté) sont écartées à la lecture.
+    """
+    GAP = 1 << 40
+
+    def __init__(self, root):
+        self.root = root
+        self.ids = {}; self.classes = {}; self.tags = {}
+        self._tables = {'id': self.ids, 'class': self.classes, 'tag': self.tags}
+        self._order = {}   # nœud → position (croissante dans l'ordre du document)
+        self._heaps = {}   # (table, clé) → tas de (position, n°, nœud)
+        self._tickets = itertools.count()
+        self.add_subtree(root)
+
+    @staticmethod
+    def _keys(node):
+        """(table, clé) sous lesquelles node est indexé."""
+        attrs = getattr(node, 'attributes', None) or {}
+        keys = [('tag', (getattr(node, 'tag', '') or '').lower())]
+        if attrs.get('id'): keys.append(('id', attrs['id']))
+        keys.extend(('class', c) for c in (attrs.get('class') or '').split())
+        return keys
+
+    @staticmethod
+    def _subtree(node):
+        stack = [node]
+        while stack:
+            n = stack.pop(); yield n
+            stack.extend(reversed(getattr(n, 'children', None) or []))
+
+    def _add(self, node):
+        for table, key in self._keys(node):
+            self._tables[table].setdefault(key, {})[node] = None
+            self._push(table, key, node)
+
+    def _discard(self, node):
+        for table, key in self._keys(node):
+            nodes = self._tables[table].get(key)
+            if nodes is not None:
+                nodes.pop(node, None)
+                if not nodes: del self._tables[table][key]
+
+    def _push(self, table, key, node):
+        heap = self._heaps.get((table, key))
+        if heap is None or node not in self._order: return
+        if len(heap) > 2 * len(self._tables[table].get(key, ())) + 8:
+            del self._heaps[(table, key)]  # trop d'entrées périmées : refait à la lecture
+        else:
+            heapq.heappush(heap, (self._order[node], next(self._tickets), node))
+
+    def add_subtree(self, node):
+        """node vient d'être inséré dans l'arbre indexé (avec ses descendants)."""
+        for n in self._subtree(node): self._add(n)
+        self._number(node)
+
+    def remove_subtree(self, node):
+        for n in self._subtree(node):
+            self._discard(n); self._order.pop(n, None)
+
+    def set_attribute(self, node, name, value):
+        """node.attributes[name] = value, en mettant l'index à jour."""
+        indexed = name in ('id', 'class') and self.contains(node)
+        if indexed: self._discard(node)
+        node.attributes[name] = value
+        if indexed: self._add(node)
+
+    def moved(self, node):
+        """node a été déplacé dans l'arbre indexé : nouvelles positions."""
+        self._number(node)
+
+    def _number(self, node):
+        nodes = list(self._subtree(node))
+        lo, hi = self._before(node), self._after(node)
+        if hi is None: hi = lo + self.GAP * (len(nodes) + 1)
+        step = (hi - lo) // (len(nodes) + 1)
+        if step == 0:  # plus de place : tout le document est renuméroté, les tas refaits
+            self._order = {n: i * self.GAP for i, n in enumerate(self._subtree(self.root))}
+            self._heaps.clear()
+            return
+        order = self._order
+        for i, n in enumerate(nodes, 1):
+            order[n] = lo + i * step
+            if self._heaps:
+                for table, key in self._keys(n): self._push(table, key, n)
+
+    def _before(self, node):
+        """Position du nœud qui précède node dans l'ordre du document."""
+        parent = getattr(node, 'parent', None)
+        if parent is None: return -self.GAP
+        siblings = parent.children
+        i = self._position(siblings, node)
+        if i == 0: return self._order[parent]
+        prev = siblings[i - 1]
+        while prev.children: prev = prev.children[-1]
+        return self._order[prev]
+
+    def _after(self, node):
+        """Position du nœud qui suit le sous-arbre de node (None : aucun)."""
+        while getattr(node, 'parent', None) is not None:
+            siblings = node.parent.children
+            i = self._position(siblings, node)
+            if i + 1 < len(siblings): return self._order[siblings[i + 1]]
+            node = node.parent
+        return None
+
+    @staticmethod
+    def _position(siblings, node):
+        # depuis la fin : appendChild insère toujours en dernier
+        for i in range(len(siblings) - 1, -1, -1):
+            if siblings[i] is node: return i
+        raise ValueError('nœud absent de son parent')
+
+    def contains(self, node):
+        while getattr(node, 'parent', None) is not None: node = node.parent
+        return node is self.root
+
+    def _first(self, table, key):
+        nodes = self._tables[table].get(key)
+        if not nodes: return None
+        if len(nodes) == 1: return next(iter(nodes))
+        heap = self._heaps.get((table, key))
+        if heap is None:
+            order = self._order
+            heap = self._heaps[(table, key)] = [(order[n], next(self._tickets), n) for n in nodes]
+            heapq.heapify(heap)
+        while True:
+            position, _, n = heap[0]
+            if n in nodes and self._order.get(n) == position: return n
+            heapq.heappop(heap)
+
+    def by_id(self, _id): return self._first('id', _id)
+    def first_by_class(self, name): return self._first('class', name)
+    def first_by_tag(self, tag): return self._first('tag', (tag or '').lower())
+
+    def verify(self):
+        """Compare à un index reconstruit depuis l'arbre ; liste des écarts (vide = cohérent)."""
+        fresh = ElementIndex(self.root)
+        problems = []
+        for label, mine, ref in (('id', self.ids, fresh.ids), ('class', self.classes, fresh.classes),
+                                 ('tag', self.tags, fresh.tags)):
+            for key in set(mine) | set(ref):
+                got, want = set(mine.get(key, ())), set(ref.get(key, ()))
+                if got != want:
+                    problems.append(f"{label} {key!r}: {len(got - want)} en trop, {len(want - got)} manquant(s)")
+        in_tree = list(self._subtree(self.root))
+        if set(self._order) != set(in_tree):
+            problems.append(f"positions : {len(self._order)} nœuds numérotés, {len(in_tree)} dans l'arbre")
+        elif any(self._order[a] >= self._order[b] for a, b in zip(in_tree, in_tree[1:])):
+            problems.append("positions hors de l'ordre du document")
+        return problems
+
 class JSElement:
-    def __init__(self, node, on_change):
-        self.node = node; self.on_change = on_change; self.listeners = {}
+    def __init__(self, node, on_change, index=None):
+        self.node = node; self.on_change = on_change; self.listeners = {}; self.index = index
         if getattr(node, 'styles', None) is None: node.styles = {}
     def setAttribute(self, k, v):
         if getattr(self.node, 'attributes', None) is None: self.node.attributes = {}
-        self.node.attributes[k] = str(v); self.on_change()
+        if self.index is not None: self.index.set_attribute(self.node, k, str(v))
+        else: self.node.attributes[k] = str(v)
+        self.on_change()
     def appendChild(self, child):
-        self.node.children.append(child.node if isinstance(child, JSElement) else child); self.on_change()
+        child = child.node if isinstance(child, JSElement) else child
+        n = self.node
+        while n is not None:
+            if n is child: raise JSEvalError('appendChild: un nœud ne peut pas contenir son ancêtre')
+            n = getattr(n, 'parent', None)
+        index = self.index
+        was_indexed = index is not None and index.contains(child)
+        # Un nœud déjà dans l'arbre est déplacé, pas dupliqué
+        old = getattr(child, 'parent', None)
+        if old is not None and child in old.children: old.children.remove(child)
+        self.node.children.append(child); child.parent = self.node
+        if index is not None:
+            now_indexed = index.contains(self.node)
+            if was_indexed and not now_indexed: index.remove_subtree(child)
+            elif now_indexed and not was_indexed: index.add_subtree(child)
+            elif now_indexed: index.moved(child)
+        self.on_change()
     def remove(self):
         if self.node.parent and self.node in self.node.parent.children:
-            self.node.parent.children.remove(self.node); self.on_change()
+            if self.index is not None and self.index.contains(self.node): self.index.remove_subtree(self.node)
+            self.node.parent.children.remove(self.node); self.node.parent = None; self.on_change()
     @property
     def textContent(self): return getattr(self.node, 'text', '')
     @textContent.setter
@@ -142,25 +325,15 @@ class JSElement:
 class JSDocument:
     def __init__(self, dom_root, on_change):
         self.dom_root = dom_root; self.on_change = on_change
-    def _wrap(self, node): return JSElement(node, self.on_change) if node else None
+        self.index = ElementIndex(dom_root)
+    def _wrap(self, node): return JSElement(node, self.on_change, self.index) if node else None
     def getElementById(self, _id):
-        def walk(n):
-            if getattr(n, 'attributes', {}).get('id') == _id: return n
-            for c in getattr(n, 'children', []) or []:
-                r = walk(c); 
-                if r: return r
-            return None
-        return self._wrap(walk(self.dom_root))
+        return self._wrap(self.index.by_id(_id))
     def querySelector(self, selector):
+        selector = selector.strip()
         if selector.startswith('#'): return self.getElementById(selector[1:])
-        tag = selector.strip().lower()
-        def walk(n):
-            if getattr(n,'tag','').lower()==tag: return n
-            for c in getattr(n,'children',[]) or []:
-                r = walk(c); 
-                if r: return r
-            return None
-        return self._wrap(walk(self.dom_root))
+        if selector.startswith('.'): return self._wrap(self.index.first_by_class(selector[1:]))
+        return self._wrap(self.index.first_by_tag(selector))
 
 class JSRuntime:
     def __init__(self, dom_root, on_dom_change):
@@ -168,7 +341,9 @@ class JSRuntime:
         self.global_env = JSEnvironment(); self._install_builtins()
     def _install_builtins(self):
         self.global_env.set('console', {'log': JSFunction(lambda *a: None)})
-        self.global_env.set('document', JSDocument(self.dom_root, self.on_dom_change))
+        self.document = JSDocument(self.dom_root, self.on_dom_change)
+        self.index = self.document.index
+        self.global_env.set('document', self.document)
     def eval(self, src: str):
         toks = tokenize(src); ast = Parser(toks).program(); return self._eval(ast, self.global_env)
     def _eval(self, node, env):
@@ -1,6 +1,8 @@
 # Step 6 — Rendu Tkinter + régions cliquables (pour onclick)
+import weakref
 import tkinter as tk
-from tkinter.font import Font
+from fonts import get_font
+from painter import DrawCommand, ViewportPainter
 
 def _color(s, default=None):
     if not s: return default
@@ -29,11 +31,27 @@ def _collect_boxes(root):
     walk(root)
     return out
 
+_painters = weakref.WeakKeyDictionary()
+
+def _painter_for(canvas):
+    painter = _painters.get(canvas)
+    if painter is None:
+        painter = _painters[canvas] = ViewportPainter(canvas)
+    return painter
+
+def viewport_changed(canvas: tk.Canvas):
+    """A appeler quand la vue défile : crée les items devenus visibles."""
+    painter = _painters.get(canvas)
+    if painter is not None:
+        painter.refresh()
+
 def render_layout(canvas: tk.Canvas, layout_root):
-    canvas.delete("all")
-    if not layout_root: return []
+    painter = _painter_for(canvas)
+    if not layout_root:
+        painter.clear(); return []
 
     hit_regions = []  # (x1,y1,x2,y2,node) pour éléments cliquables
+    out = []          # commandes de dessin, dans l'ordre de peinture
     flat = _collect_boxes(layout_root)
     flat.sort(key=lambda t: (t[1], t[2]))
 
@@ -52,17 +70,19 @@ def render_layout(canvas: tk.Canvas, layout_root):
 
         # Dessin
         if bg:
-            canvas.create_rectangle(x1, y1, x1 + w, y1 + h, fill=bg, outline="")
+            out.append(DrawCommand("rectangle", (x1, y1, x1 + w, y1 + h), {"fill": bg, "outline": ""}, key=(id(node), "bg")))
         if bw > 0:
-            canvas.create_rectangle(x1, y1, x1 + w, y1 + h, width=bw, outline=bcol)
+            out.append(DrawCommand("rectangle", (x1, y1, x1 + w, y1 + h), {"width": bw, "outline": bcol}, key=(id(node), "border")))
         if txt:
             fs = int(float(_get(node, "font-size", 16) or 16))
             ff = str(_get(node, "font-family", "TkDefaultFont"))
-            font = Font(family=ff, size=fs)
+            font = get_font(ff, fs)
             pad_l = float(_get(node, "padding-left", 0) or 0)
             pad_t = float(_get(node, "padding-top", 0) or 0)
             bor = float(_get(node, "border-width", 0) or 0)
-            canvas.create_text(x1 + bor + pad_l, y1 + bor + pad_t, anchor="nw", font=font, fill=col, text=txt)
+            tx, ty = x1 + bor + pad_l, y1 + bor + pad_t
+            out.append(DrawCommand("text", (tx, ty), {"anchor": "nw", "font": font, "fill": col, "text": txt},
+                                   (tx, ty, x1 + w, max(y1 + h, ty + fs * 2)), (id(node), "text")))
 
         # Marquer comme cliquable si <button> ou class contient 'btn' (simplifié)
         try:
@@ -73,6 +93,10 @@ def render_layout(canvas: tk.Canvas, layout_root):
         except Exception:
             pass
 
+    # Zone de défilement = étendue de la page ; seuls les items visibles sont créés
+    width = max([c.bbox[2] for c in out] + [1])
+    height = max([c.bbox[3] for c in out] + [1])
+    painter.paint(out, width + 20, height + 20)
     return hit_regions
 
 
@@ -88,12 +112,12 @@ class Step6App(App):
         self._relayout_and_paint()
         self._install_click_bindings()
     def _run_inline_scripts(self, node):
-        if getattr(node,'tag','').lower() == 'script':
-            code = (getattr(node,'text','') or '').strip()
+        # <script> relevés par le parseur (html_parser.DocumentIndex)
+        for script in node.index.scripts:
+            code = (getattr(script,'text','') or '').strip()
             if code:
                 try: self.jsrt.eval(code)
                 except Exception as e: print('JS error:', e)
-        for c in getattr(node,'children',[]) or []: self._run_inline_scripts(c)
     def _on_dom_change(self):
         self._relayout_and_paint(); self._install_click_bindings()
     def _relayout_and_paint(self):
@@ -101,28 +125,40 @@ class Step6App(App):
         self.layout_root = build_layout_tree(self.layout_root.node, viewport_width=w)
         render_layout(self.canvas, self.layout_root)
     def _install_click_bindings(self):
-        self.canvas.tag_unbind('clickable', '<Button-1>'); self.canvas.dtag('all','clickable')
+        # Zones cliquables conservées d'un rendu à l'autre : on ne touche
+        # qu'aux rectangles dont la boîte a bougé, apparu ou disparu.
+        items = getattr(self, '_click_items', None)
+        if items is None:
+            items = self._click_items = {}
+            self.canvas.tag_bind('clickable','<Button-1>', self._on_canvas_click)
+        seen = {}
         def walk(b):
             _id = getattr(b.node,'attributes',{}).get('id')
-            if _id:
-                x0,y0,x1,y1 = b.x, b.y, b.x+b.w, b.y+b.h
-                item = self.canvas.create_rectangle(x0,y0,x1,y1, outline='', fill='', tags=('clickable', _id))
+            if _id and _id not in seen:
+                seen[_id] = (b.x, b.y, b.x+b.w, b.y+b.h)
             for c in getattr(b,'children',[]) or []: walk(c)
         walk(self.layout_root)
-        self.canvas.tag_bind('clickable','<Button-1>', self._on_canvas_click)
+        for _id in [k for k in items if k not in seen]:
+            self.canvas.delete(items.pop(_id)[0])
+        for _id, coords in seen.items():
+            old = items.get(_id)
+            if old is None:
+                item = self.canvas.create_rectangle(*coords, outline='', fill='', tags=('clickable', _id))
+                items[_id] = (item, coords)
+            elif old[1] != coords:
+                self.canvas.coords(old[0], *coords)
+                items[_id] = (old[0], coords)
     def _on_canvas_click(self, evt):
-        items = self.canvas.find_overlapping(evt.x, evt.y, evt.x, evt.y)
+        x, y = self.canvas.canvasx(evt.x), self.canvas.canvasy(evt.y)
+        items = self.canvas.find_overlapping(x, y, x, y)
         for it in items:
             tags = self.canvas.gettags(it)
             for t in tags:
                 if t not in ('clickable',):
                     node = self._find_node_by_id(self.layout_root.node, t)
                     if node:
-                        dispatch_click(self.jsrt, JSElement(node, self._on_dom_change))
+                        dispatch_click(self.jsrt, JSElement(node, self._on_dom_change, self.jsrt.index))
                         return
     def _find_node_by_id(self, node, _id):
-        if getattr(node,'attributes',{}).get('id') == _id: return node
-        for c in getattr(node,'children',[]) or []:
-            r = self._find_node_by_id(c, _id)
-            if r: return r
-        return None
+        # index id du runtime JS, tenu à jour par ses mutations
+        return self.jsrt.index.by_id(_id)
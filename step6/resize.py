@@ -0,0 +1,92 @@
+# Step 6 — Redimensionnement regroupé (identique à la racine)
+"""Coalesced resize handling for Tk widgets.
+
+Dragging a window edge fires a <Configure> event for every intermediate
+size. ResizeScheduler collects them and calls the render callback at most
+once per `delay_ms`, always with the latest size, so the sizes in between
+are dropped instead of rendered. A configure that leaves the width alone
+only changes how much of the page is visible: the current paint is kept.
+"""
+
+class ResizeScheduler:
+    def __init__(self, widget, on_resize, delay_ms=40, drag_gap_ms=300, report=None):
+        """on_resize(width, height) does the actual relayout + repaint.
+        report(stats), if given, is called when a drag ends."""
+        self.widget = widget
+        self.on_resize = on_resize
+        self.delay_ms = delay_ms
+        self.drag_gap_ms = drag_gap_ms
+        self.report = report
+
+        self._size = None           # latest (width, height) seen
+        self._rendered_size = None  # (width, height) of the current paint
+        self._flush_id = None
+        self._drag_end_id = None
+
+        self.events = 0
+        self.renders = 0
+        self.height_only = 0
+        self._drag = self._new_drag()
+        self.last_drag = None
+
+        widget.bind("<Configure>", self._on_configure, add="+")
+
+    @staticmethod
+    def _new_drag():
+        return {"events": 0, "renders": 0, "height_only": 0}
+
+    # -------- public API --------
+    def mark_rendered(self, width, height):
+        """Tell the scheduler the widget was just painted at this size."""
+        self._rendered_size = (int(width), int(height))
+
+    def invalidate(self):
+        """Force the next configure to render, whatever its size."""
+        self._rendered_size = None
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "renders": self.renders,
+            "height_only": self.height_only,
+            "saved": self.events - self.renders,
+            "last_drag": self.last_drag,
+        }
+
+    # -------- event handling --------
+    def _on_configure(self, event):
+        if event.widget is not self.widget:
+            return
+        self._size = (int(event.width), int(event.height))
+        self.events += 1
+        self._drag["events"] += 1
+
+        if self._flush_id is None:
+            self._flush_id = self.widget.after(self.delay_ms, self._flush)
+        if self._drag_end_id is not None:
+            self.widget.after_cancel(self._drag_end_id)
+        self._drag_end_id = self.widget.after(self.drag_gap_ms, self._end_drag)
+
+    def _flush(self):
+        self._flush_id = None
+        if self._size is None:
+            return
+        width, height = self._size
+        if self._rendered_size is not None and self._rendered_size[0] == width:
+            # Only the height changed: layout does not depend on it
+            self.height_only += 1
+            self._drag["height_only"] += 1
+        else:
+            self.renders += 1
+            self._drag["renders"] += 1
+            self.on_resize(width, height)
+        self._rendered_size = (width, height)
+
+    def _end_drag(self):
+        self._drag_end_id = None
+        drag = self._drag
+        drag["saved"] = drag["events"] - drag["renders"]
+        self.last_drag = drag
+        self._drag = self._new_drag()
+        if self.report is not None:
+            self.report(drag)
@@ -1,30 +1,26 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
-from html_parser import parse_html
-from css_parser import CSSParser
+from html_parser import parse_document
+from css_parser import CSSParser, StylesheetCache
 from render import render_layout
 from js_interpreter import JSInterpreter
+from source_view import SourceView
 
 class Browser:
     def __init__(self, root):
         self.root = root; self.root.title("Mini Browser – Step 7 (Final)")
-        self.dom=None; self.css = CSSParser()
+        self.dom=None; self.css = CSSParser(); self.stylesheets = StylesheetCache()
 
         top = tk.Frame(root); top.pack(side=tk.TOP, fill=tk.X)
         self.url_entry = tk.Entry(top); self.url_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=4, pady=4)
         self.url_entry.bind("<Return>", self.load_url)
         tk.Button(top, text="Load", command=self.load_url).pack(side=tk.LEFT, padx=4, pady=4)
 
-        self.source_text = tk.Text(root, height=10); self.source_text.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.source_view = SourceView(root, height=10); self.source_view.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas = tk.Canvas(root, bg="white"); self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
         self.canvas.bind("<Configure>", lambda e: self._rerender())
 
-    def _walk(self, n):
-        if not n: return
-        yield n
-        for c in n.children: yield from self._walk(c)
-
     def load_url(self, event=None):
         url = self.url_entry.get().strip()
         if not url:
@@ -36,23 +32,23 @@ class Browser:
 
         with open(url, "r", encoding="utf-8") as f:
             html = f.read()
-        self.source_text.delete("1.0", tk.END); self.source_text.insert(tk.END, html)
+        self.source_view.set_text(html)
 
-        self.dom = parse_html(html); self.css.rules=[]
+        self.dom, index = parse_document(html); self.css.rules=[]
 
         base = os.path.dirname(os.path.abspath(url))
-        for n in self._walk(self.dom):
-            if n.tag.lower()=="style" and n.text.strip(): self.css.parse_css(n.text)
-            if n.tag.lower()=="link" and (n.attributes.get("rel") or "").lower()=="stylesheet":
-                href=(n.attributes.get("href") or "").strip()
-                if href:
-                    path = href if os.path.isabs(href) else os.path.join(base, href)
-                    if os.path.exists(path):
-                        with open(path,"r",encoding="utf-8") as f: self.css.parse_css(f.read())
+        for n in index.sheets:
+            if n.tag=="style":
+                if n.text.strip(): self.css.add_sheet(self.stylesheets.parse(n.text))
+                continue
+            href=(n.attributes.get("href") or "").strip()
+            if href:
+                path = href if os.path.isabs(href) else os.path.join(base, href)
+                if os.path.exists(path): self.css.add_sheet(self.stylesheets.parse_file(path))
 
         interp = JSInterpreter(self.dom)
-        for n in self._walk(self.dom):
-            if n.tag.lower()=="script" and (n.text or "").strip():
+        for n in index.scripts:
+            if (n.text or "").strip():
                 interp.execute(n.text)
 
         self._rerender()
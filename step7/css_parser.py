@@ -1,17 +1,52 @@
-import re
+import hashlib, os, re
+from collections import OrderedDict
+
+def parse_rules(css):
+    rules=[]
+    if not css: return ()
+    css = re.sub(r'/\*.*?\*/','',css,flags=re.DOTALL)
+    for m in re.finditer(r'([^{]+)\{([^}]*)\}', css):
+        selectors=[s.strip() for s in m.group(1).split(',') if s.strip()]
+        decls={}
+        for d in m.group(2).split(';'):
+            d=d.strip()
+            if not d or ':' not in d: continue
+            k,v=d.split(':',1); decls[k.strip()]=v.strip()
+        if selectors:
+            rules.append({'selectors':selectors,'style':decls})
+            for s in selectors: rules.append({'selector':s,'style':decls})
+    return tuple(rules)
+
 class CSSParser:
     def __init__(self): self.rules=[]
     def parse_css(self, css):
-        if not css: return self.rules
-        css = re.sub(r'/\*.*?\*/','',css,flags=re.DOTALL)
-        for m in re.finditer(r'([^{]+)\{([^}]*)\}', css):
-            selectors=[s.strip() for s in m.group(1).split(',') if s.strip()]
-            decls={}
-            for d in m.group(2).split(';'):
-                d=d.strip()
-                if not d or ':' not in d: continue
-                k,v=d.split(':',1); decls[k.strip()]=v.strip()
-            if selectors:
-                self.rules.append({'selectors':selectors,'style':decls})
-                for s in selectors: self.rules.append({'selector':s,'style':decls})
+        self.rules.extend(parse_rules(css))
         return self.rules
+    def add_sheet(self, rules):
+        # shared rule dicts from a StylesheetCache: referenced, never copied or modified
+        self.rules.extend(rules)
+
+class StylesheetCache:
+    """Parsed sheets of recent pages, by content hash; files by path+mtime+size."""
+    def __init__(self, max_sheets=32):
+        self.max_sheets=max_sheets; self.sheets=OrderedDict(); self.files={}
+    def parse(self, css):
+        return self._get(hashlib.sha1(css.encode("utf-8","surrogatepass")).hexdigest(), css)
+    def parse_file(self, path):
+        st=os.stat(path); stamp=(st.st_mtime_ns, st.st_size)
+        known=self.files.get(path)
+        if known and known[0]==stamp and known[1] in self.sheets:
+            return self._get(known[1], None)
+        with open(path,"r",encoding="utf-8") as f: css=f.read()
+        key=hashlib.sha1(css.encode("utf-8","surrogatepass")).hexdigest()
+        self.files[path]=(stamp, key)
+        return self._get(key, css)
+    def _get(self, key, css):
+        rules=self.sheets.get(key)
+        if rules is None:
+            rules=self.sheets[key]=parse_rules(css)
+            if len(self.sheets)>self.max_sheets:
+                old,_=self.sheets.popitem(last=False)
+                for p in [p for p,k in self.files.items() if k[1]==old]: del self.files[p]
+        self.sheets.move_to_end(key)
+        return rules
@@ -5,10 +5,22 @@ class DOMNode:
         self.tag = tag; self.parent=parent
         self.children=[]; self.attributes={}; self.text=""; self.styles={}
 
+class DocumentIndex:
+    # filled at each start tag: stylesheet links, styles, both together (sheets) and scripts
+    # in document order, id -> first element, tag -> elements
+    def __init__(self): self.links=[]; self.styles=[]; self.sheets=[]; self.scripts=[]; self.ids={}; self.tags={}
+    def add(self, n):
+        self.tags.setdefault(n.tag, []).append(n)
+        i=n.attributes.get("id")
+        if i and i not in self.ids: self.ids[i]=n
+        if n.tag=="style": self.styles.append(n); self.sheets.append(n)
+        elif n.tag=="script": self.scripts.append(n)
+        elif n.tag=="link" and (n.attributes.get("rel") or "").lower()=="stylesheet": self.links.append(n); self.sheets.append(n)
+
 class MiniHTMLParser(_HTMLParser):
-    def __init__(self): super().__init__(); self.root=None; self.cur=None
+    def __init__(self): super().__init__(); self.root=None; self.cur=None; self.index=DocumentIndex()
     def handle_starttag(self, tag, attrs):
-        n=DOMNode(tag,self.cur); n.attributes=dict(attrs)
+        n=DOMNode(tag,self.cur); n.attributes=dict(attrs); self.index.add(n)
         if self.cur: self.cur.children.append(n)
         else: self.root=n
         self.cur=n
@@ -22,4 +34,7 @@ class MiniHTMLParser(_HTMLParser):
                 self.cur.text+=t
 
 def parse_html(html):
-    p=MiniHTMLParser(); p.feed(html or ""); return p.root
+    return parse_document(html)[0]
+
+def parse_document(html):
+    p=MiniHTMLParser(); p.feed(html or ""); return p.root, p.index
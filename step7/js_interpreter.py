@@ -1,5 +1,5 @@
 class JSInterpreter:
-    def __init__(self, dom_root): self.dom_root = dom_root
+    def __init__(self, dom_root): self.dom_root = dom_root; self._ids = None; self._ids_root = None
     def execute(self, js):
         for line in [l.strip() for l in (js or "").split(";") if l.strip()]:
             if "document.getElementById" in line and "innerHTML" in line and "=" in line:
@@ -10,9 +10,12 @@ class JSInterpreter:
                     if n: n.text=val
                 except Exception: pass
     def _find(self, n, eid):
+        # id -> first element, built once per DOM (scripts here only change text, never ids)
         if not n: return None
-        if n.attributes.get("id")==eid: return n
-        for c in n.children:
-            f=self._find(c,eid)
-            if f: return f
-        return None
+        if self._ids is None or self._ids_root is not n:
+            self._ids, self._ids_root, stack = {}, n, [n]
+            while stack:
+                c=stack.pop(); i=c.attributes.get("id")
+                if i: self._ids.setdefault(i, c)
+                stack.extend(reversed(c.children))
+        return self._ids.get(eid)
@@ -1,34 +1,70 @@
 import tkinter as tk
-from tkinter.font import Font
+import weakref
+from fonts import get_font, linespace
+from painter import DrawCommand, ViewportPainter
+
+_painters = weakref.WeakKeyDictionary()
 
 def render_layout(canvas: tk.Canvas, dom_root, css_rules):
-    canvas.delete("all")
-    if dom_root is None: return
+    # display list diffé avec le rendu précédent : seuls les items modifiés sont touchés
+    painter=_painters.get(canvas)
+    if painter is None: painter=_painters[canvas]=ViewportPainter(canvas)
+    if dom_root is None: painter.clear(); return
     _apply_css(dom_root, css_rules)
     try:
         w = max(800, int(canvas.winfo_width())); h = max(600, int(canvas.winfo_height()))
     except Exception:
         w, h = 800, 600
-    canvas.create_rectangle(0,0,w,h, fill="white", outline="")
-    _paint_node(canvas, dom_root, 10, 10, w-20)
-
-def _apply_css(node, rules):
+    out=[DrawCommand("rectangle",(0,0,w,h),{"fill":"white","outline":""},key="page")]
+    bottom=_paint_node(canvas, out, dom_root, 10, 10, w-20)
+    out[0].coords=out[0].bbox=(0,0,w,max(h,bottom))
+    painter.paint(out, w, max(h,bottom))
+
+def _apply_css(node, rules, anc=None):
+    # anc: keys (tag, #id, .class) of the ancestors -> count, kept along the recursion
+    if anc is None: anc={}
     node.styles = node.styles or {}
     for r in rules or []:
         sels=list(r.get("selectors",[]) or [])
         if not sels and "selector" in r: sels=[r["selector"]]
         for s in sels:
-            if _match(node,s): node.styles.update(r.get("style",{}) or {})
+            if _match(node,s,anc): node.styles.update(r.get("style",{}) or {})
     # list defaults
     tag = node.tag.lower()
     if tag in ("ul","ol"):
         node.styles.setdefault("margin-left","20px")
         node.styles.setdefault("margin-bottom","8px")
-    for c in getattr(node,"children",[]): _apply_css(c, rules)
-
-def _match(node, sel):
-    sel=(sel or "").strip()
-    if not sel: return False
+    keys=_keys(node)
+    for k in keys: anc[k]=anc.get(k,0)+1
+    for c in getattr(node,"children",[]): _apply_css(c, rules, anc)
+    for k in keys:
+        anc[k]-=1
+        if not anc[k]: del anc[k]
+
+def _keys(node):
+    attrs=node.attributes
+    return [node.tag.lower()]+(["#"+attrs["id"]] if attrs.get("id") else [])+["."+c for c in (attrs.get("class") or "").split()]
+
+def _match(node, sel, anc=None):
+    # "nav > a", "ul li": matched right to left; ancestors missing from anc reject it at once
+    parts=(sel or "").replace(">"," > ").split()
+    if not parts or parts[0]==">" or parts[-1]==">": return False
+    if anc is not None and any((p if p[0] in ".#" else p.lower()) not in anc for p in parts[:-1] if p!=">"): return False
+    return bool(_match_from(node, parts, len(parts)-1))
+
+def _match_from(node, parts, i):
+    # True: match; False: fails from node, a higher one may do; None: no higher one can either
+    if not _match_one(node, parts[i]): return False
+    if i==0: return True
+    if parts[i-1]==">": return None if node.parent is None else _match_from(node.parent, parts, i-2)
+    p=node.parent
+    while p is not None:
+        r=_match_from(p, parts, i-1)
+        if r is not False: return r
+        p=p.parent
+    return None
+
+def _match_one(node, sel):
     tag=node.tag.lower(); attrs=node.attributes
     if sel.startswith("."): return sel[1:] in (attrs.get("class") or "").split()
     if sel.startswith("#"): return attrs.get("id")==sel[1:]
@@ -45,7 +81,7 @@ def _color(v,d=None): return d if v in (None,"","transparent") else str(v)
 
 def _heading_size(tag): return {"h1":28,"h2":24,"h3":20,"h4":18,"h5":16,"h6":15}.get(tag, None)
 
-def _font_for(node):
+def _font_spec(node):
     size=int(_px(_get(node,"font-size",14),14)); fam=_get(node,"font-family","Arial")
     tag=node.tag.lower()
     if tag in ("h1","h2","h3","h4","h5","h6") and _get(node,"font-size",None) is None:
@@ -57,8 +93,9 @@ def _font_for(node):
     if fw in ("bold","700","800","900"): weight="bold"
     fs=str(_get(node,"font-style","")).lower()
     if fs=="italic": slant="italic"
-    try: return Font(name=None, exists=False, family=fam, size=size, weight=weight, slant=slant)
-    except: return Font(name=None, exists=False, family="Arial", size=size, weight=weight, slant=slant)
+    return fam, size, weight, slant
+
+def _font_for(node): return get_font(*_font_spec(node))
 
 def _bbox(canvas, text, font):
     i=canvas.create_text(0,0,anchor="nw",text=text,font=font,state="hidden"); b=canvas.bbox(i); canvas.delete(i)
@@ -76,8 +113,8 @@ def _wrap(canvas, text, font, max_w):
     if cur: lines.append(cur)
     return lines
 
-def _paint_node(canvas, node, x, y, max_w):
-    tag=node.tag.lower()
+def _paint_node(canvas, out, node, x, y, max_w):
+    tag=node.tag.lower(); k=id(node)
     if tag in ("head","style","script"): return y
 
     m_t=_px(_get(node,"margin-top",0)); m_b=_px(_get(node,"margin-bottom",8))
@@ -95,13 +132,13 @@ def _paint_node(canvas, node, x, y, max_w):
 
     cur_x=x+m_l; cur_y=y+m_t
 
-    font=_font_for(node); text=(node.text or "").strip()
-    line_h=int(font.metrics("linespace") or 16)
+    spec=_font_spec(node); font=get_font(*spec); text=(node.text or "").strip()
+    line_h=linespace(*spec)
     lines=_wrap(canvas,text,font,content_w); text_h=line_h*len(lines)
 
     x1,y1=cur_x,cur_y; x2,y2=cur_x+total_w,cur_y+(p_t+text_h+p_b+2*bw)
-    if bg: canvas.create_rectangle(x1,y1,x2,y2,fill=bg,outline="")
-    if bw>0: canvas.create_rectangle(x1,y1,x2,y2,outline=bcol,width=bw)
+    if bg: out.append(DrawCommand("rectangle",(x1,y1,x2,y2),{"fill":bg,"outline":""},key=(k,"bg")))
+    if bw>0: out.append(DrawCommand("rectangle",(x1,y1,x2,y2),{"outline":bcol,"width":bw},key=(k,"border")))
 
     text_color=_color(_get(node,"color","black"),"black")
     ty=cur_y+bw+p_t
@@ -109,16 +146,16 @@ def _paint_node(canvas, node, x, y, max_w):
     if lines:
         if is_li:
             bullet_x=cur_x+bw+max(2.0,p_l*0.3)
-            canvas.create_text(bullet_x,ty,anchor="nw",font=_font_for(node),fill=text_color,text="•")
+            out.append(DrawCommand("text",(bullet_x,ty),{"anchor":"nw","font":font,"fill":text_color,"text":"•"},(bullet_x,ty,bullet_x+12,ty+line_h),(k,"bullet")))
             text_x=cur_x+bw+p_l+12
         else:
             text_x=cur_x+bw+p_l
-        for line in lines:
-            canvas.create_text(text_x,ty,anchor="nw",font=font,fill=text_color,text=line)
+        for n,line in enumerate(lines):
+            out.append(DrawCommand("text",(text_x,ty),{"anchor":"nw","font":font,"fill":text_color,"text":line},(text_x,ty,text_x+content_w,ty+line_h),(k,n)))
             ty+=line_h
 
     child_y=cur_y+bw+p_t+text_h
     for c in node.children:
-        child_y=_paint_node(canvas,c,cur_x+bw+p_l,child_y,content_w)
+        child_y=_paint_node(canvas,out,c,cur_x+bw+p_l,child_y,content_w)
 
     return y2+m_b
@@ -0,0 +1,164 @@
+"""Parsed stylesheets shared across page loads.
+
+Pages of a site link the same few stylesheets, so loading a page should not
+mean parsing them again. A StylesheetCache keeps the parsed rules of the
+most recently used sheets, keyed by a hash of their text: a <style> block
+or a file with the same content is parsed once. Files are also remembered
+by path, modification time and size, so an unchanged file is not even read
+again. With a directory (or $MINIBROWSER_CSS_CACHE), parsed sheets are also
+kept on disk and survive the process.
+
+Sheets come back as tuples of Rule shared by every page using them:
+CSSParser.add_sheet() puts them in a page's cascade without copying, and
+nobody may modify them. Their selectors are compiled by the first page's
+RuleIndex (Rule.compiled) and reused by the next pages'.
+"""
+import hashlib
+import marshal
+import os
+from collections import OrderedDict
+
+from css_parser import Rule, parse_stylesheet
+
+FORMAT = 1
+DEFAULT_MAX_SHEETS = 64
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class StylesheetCache:
+    def __init__(self, max_sheets=DEFAULT_MAX_SHEETS, directory=None, max_bytes=DEFAULT_MAX_BYTES,
+                 on_error=None):
+        """on_error(directory, error), if given, is called when parsed rules
+        cannot be written to the disk tier; the page load goes on regardless."""
+        self.max_sheets = max_sheets
+        self.directory = directory or os.environ.get("MINIBROWSER_CSS_CACHE") or None
+        self.max_bytes = max_bytes
+        self.on_error = on_error
+        self._sheets = OrderedDict()  # content hash -> tuple of Rule, least recent first
+        self._files = {}              # path -> (mtime_ns, size, content hash), for hashes in _sheets
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.store_errors = 0
+
+    def parse(self, css_text):
+        """The rules of a stylesheet's text."""
+        key = _content_key(css_text)
+        return self._get(key, lambda: css_text)
+
+    def parse_file(self, path):
+        """The rules of a stylesheet file (raises OSError if it cannot be read)."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        known = self._files.get(path)
+        if known is not None and known[0] == st.st_mtime_ns and known[1] == st.st_size:
+            rules = self._sheets.get(known[2])
+            if rules is not None:
+                self._sheets.move_to_end(known[2])
+                self.hits += 1
+                return rules
+        with open(path, "r", encoding="utf-8") as f:
+            css_text = f.read()
+        key = _content_key(css_text)
+        self._files[path] = (st.st_mtime_ns, st.st_size, key)
+        return self._get(key, lambda: css_text)
+
+    def _get(self, key, text):
+        rules = self._sheets.get(key)
+        if rules is not None:
+            self._sheets.move_to_end(key)
+            self.hits += 1
+            return rules
+        rules = self._load(key)
+        if rules is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            rules = tuple(parse_stylesheet(text()))
+            self._store(key, rules)
+        self._sheets[key] = rules
+        while len(self._sheets) > self.max_sheets:
+            evicted, _ = self._sheets.popitem(last=False)
+            # Paths of that content would only ever miss: forget them too
+            for path in [p for p, known in self._files.items() if known[2] == evicted]:
+                del self._files[path]
+        return rules
+
+    def clear(self):
+        self._sheets.clear()
+        self._files.clear()
+        if self.directory and os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith(".rules"):
+                    os.remove(os.path.join(self.directory, name))
+
+    # -------- disk tier --------
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".rules")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        # The disk tier is optional: an unreadable, stale or malformed entry
+        # is a miss, never an error for the page being loaded
+        try:
+            with open(path, "rb") as f:
+                version, rules = marshal.loads(f.read())
+            if version != FORMAT:
+                return None
+            rules = tuple(Rule(selectors, declarations) for selectors, declarations in rules)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        try:
+            os.utime(path)  # most recently used
+        except OSError:
+            pass  # read-only or someone else's cache directory
+        return rules
+
+    def _store(self, key, rules):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(marshal.dumps((FORMAT, _shared(rules))))
+            os.replace(tmp, path)
+            self._evict()
+        except OSError as e:
+            self.store_errors += 1
+            if self.on_error is not None:
+                self.on_error(self.directory, e)
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if name.endswith(".rules"):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append((st.st_mtime, st.st_size, name))
+                total += st.st_size
+        entries.sort()
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, name = entries.pop(0)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+def _shared(rules):
+    """(selectors, declarations) pairs with equal strings and declarations
+    made the same object, which marshal then writes once and back-references."""
+    seen = {}
+    same = seen.setdefault
+    out = []
+    for rule in rules:
+        selectors = tuple([same(s, s) for s in rule.selectors])
+        declarations = tuple([same(d, (same(d[0], d[0]), same(d[1], d[1]))) for d in rule.declarations])
+        out.append((selectors, declarations))
+    return out
+
+def _content_key(css_text):
+    return hashlib.sha256(css_text.encode("utf-8", "surrogatepass")).hexdigest()
@@ -0,0 +1,27 @@
+"""Fixtures loading the step copies of the pipeline.
+
+Each step directory has modules named like the root ones (html_parser,
+js_runtime...), so they are imported from their file under a prefixed name
+and never shadow the root modules in sys.modules.
+"""
+import importlib.util
+import os
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_step(step, *modules):
+    """Namespace of `modules`, imported from the `step` directory."""
+    loaded = {}
+    for name in modules:
+        spec = importlib.util.spec_from_file_location(f"{step}_{name}", os.path.join(ROOT, step, name + ".py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        loaded[name] = module
+    return types.SimpleNamespace(**loaded)
+
+@pytest.fixture(scope="session")
+def step6():
+    return load_step("step6", "html_parser", "js_runtime")
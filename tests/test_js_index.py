@@ -0,0 +1,128 @@
+"""step6's ElementIndex, kept live by JSElement mutations."""
+import random
+
+import pytest
+
+PAGE = ('<html><body>'
+        '<div id="a" class="x"><p class="y">one</p></div>'
+        '<div id="b"><p class="x y">two</p></div>'
+        '<ul id="list"><li class="item">1</li><li class="item">2</li></ul>'
+        '</body></html>')
+
+@pytest.fixture
+def document(step6):
+    dom, _ = step6.html_parser.parse_html(PAGE)
+    return step6.js_runtime.JSRuntime(dom, on_dom_change=lambda: None).document
+
+@pytest.fixture
+def new_element(step6, document):
+    """A detached element of `document`, as a script would build one."""
+    def make(tag, **attributes):
+        element = step6.js_runtime.JSElement(step6.html_parser.DOMNode(tag), lambda: None, document.index)
+        for name, value in attributes.items():
+            element.setAttribute(name, value)
+        return element
+    return make
+
+def _preorder(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.children))
+
+def _dfs_first(root, match):
+    return next((node for node in _preorder(root) if match(node)), None)
+
+def _get(document, selector):
+    found = document.querySelector(selector)
+    return found.node if found else None
+
+def test_initial_lookups_follow_document_order(document):
+    assert document.getElementById("a").node.tag == "div"
+    assert _get(document, ".x") is document.getElementById("a").node
+    assert _get(document, ".y").text == "one"
+    assert _get(document, "li").text == "1"
+    assert document.index.verify() == []
+
+def test_set_attribute_reindexes_id_and_class(document):
+    p = document.querySelector(".y")
+    p.setAttribute("id", "first")
+    assert document.getElementById("first").node is p.node
+    p.setAttribute("class", "z")
+    assert _get(document, ".z") is p.node
+    assert _get(document, ".y").text == "two"
+    p.setAttribute("id", "other")
+    assert document.getElementById("first") is None
+    assert document.index.verify() == []
+
+def test_append_child_moves_and_reorders(document):
+    a, b = document.getElementById("a"), document.getElementById("b")
+    b.appendChild(a)  # #a now comes after #b's <p>
+    assert a.node.parent is b.node
+    assert a.node not in document.getElementById("list").node.parent.children
+    assert _get(document, ".x").text == "two"
+    assert _get(document, ".y").text == "two"
+    assert document.index.verify() == []
+
+def test_remove_drops_the_subtree(document, new_element):
+    document.getElementById("a").remove()
+    assert document.getElementById("a") is None
+    assert _get(document, ".x").text == "two"
+    assert document.index.verify() == []
+    # a detached element's mutations do not reach the index
+    detached = new_element("span", id="ghost")
+    assert document.getElementById("ghost") is None
+    document.querySelector("body").appendChild(detached)
+    assert document.getElementById("ghost").node is detached.node
+    assert document.index.verify() == []
+
+def test_cycle_is_rejected_without_changing_anything(step6, document):
+    a = document.getElementById("a")
+    p = document.querySelector(".y")
+    with pytest.raises(step6.js_runtime.JSEvalError):
+        p.appendChild(a)
+    with pytest.raises(step6.js_runtime.JSEvalError):
+        a.appendChild(a)
+    assert p.node.parent is a.node and a.node.parent.tag == "body"
+    assert document.index.verify() == []
+
+def test_random_mutations_match_a_fresh_search(step6, document, new_element):
+    rng = random.Random(5)
+    body = document.querySelector("body")
+    for i in range(40):
+        body.appendChild(new_element("div"))
+    wrap = lambda node: step6.js_runtime.JSElement(node, lambda: None, document.index)
+    detached = []
+    for step in range(600):
+        nodes = list(_preorder(body.node))[1:]
+        node = rng.choice(nodes)
+        op = rng.random()
+        if op < 0.3:
+            wrap(node).setAttribute("class", rng.choice(["x", "y", "x y", ""]))
+        elif op < 0.7:
+            child = detached.pop() if detached and op < 0.4 else node
+            try:
+                wrap(rng.choice(nodes + [body.node])).appendChild(wrap(child))
+            except step6.js_runtime.JSEvalError:
+                pass
+        elif op < 0.8:
+            wrap(node).remove()
+            detached.append(node)
+        for cls in ("x", "y"):
+            want = _dfs_first(document.dom_root, lambda n: cls in (n.attributes.get("class") or "").split())
+            assert _get(document, "." + cls) is want
+        assert _get(document, "div") is _dfs_first(document.dom_root, lambda n: n.tag == "div")
+    assert document.index.verify() == []
+
+def test_positions_are_renumbered_when_a_gap_runs_out(document, new_element):
+    a = document.getElementById("a")
+    added = []
+    for i in range(100):  # each insertion halves the gap before #b
+        span = new_element("span", **{"class": "x"})
+        a.appendChild(span)
+        added.append(span.node)
+    assert document.index.verify() == []
+    a.setAttribute("class", "")
+    assert _get(document, ".x") is added[0]
+    assert _get(document, "span") is added[0]
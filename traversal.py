@@ -0,0 +1,93 @@
+"""Depth-first traversal of DOM and layout trees without recursion.
+
+Everything that walks a tree (printing, the cascade, measuring, painting,
+id lookups) goes through these helpers, so depth only costs stack entries
+in a list: no RecursionError on deeply nested pages, and no per-level
+generator chains making each yielded node O(depth).
+
+A tree is anything whose nodes have a `children` sequence; pass
+`children=` to walk another shape.
+"""
+
+# Printers indent one step per level up to MAX_INDENT levels; deeper lines
+# carry their depth instead, so output stays linear in the node count.
+MAX_INDENT = 40
+
+def indent(depth, unit="  "):
+    if depth <= MAX_INDENT:
+        return unit * depth
+    return unit * MAX_INDENT + f"[{depth}] "
+
+def children_of(node):
+    return getattr(node, "children", None) or ()
+
+def preorder(root, children=children_of):
+    """Nodes in document order (parent before its children)."""
+    if root is None:
+        return
+    stack = [root]
+    pop, extend = stack.pop, stack.extend
+    while stack:
+        node = pop()
+        yield node
+        kids = children(node)
+        if kids:
+            extend(reversed(kids))
+
+def preorder_with_depth(root, children=children_of, depth=0):
+    """(node, depth) pairs in document order; root is at `depth`."""
+    if root is None:
+        return
+    stack = [(root, depth)]
+    while stack:
+        node, d = stack.pop()
+        yield node, d
+        kids = children(node)
+        if kids:
+            stack.extend((kid, d + 1) for kid in reversed(kids))
+
+def postorder(root, children=children_of):
+    """Nodes with every child before its parent (children in order)."""
+    if root is None:
+        return
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            yield node
+            continue
+        stack.append((node, True))
+        kids = children(node)
+        if kids:
+            stack.extend((kid, False) for kid in reversed(kids))
+
+# Returned by an enter() callback: do not visit this node's subtree and do
+# not call leave() for it.
+SKIP = object()
+
+def walk(root, enter=None, leave=None, children=children_of, context=None):
+    """Visitor-style depth-first walk.
+
+    enter(node, parent_result) runs when a node is reached; what it returns
+    is the node's result, handed to its children's enter() as their
+    parent_result. Returning SKIP prunes the subtree. leave(node, result,
+    parent_result) runs once all of the node's children are done, so a
+    node's next sibling is only entered after that. The root's
+    parent_result is `context`.
+    """
+    if root is None:
+        return
+    stack = [(root, context, False, None)]
+    while stack:
+        node, parent_result, leaving, result = stack.pop()
+        if leaving:
+            leave(node, result, parent_result)
+            continue
+        result = enter(node, parent_result) if enter is not None else None
+        if result is SKIP:
+            continue
+        if leave is not None:
+            stack.append((node, parent_result, True, result))
+        kids = children(node)
+        if kids:
+            stack.extend((kid, result, False, None) for kid in reversed(kids))